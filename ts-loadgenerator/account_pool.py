@@ -0,0 +1,166 @@
+"""
+Partitioned Test-Account Pool for Train-Ticket Load Testing
+
+Replaces the single shared fdse_microservice account with a pre-provisioned
+pool of N accounts, each with its own contacts. Accounts are partitioned
+across distributed workers (by worker index) and handed to simulated users
+round-robin through the session pool. Per-account order history is bounded,
+so /order/refresh payloads and backend query costs reflect a realistic
+per-customer data volume instead of growing with the length of the run.
+
+Provision the accounts once before a run:
+    python account_pool.py --host http://ts-ui-dashboard:8080 --size 1000
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+
+import gevent
+from gevent.pool import Pool
+from locust import events
+from locust.contrib.fasthttp import FastHttpSession
+from locust.env import Environment
+
+import api_admin
+import api_user
+import config
+import order_state
+import seeding
+import session_pool
+import utils
+
+# Orders booked per user_id since the last history check
+_orders_since_check = {}
+
+
+def account_name(index):
+    """Deterministic user name of the account with the given pool index."""
+    return f"{config.ACCOUNT_NAME_PREFIX}{index:06d}"
+
+
+def all_accounts():
+    """All (username, password) pairs of the pool."""
+    return [(account_name(i), config.ACCOUNT_PASSWORD) for i in range(config.ACCOUNT_POOL_SIZE)]
+
+
+def worker_accounts(environment):
+    """
+    Accounts owned by this worker: index % worker_count == worker position (see
+    seeding.shard). Falls back to the whole pool if there are more workers than accounts.
+    """
+    accounts = all_accounts()
+    worker_index, worker_count = seeding.shard(environment)
+    partition = accounts[worker_index::worker_count]
+    return partition or accounts
+
+
+def create_contact(client, user_id, headers, index):
+    """Create one contact owned by the given account."""
+    body = {"accountId": user_id,
+            "name": f"Contact_{index}_{utils.get_random_string(5)}",
+            "documentType": 1,
+            "documentNumber": utils.get_random_string(12),
+            "phoneNumber": f"1{utils.get_random_string(10)}"}
+    response = client.post(url="/api/v1/contactservice/contacts", json=body, headers=headers, context=body,
+                           name=utils.get_name_suffix("create_contacts"))
+    return utils.get_json_from_response(response)
+
+
+def provision_account(client, admin_token, user_name, password):
+    """
+    Idempotently create one account and top up its contacts to the configured count.
+    Returns the number of contacts created.
+    """
+    # Creating an existing user fails harmlessly; the login below is the real check
+    api_admin.api_call_admin_create_user(client, admin_token, user_name, password)
+    user_id, token = api_user.login(client, user_name, password)
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "application/json"}
+
+    response = client.get(f"/api/v1/contactservice/contacts/account/{user_id}", headers=headers,
+                          name=utils.get_name_suffix("query_contacts"))
+    existing = (utils.get_json_from_response(response) or {}).get("data") or []
+    missing = max(0, config.ACCOUNT_CONTACTS_PER_ACCOUNT - len(existing))
+    for i in range(missing):
+        create_contact(client, user_id, headers, len(existing) + i)
+    return missing
+
+
+def record_order(client, user_id, headers):
+    """
+    Note that an order was booked for user_id. Every ACCOUNT_MAX_ORDERS bookings the
+    account's history is trimmed back to its newest ACCOUNT_MAX_ORDERS orders, in a
+    background greenlet so that the trimming requests are not timed as the booking.
+    """
+    if not config.ACCOUNT_MAX_ORDERS:
+        return
+    count = _orders_since_check.get(user_id, 0) + 1
+    if count < config.ACCOUNT_MAX_ORDERS:
+        _orders_since_check[user_id] = count
+        return
+    _orders_since_check[user_id] = 0
+    admin = session_pool.admins.acquire()
+    if admin is not None:
+        gevent.spawn(trim_history, client, user_id, headers, admin.headers)
+
+
+def bought_at(order):
+    """Epoch seconds of an order's boughtDate (epoch ms or "yyyy-MM-dd HH:mm:ss"), 0 if unknown."""
+    value = order.get("boughtDate")
+    if isinstance(value, (int, float)):
+        return value / 1000
+    try:
+        return datetime.strptime(str(value).replace("T", " ")[:19], "%Y-%m-%d %H:%M:%S").timestamp()
+    except ValueError:
+        return 0
+
+
+def trim_history(client, user_id, headers, admin_headers):
+    """Delete the oldest orders of an account beyond ACCOUNT_MAX_ORDERS (HS and other combined)."""
+    try:
+        orders = (api_user.get_all_orders(client, user_id, hs=True, headers=headers) or []) + \
+                 (api_user.get_all_orders(client, user_id, hs=False, headers=headers) or [])
+    except Exception:
+        return
+    excess = len(orders) - config.ACCOUNT_MAX_ORDERS
+    if excess <= 0:
+        return
+    orders.sort(key=bought_at)
+    for order in orders[:excess]:
+        api_admin.delete_order(client, order["id"], order["trainNumber"], headers=admin_headers)
+    order_state.book_for(user_id).invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision the load-test account pool")
+    parser.add_argument("--host", required=True, help="Train-Ticket UI/gateway base URL")
+    parser.add_argument("--size", type=int, default=config.ACCOUNT_POOL_SIZE, help="Number of accounts")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent provisioning requests")
+    args = parser.parse_args()
+    config.ACCOUNT_POOL_SIZE = args.size
+
+    environment = Environment(events=events, host=args.host)
+    client = FastHttpSession(environment, base_url=args.host, user=None,
+                             network_timeout=config.NETWORK_TIMEOUT,
+                             connection_timeout=config.CONNECTION_TIMEOUT)
+    _, admin_token = api_admin.login(client)
+
+    started = time.time()
+    contacts = 0
+    failed = 0
+    pool = Pool(args.concurrency)
+    jobs = [pool.spawn(provision_account, client, admin_token, u, p) for u, p in all_accounts()]
+    pool.join()
+    for job in jobs:
+        if job.successful():
+            contacts += job.value
+        else:
+            failed += 1
+            logging.warning(f"Provisioning failed: {job.exception!r}")
+    print(f"Provisioned {len(jobs) - failed}/{len(jobs)} accounts, created {contacts} contacts "
+          f"in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Shared Admin Data Snapshot for Train-Ticket Load Testing
+
+Admin behaviors need the current routes, travels, prices, contacts and orders
+only to pick an entry for their next action. Instead of every Admin user
+downloading (and holding) its own copy on start-up and on every task, each
+worker loads these listings once on test_start and reloads them in the
+background every ADMIN_SNAPSHOT_REFRESH_INTERVAL seconds. A reload builds a new
+immutable Snapshot and swaps the module reference (copy-on-write), so users
+keep a consistent view while it is replaced. Entries are shared between users:
+copy an entry (dict(entry)) before modifying it. The deletion candidate pools
+are the exception: deletes claim (remove) their entry from the current pool.
+"""
+
+import logging
+import time
+
+import gevent
+from locust import events
+from locust.contrib.fasthttp import FastHttpSession
+from locust.runners import MasterRunner
+
+import api_admin
+import catalog
+import config
+import tracing
+import utils
+
+# Listings kept in the snapshot and how each one is fetched by a single user
+FETCHERS = {
+    "routes": lambda client, headers, sample, predicate=None: api_admin.get_all_routes(client, headers=headers),
+    "travels": lambda client, headers, sample, predicate=None: api_admin.get_all_travels(
+        client, headers=headers, sample=sample, predicate=predicate),
+    "prices": lambda client, headers, sample, predicate=None: api_admin.get_all_prices(client, headers=headers),
+    "contacts": lambda client, headers, sample, predicate=None: api_admin.get_all_contacts(
+        client, headers=headers, sample=sample, predicate=predicate),
+    "orders": lambda client, headers, sample, predicate=None: api_admin.get_all_orders(
+        client, headers=headers, sample=sample, predicate=predicate),
+}
+
+# Train number of the entries of the listings that admin behaviors delete from
+TRAIN_NUMBER_OF = {
+    "travels": api_admin.travel_train_number,
+    "orders": api_admin.order_train_number,
+}
+
+
+class Snapshot:
+    """
+    Immutable view of the admin listings at one point in time, with indexes:
+    travels/orders by train class (hs -> list), orders by train number and the
+    deletion candidates of travels/orders per train class.
+    """
+
+    def __init__(self, listings, taken_at):
+        self.listings = listings  # name -> response dict ({"status", "msg", "data"})
+        self.taken_at = taken_at
+
+        self.travels_by_class = {True: [], False: []}
+        for travel in self.data("travels"):
+            try:
+                train_number = api_admin.travel_train_number(travel)
+            except (KeyError, TypeError):
+                continue
+            self.travels_by_class[train_number.startswith(api_admin.HS_TRAIN_TYPES)].append(travel)
+
+        self.orders_by_class = {True: [], False: []}
+        self.orders_by_number = {}
+        for order in self.data("orders"):
+            train_number = api_admin.order_train_number(order)
+            self.orders_by_class[train_number.startswith(api_admin.HS_TRAIN_TYPES)].append(order)
+            self.orders_by_number.setdefault(train_number, []).append(order)
+
+        self.delete_candidates = {kind: api_admin.deletion_candidates(self.data(kind), train_number_of)
+                                  for kind, train_number_of in TRAIN_NUMBER_OF.items()}
+
+    def data(self, name):
+        """The "data" list of a listing (empty if it has not been loaded)."""
+        return (self.listings.get(name) or {}).get("data") or []
+
+
+def load(client, headers, previous=None):
+    """Fetch all listings and build a new Snapshot; listings that fail keep their previous value."""
+    listings = {}
+    for name, fetch in FETCHERS.items():
+        result = utils.json_value(fetch(client, headers, None))
+        if isinstance(result, dict) and isinstance(result.get("data"), list):
+            listings[name] = result
+        elif previous is not None and name in previous.listings:
+            listings[name] = previous.listings[name]
+    return Snapshot(listings, time.time())
+
+
+# Worker-wide snapshot (None until loaded or when disabled)
+current = None
+_refresh_greenlet = None
+
+
+def get_listing(client, name, headers=None, sample=None):
+    """
+    A listing as returned by api_admin: from the shared snapshot when it is loaded,
+    otherwise fetched by the calling user (sampled to `sample` entries if given).
+    """
+    snapshot = current
+    if snapshot is not None and name in snapshot.listings:
+        return snapshot.listings[name]
+    return FETCHERS[name](client, headers, sample)
+
+
+def get_delete_candidates(client, kind, hs, headers=None):
+    """
+    Deletion candidate index ({hs: [entry, ...]}) of "travels" or "orders": the shared
+    snapshot's when loaded, otherwise built from a listing fetched (and, when streaming,
+    filtered to eligible entries of the train class) by the calling user.
+    """
+    snapshot = current
+    if snapshot is not None and kind in snapshot.listings:
+        return snapshot.delete_candidates[kind]
+    train_number_of = TRAIN_NUMBER_OF[kind]
+    listing = FETCHERS[kind](client, headers, config.ADMIN_LISTING_SAMPLE_SIZE,
+                             lambda entry: api_admin.is_deletable(train_number_of(entry), hs))
+    return api_admin.deletion_candidates((listing or {}).get("data"), train_number_of)
+
+
+def _refresh_loop(client):
+    """Background greenlet rebuilding the snapshot at ADMIN_SNAPSHOT_REFRESH_INTERVAL."""
+    global current
+    while True:
+        gevent.sleep(config.ADMIN_SNAPSHOT_REFRESH_INTERVAL)
+        try:
+            current = load(client, catalog.admin_headers(client), previous=current)
+        except Exception as e:
+            logging.warning(f"Admin snapshot refresh failed: {e!r}")
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Load the snapshot before users are spawned (workers and local mode only)."""
+    global current, _refresh_greenlet
+    if not config.ADMIN_SNAPSHOT_ENABLED or isinstance(environment.runner, MasterRunner):
+        return
+    client = FastHttpSession(environment, base_url=environment.host, user=None,
+                             network_timeout=config.NETWORK_TIMEOUT,
+                             connection_timeout=config.CONNECTION_TIMEOUT)
+    tracing.wrap(client)
+    try:
+        current = load(client, catalog.admin_headers(client), previous=current)
+        logging.info("Admin snapshot: " + ", ".join(f"{len(current.data(name))} {name}" for name in FETCHERS))
+    except Exception as e:
+        logging.warning(f"Admin snapshot load failed, admin users fetch their own listings: {e!r}")
+    if _refresh_greenlet is None:
+        _refresh_greenlet = gevent.spawn(_refresh_loop, client)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    global _refresh_greenlet
+    if _refresh_greenlet is not None:
+        _refresh_greenlet.kill(block=False)
+        _refresh_greenlet = None
@@ -0,0 +1,239 @@
+"""
+Post-Run Analysis for Train-Ticket Load Testing
+
+Turns the per-request log of a run (test_log.csv, see LOG_ALL_REQUESTS) into
+per-endpoint and per-window latency percentiles, and compares two runs with a
+regression verdict per endpoint for release gating.
+
+The log is read in chunks of ANALYSIS_CHUNK_SIZE rows (memory-mapped) and each
+chunk is reduced right away to request and error counts per endpoint, window
+and response time bucket, rounded like Locust's own histograms. Percentiles are
+then computed on these counts with vectorized cumulative sums, so logs of any
+size fit in memory. Journey, step and other synthetic entries are left out;
+"_spawning" entries and the first --skip seconds (the warmup) can be dropped.
+
+With --baseline, every endpoint with ANALYSIS_MIN_REQUESTS requests in both
+runs is compared on each of ANALYSIS_COMPARE_PERCENTILES and on its error rate.
+ANALYSIS_BOOTSTRAP_RESAMPLES resamples of both histograms give the
+ANALYSIS_CONFIDENCE confidence interval of the relative change:
+
+    regression     the whole interval is above +ANALYSIS_TOLERANCE
+                   (error rate: above +ANALYSIS_ERROR_TOLERANCE, absolute)
+    improvement    the whole interval is below -ANALYSIS_TOLERANCE
+    unchanged      the whole interval is within +/-ANALYSIS_TOLERANCE
+    inconclusive   otherwise: more requests are needed to tell
+
+An endpoint takes its worst verdict; any regression makes the run exit with
+status 1.
+
+Usage:
+    python analyze.py test_log.csv --skip 120 --windows windows.csv
+    python analyze.py test_log.csv --baseline previous/test_log.csv --output analysis.json
+"""
+
+import argparse
+import json
+import math
+import sys
+
+import numpy as np
+import pandas as pd
+
+import capacity
+import config
+import journeys
+
+COLUMNS = ["request_type", "name", "response_time", "error", "start_time"]
+DTYPES = {"request_type": "category", "name": "category", "response_time": "float64", "error": "int8",
+          "start_time": "float64"}
+
+# Verdicts from best to worst; an endpoint takes the worst of its metrics
+VERDICTS = ["unchanged", "improvement", "inconclusive", "regression"]
+
+
+def bucket(response_times):
+    """Response times (ms) rounded like Locust's response time histograms."""
+    return np.select([response_times < 100, response_times < 1000, response_times < 10000],
+                     [np.round(response_times), np.round(response_times, -1), np.round(response_times, -2)],
+                     np.round(response_times, -3))
+
+
+def load(path, window, skip=0, include_spawning=False):
+    """Requests and errors per (endpoint, window start, response time bucket) of a request log."""
+    parts = []
+    started = None
+    for chunk in pd.read_csv(path, sep=";", usecols=COLUMNS, dtype=DTYPES, memory_map=True,
+                             chunksize=config.ANALYSIS_CHUNK_SIZE):
+        chunk = chunk[~chunk["request_type"].isin(journeys.METRIC_REQUEST_TYPES)]
+        if not len(chunk):
+            continue
+        # Rows are logged on completion: the first chunk holds the start of the run
+        if started is None:
+            started = chunk["start_time"].min()
+        names = chunk["name"].cat.categories
+        if not include_spawning:
+            spawning = [name for name in names if name.split("@", 1)[0].endswith("_spawning")]
+            chunk = chunk[~chunk["name"].isin(spawning)]
+        chunk = chunk[chunk["start_time"] >= started + skip]
+        parts.append(pd.DataFrame({
+            "endpoint": chunk["request_type"].astype(str) + " " + chunk["name"].map(
+                {name: capacity.base_request_name(name) for name in names}).astype(str),
+            "window": (chunk["start_time"] - started) // window * window,
+            "bucket": bucket(chunk["response_time"].to_numpy()),
+            "requests": 1,
+            "errors": chunk["error"],
+        }).groupby(["endpoint", "window", "bucket"], sort=False).sum())
+    if not parts:
+        return pd.DataFrame(columns=["requests", "errors"],
+                            index=pd.MultiIndex.from_tuples([], names=["endpoint", "window", "bucket"]))
+    return pd.concat(parts).groupby(level=["endpoint", "window", "bucket"]).sum().sort_index()
+
+
+def percentiles(counts, by, quantiles):
+    """Requests, error rate and response time percentiles per group of a counts frame."""
+    counts = counts.groupby(level=[*by, "bucket"]).sum()
+    cumulative = counts["requests"].groupby(level=by).cumsum()
+    totals = counts.groupby(level=by)[["requests", "errors"]].sum()
+    table = totals.assign(error_rate=(totals["errors"] / totals["requests"]).round(4))
+    buckets = counts.index.get_level_values("bucket")
+    for q in quantiles:
+        # First bucket whose cumulative count reaches the rank ceil(n * q), like stop_conditions.ranked_value
+        rank = np.ceil(totals["requests"].reindex(counts.index.droplevel("bucket")).to_numpy() * q)
+        reached = pd.Series(buckets, index=counts.index)[cumulative.to_numpy() >= rank]
+        table[f"p{q * 100:g}"] = reached.groupby(level=by).first()
+    return table.drop(columns="errors")
+
+
+# ============================================================================
+# COMPARISON
+# ============================================================================
+
+def histogram(counts, endpoint):
+    """(response time buckets, request counts, errors) of an endpoint over all windows."""
+    by_bucket = counts.loc[endpoint].groupby(level="bucket").sum()
+    return by_bucket.index.to_numpy(), by_bucket["requests"].to_numpy(), int(by_bucket["errors"].sum())
+
+
+def resampled_percentiles(rng, buckets, requests, quantile, resamples):
+    """The quantile of resamples drawn from a response time histogram."""
+    n = int(requests.sum())
+    cumulative = rng.multinomial(n, requests / n, size=resamples).cumsum(axis=1)
+    return buckets[(cumulative >= math.ceil(n * quantile)).argmax(axis=1)]
+
+
+def verdict(low, high, tolerance):
+    if low > tolerance:
+        return "regression"
+    if high < -tolerance:
+        return "improvement"
+    if low >= -tolerance and high <= tolerance:
+        return "unchanged"
+    return "inconclusive"
+
+
+def compare(baseline, candidate, quantiles, seed=None):
+    """Per-endpoint bootstrap comparison of two runs' counts; rows with a verdict each."""
+    rng = np.random.default_rng(seed)
+    resamples, confidence = config.ANALYSIS_BOOTSTRAP_RESAMPLES, config.ANALYSIS_CONFIDENCE
+    tails = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    rows = []
+    endpoints = sorted(set(baseline.index.get_level_values("endpoint")) |
+                       set(candidate.index.get_level_values("endpoint")))
+    for endpoint in endpoints:
+        row = {"endpoint": endpoint, "metrics": {}}
+        runs = [histogram(counts, endpoint) if endpoint in counts.index.get_level_values("endpoint") else None
+                for counts in (baseline, candidate)]
+        if any(run is None or run[1].sum() < config.ANALYSIS_MIN_REQUESTS for run in runs):
+            row["requests"] = [int(run[1].sum()) if run else 0 for run in runs]
+            row["verdict"] = "insufficient data"
+            rows.append(row)
+            continue
+        (base_buckets, base_requests, base_errors), (cand_buckets, cand_requests, cand_errors) = runs
+        row["requests"] = [int(base_requests.sum()), int(cand_requests.sum())]
+        for q in quantiles:
+            base = resampled_percentiles(rng, base_buckets, base_requests, q, resamples)
+            cand = resampled_percentiles(rng, cand_buckets, cand_requests, q, resamples)
+            # 1 ms floor: sub-millisecond baselines would turn jitter into huge relative changes
+            low, high = np.percentile(cand / np.maximum(base, 1) - 1, tails)
+            point = [base_buckets[(base_requests.cumsum() >= math.ceil(base_requests.sum() * q)).argmax()],
+                     cand_buckets[(cand_requests.cumsum() >= math.ceil(cand_requests.sum() * q)).argmax()]]
+            row["metrics"][f"p{q * 100:g}"] = {
+                "baseline": float(point[0]), "candidate": float(point[1]),
+                "change": round(point[1] / max(point[0], 1) - 1, 4),
+                "interval": [round(low, 4), round(high, 4)],
+                "verdict": verdict(low, high, config.ANALYSIS_TOLERANCE)}
+        (base_n, cand_n), base_rate, cand_rate = row["requests"], base_errors / row["requests"][0], \
+            cand_errors / row["requests"][1]
+        low, high = np.percentile(rng.binomial(cand_n, cand_rate, resamples) / cand_n
+                                  - rng.binomial(base_n, base_rate, resamples) / base_n, tails)
+        row["metrics"]["error_rate"] = {
+            "baseline": round(base_rate, 4), "candidate": round(cand_rate, 4),
+            "change": round(cand_rate - base_rate, 4),
+            "interval": [round(low, 4), round(high, 4)],
+            "verdict": verdict(low, high, config.ANALYSIS_ERROR_TOLERANCE)}
+        row["verdict"] = max((metric["verdict"] for metric in row["metrics"].values()), key=VERDICTS.index)
+        rows.append(row)
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'endpoint':45s} {'metric':>10s} {'baseline':>10s} {'current':>10s} {'change':>8s} "
+          f"{'interval':>19s}  verdict")
+    for row in rows:
+        if not row["metrics"]:
+            print(f"{row['endpoint']:45s} {'requests':>10s} {row['requests'][0]:>10} {row['requests'][1]:>10} "
+                  f"{'':>8s} {'':>19s}  {row['verdict']}")
+            continue
+        for name, metric in row["metrics"].items():
+            low, high = metric["interval"]
+            if name == "error_rate":
+                change, interval = f"{metric['change']:+.2%}", f"[{low:+.2%}, {high:+.2%}]"
+            else:
+                change, interval = f"{metric['change']:+.1%}", f"[{low:+.1%}, {high:+.1%}]"
+            print(f"{row['endpoint']:45s} {name:>10s} {metric['baseline']:>10g} {metric['candidate']:>10g} "
+                  f"{change:>8s} {interval:>19s}  {metric['verdict']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a run's request log and compare it with a baseline run")
+    parser.add_argument("log", help="Request log of the run (test_log.csv)")
+    parser.add_argument("--baseline", help="Request log of the baseline run to compare with")
+    parser.add_argument("--window", type=float, default=config.ANALYSIS_WINDOW, help="Seconds per window")
+    parser.add_argument("--skip", type=float, default=0, help="Seconds at the start of each run to leave out")
+    parser.add_argument("--include-spawning", action="store_true", help="Keep the \"_spawning\" entries")
+    parser.add_argument("--percentiles", type=float, nargs="+", default=config.ANALYSIS_COMPARE_PERCENTILES,
+                        help="Percentiles to compare (fractions)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the bootstrap resampling")
+    parser.add_argument("--windows", help="CSV file for the per-window percentiles of the run")
+    parser.add_argument("--output", help="JSON report file")
+    args = parser.parse_args()
+
+    counts = load(args.log, args.window, args.skip, args.include_spawning)
+    summary = percentiles(counts, ["endpoint"], config.ANALYSIS_PERCENTILES)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summary.sort_values("requests", ascending=False).to_string())
+    if args.windows:
+        percentiles(counts, ["endpoint", "window"], config.ANALYSIS_PERCENTILES).to_csv(args.windows)
+        print(f"Per-window percentiles written to {args.windows}")
+    report = {"log": args.log, "window": args.window, "skip": args.skip,
+              "endpoints": json.loads(summary.reset_index().to_json(orient="records"))}
+
+    regressions = []
+    if args.baseline:
+        rows = compare(load(args.baseline, args.window, args.skip, args.include_spawning), counts,
+                       args.percentiles, args.seed)
+        print()
+        print_comparison(rows)
+        regressions = [row["endpoint"] for row in rows if row["verdict"] == "regression"]
+        report.update(baseline=args.baseline, comparison=rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
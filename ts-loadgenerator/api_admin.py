@@ -6,28 +6,34 @@ travel route management, order processing, and system configuration.
 Functions require admin authentication and handle data validation.
 """
 
-import random
+import time
 from datetime import datetime, timedelta
 import pandas as pd
+from locust import events
+import assets
+import journeys
+import seeding
+import streaming
 import utils
 import config
 
+# High-speed train number prefixes (G/D series)
+HS_TRAIN_TYPES = ("G", "D")
+
 
 
 def home(client, headers=None):
-    """Load administrative homepage and dashboard interface."""
-    client.get("/admin.html", name=utils.get_name_suffix("admin_home"), headers=headers)
+    """Load administrative homepage and dashboard interface with its assets."""
+    assets.load_page(client, "/admin.html", "admin_home", headers=headers)
 
 
 ''' --------- User --------- '''
 
-def login(client):
+def login(client, user_name="admin", password="222222"):
     """
-    Authenticate admin user with default credentials (admin/222222).
+    Authenticate admin user, by default with the admin credentials (admin/222222).
     Returns (user_id, token) for authenticated admin session.
     """
-    user_name = "admin"
-    password = "222222"
     headers = {"Accept": "application/json", "Content-Type": "application/json"}
     body = {"username": user_name, "password": password}
     response = client.post(url="/api/v1/users/login", headers=headers, json=body, context=body,
@@ -60,9 +66,9 @@ def create_random_user(client, headers):
     """Create user account with randomized test data for load testing scenarios."""
     body = {"userName": utils.get_random_string(),
             "password": utils.get_random_string(),
-            "gender": int(random.random()),
+            "gender": int(seeding.rng().random()),
             "email": utils.get_random_string(),
-            "documentType": int(random.random()),
+            "documentType": int(seeding.rng().random()),
             "documentNum": utils.get_random_string()}
     response = client.post(url='/api/v1/adminuserservice/users', name='admin_add_random_user',
                           headers=headers, json=body, context=body)
@@ -72,9 +78,16 @@ def create_random_user(client, headers):
 
 ''' --------- Travel --------- '''
 
-def get_all_travels(client, headers=None):
-    """Retrieve all travel routes and schedules for administrative management."""
-    response = client.get(url="/api/v1/admintravelservice/admintravel", headers=headers,
+def get_all_travels(client, headers=None, sample=None, predicate=None):
+    """
+    Retrieve all travel routes and schedules for administrative management.
+    With sample=k only k random travels (matching predicate) are kept, see streaming.py.
+    """
+    url = "/api/v1/admintravelservice/admintravel"
+    if sample and config.ADMIN_LISTING_STREAMING:
+        return streaming.sample_listing(client, url, utils.get_name_suffix("admin_get_all_travels"), sample,
+                                        headers=headers, predicate=predicate)
+    response = client.get(url=url, headers=headers,
                           name=utils.get_name_suffix("admin_get_all_travels"))
     response_as_json = utils.get_json_from_response(response)
     return response_as_json
@@ -87,11 +100,11 @@ def update_travel(client, trip, headers=None):
     """
     trip_id = f'{trip["trip"]["tripId"]["type"]}{trip["trip"]["tripId"]["number"]}'
     x = pd.to_datetime(trip["trip"]["startTime"])
-    starting_time = x + timedelta(hours=random.choice([-1, +1]))
+    starting_time = x + timedelta(hours=seeding.rng().choice([-1, +1]))
 
     # Use the exact date format from InitData.java
     start_time_str = starting_time.strftime("%Y-%m-%d %H:%M:%S")
-    end_time = starting_time + timedelta(hours=random.randint(2, 8))
+    end_time = starting_time + timedelta(hours=seeding.rng().randint(2, 8))
     end_time_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
 
     # Safely extract fields with fallbacks using real InitData patterns
@@ -114,18 +127,19 @@ def update_travel(client, trip, headers=None):
     return response_as_json
 
 
-def create_travel(client, route, hs=True, headers=None):
+def create_travel(client, route, hs=True, headers=None, number=None):
     """
     Create new travel route using real InitData.java patterns for validation.
     Supports both high-speed (G/D series) and regular trains (Z/T/K series).
-    Trip numbers use 2000-4000 range for load testing.
+    Trip numbers use 2000-4000 range for load testing unless a number is given,
+    in which case the train type (and thus the trip ID) is derived from it deterministically.
     """
-    if hs:
-        train_type_id = random.choice(config.HS_TRAIN_TYPE_ID)
+    train_type_ids = config.HS_TRAIN_TYPE_ID if hs else config.OTHER_TRAIN_TYPE_ID
+    if number is None:
+        train_type_id = seeding.rng().choice(train_type_ids)
+        number = seeding.rng().randint(2000, 4000)
     else:
-        train_type_id = random.choice(config.OTHER_TRAIN_TYPE_ID)
-
-    number = random.randint(2000, 4000)
+        train_type_id = train_type_ids[number % len(train_type_ids)]
 
     # Use the exact date format from InitData.java: "2013-05-04 09:00:00"
     start_time_str = "2013-05-04 09:00:00"
@@ -138,7 +152,7 @@ def create_travel(client, route, hs=True, headers=None):
         intermediate_station = "suzhou"  # Single station, not comma-separated
         terminal_station = "taiyuan"
         # Use actual route IDs from ts-travel-service InitData
-        route_id = random.choice([
+        route_id = seeding.rng().choice([
             "92708982-77af-4318-be25-57ccb0ff69ad",
             "aefcef3f-3f42-46e8-afd7-6cb2a928bd3d",
             "a3f256c1-0e43-4f7d-9c21-121bf258101f",
@@ -146,14 +160,14 @@ def create_travel(client, route, hs=True, headers=None):
             "f3d4d4ef-693b-4456-8eed-59c0d717dd08"
         ])
         # Use actual train type names from InitData
-        train_type_name = random.choice(["GaoTieOne", "GaoTieTwo", "DongCheOne"])
+        train_type_name = seeding.rng().choice(["GaoTieOne", "GaoTieTwo", "DongCheOne"])
     else:
         # Regular train pattern (Z/T/K series)
         start_station = "shanghai"
         intermediate_station = "nanjing"  # Single station, not comma-separated
         terminal_station = "beijing"
         # Use actual route IDs from ts-travel2-service InitData
-        route_id = random.choice([
+        route_id = seeding.rng().choice([
             "0b23bd3e-876a-4af3-b920-c50a90c90b04",
             "9fc9c261-3263-4bfa-82f8-bb44e06b2f52",
             "d693a2c5-ef87-4a3c-bef8-600b43f62c68",
@@ -161,7 +175,7 @@ def create_travel(client, route, hs=True, headers=None):
             "1367db1f-461e-4ab7-87ad-2bcc05fd9cb7"
         ])
         # Use actual train type names from InitData
-        train_type_name = random.choice(["ZhiDa", "TeKuai", "KuaiSu"])
+        train_type_name = seeding.rng().choice(["ZhiDa", "TeKuai", "KuaiSu"])
 
     # Handle route parameter - use from routes if available, otherwise use default
     if route and isinstance(route, dict) and "id" in route:
@@ -185,72 +199,126 @@ def create_travel(client, route, hs=True, headers=None):
 
 
 def delete_travel(client, travel_id, headers=None):
-    """Delete travel route by ID. Used for route cleanup and test data management."""
-    response = client.post(url=f"/api/v1/admintravelservice/admintravel/{travel_id}", headers=headers,
-                           name=utils.get_name_suffix("admin_delete_travel"))
+    """Delete travel route by trip ID (e.g. "G2345"). Used for route cleanup and test data management."""
+    response = client.delete(url=f"/api/v1/admintravelservice/admintravel/{travel_id}", headers=headers,
+                             name=utils.get_name_suffix("admin_delete_travel"))
     response_as_json = utils.get_json_from_response(response)
     return response_as_json
 
 
-def delete_random_travel(client, travels, hs=True, headers=None):
+def travel_train_number(travel):
+    """Trip ID string (e.g. "G1234") of an admin travel listing entry."""
+    trip_id = travel["trip"]["tripId"]
+    return f'{trip_id["type"]}{trip_id["number"]}' if isinstance(trip_id, dict) else str(trip_id)
+
+
+def order_train_number(order):
+    """Train number (e.g. "G1234") of an order."""
+    return order.get("trainNumber") or ""
+
+
+def is_deletable(train_number, hs):
     """
-    Safely delete random travel with train type filtering and ID constraints.
-    Only deletes trips with numbers >= 2000 to protect production data.
-    Returns None if no suitable travel found after 20 iterations.
+    Deletion rule for load-test data: the train class must match and the number must be
+    within ADMIN_DELETE_MIN_NUMBER-ADMIN_DELETE_MAX_NUMBER (the numbers load tests create),
+    which protects the InitData trips, real customer orders and the seeded dataset.
     """
-    travel = random.choice(travels)
-    trip_id = travel["trip"]["tripId"]
-    iteration = 0
-    if hs:
-        while not ((trip_id['type'] == 'D' or trip_id['type'] == 'G') and (int(trip_id['number']) >= 2000)):
-            travel = random.choice(travels)
-            trip_id = travel["trip"]["tripId"]
-            if iteration >= 20:
-                print("No trip to delete hs")
-                return None
-            iteration += 1
-    else:
-        while not (not (trip_id['type'] == 'D' or trip_id['type'] == 'G') and (int(trip_id['number']) >= 2000)):
-            travel = random.choice(travels)
-            trip_id = travel["trip"]["tripId"]
-            if iteration >= 20:
-                print("No trip to delete other")
-                return None
-            iteration += 1
-    return delete_travel(client, f'{travel["trip"]["tripId"]}{travel["trip"]["number"]}', headers=headers)
+    if not train_number or train_number.startswith(HS_TRAIN_TYPES) != hs or not train_number[1:].isdigit():
+        return False
+    return config.ADMIN_DELETE_MIN_NUMBER <= int(train_number[1:]) <= config.ADMIN_DELETE_MAX_NUMBER
+
+
+def deletion_candidates(entries, train_number_of):
+    """Index the entries that may be deleted by train class: {hs: [entry, ...]}, built once per listing."""
+    candidates = {True: [], False: []}
+    for entry in entries or []:
+        try:
+            train_number = train_number_of(entry)
+        except (KeyError, TypeError):
+            continue
+        for hs in (True, False):
+            if is_deletable(train_number, hs):
+                candidates[hs].append(entry)
+    return candidates
+
+
+def claim_candidate(candidates, hs):
+    """
+    Remove and return a random candidate of the train class in O(1) (swap with the last one),
+    so no other user deletes the same entry; None if there is none.
+    """
+    pool = candidates.get(hs) or []
+    if not pool:
+        return None
+    index = seeding.rng().randrange(len(pool))
+    pool[index], pool[-1] = pool[-1], pool[index]
+    return pool.pop()
+
+
+def report_no_candidate(kind, hs):
+    """Count a delete that had no eligible entry as a NO_CANDIDATE stats entry (not a failure)."""
+    if not config.ADMIN_NO_CANDIDATE_METRIC:
+        return
+    events.request.fire(request_type=journeys.NO_CANDIDATE_REQUEST_TYPE,
+                        name=utils.get_name_suffix(f"admin_delete_{kind}_{'hs' if hs else 'other'}"),
+                        response_time=0, response_length=0, response=None, context={}, exception=None,
+                        start_time=time.time(), url=None)
+
+
+def delete_random_travel(client, candidates, hs=True, headers=None):
+    """
+    Safely delete a random travel of the given train class from a deletion_candidates index.
+    Only trips numbered ADMIN_DELETE_MIN_NUMBER-ADMIN_DELETE_MAX_NUMBER are candidates, protecting production data.
+    Returns None (and reports a NO_CANDIDATE entry) if there is no suitable travel.
+    """
+    travel = claim_candidate(candidates, hs)
+    if travel is None:
+        report_no_candidate("travel", hs)
+        return None
+    return delete_travel(client, travel_train_number(travel), headers=headers)
 
 
 ''' --------- Order --------- '''
 
-def get_all_orders(client, headers=None):
-    """Retrieve all customer orders for administrative management and monitoring."""
-    response = client.get(url="/api/v1/adminorderservice/adminorder", headers=headers,
+def get_all_orders(client, headers=None, sample=None, predicate=None):
+    """
+    Retrieve all customer orders for administrative management and monitoring.
+    With sample=k only k random orders (matching predicate) are kept, see streaming.py.
+    """
+    url = "/api/v1/adminorderservice/adminorder"
+    if sample and config.ADMIN_LISTING_STREAMING:
+        return streaming.sample_listing(client, url, utils.get_name_suffix("admin_get_all_orders"), sample,
+                                        headers=headers, predicate=predicate)
+    response = client.get(url=url, headers=headers,
                           name=utils.get_name_suffix("admin_get_all_orders"))
     response_as_json = utils.get_json_from_response(response)
     return response_as_json
 
 
-def create_order(client, hs=True, headers=None):
+def create_order(client, hs=True, headers=None, account_id="4d2a46c7-71cb-4cf1-b5bb-b68406d9da6f",
+                 document_number=None, train_number=None):
     """
     Create new order with realistic test data for load testing scenarios.
     Generates orders with random routes, prices, and appropriate train types.
+    Defaults to the fdse_microservice account, a random contact document number and
+    a random train number in the deletable range (see is_deletable).
     """
     start, end = utils.get_random_start_end_stations(hs)
     body = {"boughtDate": f"{str(datetime.now()).replace(' ', 'T')[:-3]}Z",
             "travelDate": 1,
             "travelTime": 2,
-            "accountId": "4d2a46c7-71cb-4cf1-b5bb-b68406d9da6f",
-            "contactsName": f"Contact_{random.randint(1, 10)}",
+            "accountId": account_id,
+            "contactsName": f"Contact_{seeding.rng().randint(1, 10)}",
             "documentType": 1,
-            "contactsDocumentNumber": f"DocumentNumber_{random.randint(1, 10)}",
-            "trainNumber": f"{'G' if hs else 'K'}{random.randint(2000, 4000)}",
+            "contactsDocumentNumber": document_number or f"DocumentNumber_{seeding.rng().randint(1, 10)}",
+            "trainNumber": train_number or f"{'G' if hs else 'K'}{seeding.rng().randint(2000, 4000)}",
             "coachNumber": 5,
             "seatClass": 2,
-            "seatNumber": f"FirstClass-{random.randint(1, 30)}",
+            "seatNumber": f"FirstClass-{seeding.rng().randint(1, 30)}",
             "from": start,
             "to": end,
             "status": 0,
-            "price": str(round(random.random() * 100, 2))}
+            "price": str(round(seeding.rng().random() * 100, 2))}
     response = client.post(url="/api/v1/adminorderservice/adminorder", json=body, headers=headers, context=body,
                            name=utils.get_name_suffix("admin_create_order"))
 
@@ -271,8 +339,8 @@ def modify_price(client, headers=None, price=None):
     body = {"id": price["id"],
             "trainType": price["trainType"],
             "routeId": price["routeId"],
-            "basicPriceRate": random.random(),
-            "firstClassPriceRate": random.random()}
+            "basicPriceRate": seeding.rng().random(),
+            "firstClassPriceRate": seeding.rng().random()}
     response = client.put(url='/api/v1/adminbasicservice/adminbasic/prices', name='admin_modify_price', headers=headers,
                           context=body, json=body)
     response_as_json = utils.get_json_from_response(response)
@@ -281,7 +349,7 @@ def modify_price(client, headers=None, price=None):
 
 def update_order(client, order, headers=None):
     """Update existing order with random price adjustments (±10 units)."""
-    new_price = float(order['price']) + (random.random() * 20 - 10)
+    new_price = float(order['price']) + (seeding.rng().random() * 20 - 10)
     order['price'] = str(round(new_price, 2))
     response = client.put(url='/api/v1/adminorderservice/adminorder', name='admin_update_order', headers=headers,
                           context=order, json=order)
@@ -291,38 +359,24 @@ def update_order(client, order, headers=None):
 
 def delete_order(client, order_id, train_number, headers=None):
     """Delete order by ID and train number with dual parameter validation."""
-    response = client.post(url=f"/api/v1/admintravelservice/admintravel/{order_id}/{train_number}", headers=headers,
-                           name=utils.get_name_suffix("admin_delete_order"))
+    response = client.delete(url=f"/api/v1/adminorderservice/adminorder/{order_id}/{train_number}", headers=headers,
+                             name=utils.get_name_suffix("admin_delete_order"))
     response_as_json = utils.get_json_from_response(response)
     return response_as_json
 
 
-def delete_random_order(client, orders, hs=True, headers=None):
+def delete_random_order(client, candidates, hs=True, headers=None):
     """
-    Safely delete random order with train type filtering and safety constraints.
-    Only deletes orders with train numbers >= 2000 to protect production data.
-    Returns None if no suitable order found after 20 iterations.
+    Safely delete a random order of the given train class from a deletion_candidates index.
+    Only orders with train numbers ADMIN_DELETE_MIN_NUMBER-ADMIN_DELETE_MAX_NUMBER are candidates,
+    protecting customer data.
+    Returns None (and reports a NO_CANDIDATE entry) if there is no suitable order.
     """
-    order = random.choice(orders['data'])
-    train_number = order['trainNumber']
-    iteration = 0
-    if hs:
-        while not ((train_number[0] == 'D' or train_number[0] == 'G') and (int(train_number[1:]) >= 2000)):
-            order = random.choice(orders)
-            train_number = order['trainNumber']
-            if iteration >= 20:
-                print("No trip to delete hs")
-                return None
-            iteration += 1
-    else:
-        while not (not (train_number[0] == 'D' or train_number[0] == 'G') and (int(train_number[1:]) >= 2000)):
-            order = random.choice(orders)
-            train_number = order['trainNumber']
-            if iteration >= 20:
-                print("No trip to delete other")
-                return None
-            iteration += 1
-    return delete_order(client, order['id'], train_number, headers=headers)
+    order = claim_candidate(candidates, hs)
+    if order is None:
+        report_no_candidate("order", hs)
+        return None
+    return delete_order(client, order['id'], order_train_number(order), headers=headers)
 
 
 ''' --------- Route --------- '''
@@ -337,14 +391,29 @@ def get_all_routes(client, headers=None):
 
 ''' --------- Basic --------- '''
 
-def get_all_contacts(client, headers=None):
-    """Retrieve all customer contact records for administrative management."""
-    response = client.get(url='/api/v1/adminbasicservice/adminbasic/contacts', name='admin_get_all_contacts',
+def get_all_contacts(client, headers=None, sample=None, predicate=None):
+    """
+    Retrieve all customer contact records for administrative management.
+    With sample=k only k random contacts (matching predicate) are kept, see streaming.py.
+    """
+    url = '/api/v1/adminbasicservice/adminbasic/contacts'
+    if sample and config.ADMIN_LISTING_STREAMING:
+        return streaming.sample_listing(client, url, 'admin_get_all_contacts', sample,
+                                        headers=headers, predicate=predicate)
+    response = client.get(url=url, name='admin_get_all_contacts',
                           headers=headers)
     response_as_json = utils.get_json_from_response(response)
     return response_as_json
 
 
+def add_contact(client, contact, headers=None):
+    """Create a contact record for any account through the admin interface."""
+    response = client.post(url='/api/v1/adminbasicservice/adminbasic/contacts', name='admin_add_contact',
+                           headers=headers, context=contact, json=contact)
+    response_as_json = utils.get_json_from_response(response)
+    return response_as_json
+
+
 def modify_contact(client, headers=None, contact=None):
     """
     Modify existing contact with randomized document type and phone number updates.
@@ -352,9 +421,9 @@ def modify_contact(client, headers=None, contact=None):
     """
     body = {"id": contact["id"],
             "name": contact["name"],
-            "documentType": int(random.random() * 5),
+            "documentType": int(seeding.rng().random() * 5),
             "documentNumber": contact["documentNumber"],
-            "phoneNumber": f'{contact["phoneNumber"][:-1]}{int(random.random() * 9)}'}
+            "phoneNumber": f'{contact["phoneNumber"][:-1]}{int(seeding.rng().random() * 9)}'}
     response = client.put(url='/api/v1/adminbasicservice/adminbasic/contacts', name='admin_modify_contact',
                           headers=headers, context=body, json=body)
     response_as_json = utils.get_json_from_response(response)
@@ -371,6 +440,15 @@ def get_all_stations(client, headers=None):
     return response_as_json
 
 
+def add_station(client, name, stay_time=5, headers=None):
+    """Create a railway station with the given name and stop duration (minutes)."""
+    body = {"name": name, "stayTime": stay_time}
+    response = client.post(url='/api/v1/adminbasicservice/adminbasic/stations', name='admin_add_station',
+                           headers=headers, context=body, json=body)
+    response_as_json = utils.get_json_from_response(response)
+    return response_as_json
+
+
 ''' --------- Trains --------- '''
 
 def get_all_trains(client, headers=None):
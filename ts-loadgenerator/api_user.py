@@ -6,19 +6,20 @@ payment, and order management workflows. Supports both anonymous and
 authenticated contexts with proper error handling.
 """
 
-import random
+import assets
+import fanout
+import order_state
+import seeding
 import utils
 from datetime import datetime, timedelta
 import config
 
 
-def login(client):
+def login(client, user_name="fdse_microservice", password="111111"):
     """
-    Authenticate user with default test credentials (fdse_microservice/111111).
+    Authenticate user, by default with the test credentials (fdse_microservice/111111).
     Returns (user_id, token) for authenticated session.
     """
-    user_name = "fdse_microservice"
-    password = "111111"
     headers = {"Accept": "application/json", "Content-Type": "application/json"}
     body = {"username": user_name, "password": password}
     response = client.post(url="/api/v1/users/login", headers=headers, context=body, json=body,
@@ -31,23 +32,22 @@ def login(client):
 
 
 def home(client):
-    """Load main application homepage for anonymous or authenticated users."""
-    client.get("/index.html", name=utils.get_name_suffix("home"))
-    pass
+    """Load main application homepage and its assets for anonymous or authenticated users."""
+    assets.load_page(client, "/index.html", "home")
 
 
 def client_login_page(client):
-    """Load client login page interface for user authentication."""
-    client.get("/client_login.html", name=utils.get_name_suffix("client_login_page"))
+    """Load client login page interface and its assets for user authentication."""
+    assets.load_page(client, "/client_login.html", "client_login_page")
 
 
-def search_travel(client, from_station, to_station, hs=True, logged=True, headers=None):
+def search_travel(client, from_station, to_station, hs=True, logged=True, headers=None, departure_date=None):
     """
     Search for available train trips with service routing based on train type.
     Routes to travelservice (HS) or travel2service (regular trains).
     Supports both anonymous and authenticated contexts.
     """
-    departure_date = utils.get_departure_date()
+    departure_date = departure_date or utils.get_departure_date()
     body = {"startingPlace": from_station, "endPlace": to_station, "departureTime": departure_date}
 
     if hs:
@@ -109,12 +109,12 @@ def book(client, user_id, trip_id="D1345", from_station="Shang Hai", to_station=
     def api_call_ticket(consign=False):
         body = {"accountId": user_id, "contactsId": contact_id, "tripId": trip_id, "seatType": "2",
                 "date": departure_date, "from": from_station, "to": to_station,
-                "assurance": random.choice(config.ASSURANCE_TYPES), "foodType": 1,
+                "assurance": seeding.rng().choice(config.ASSURANCE_TYPES), "foodType": 1,
                 "foodName": "Bone Soup", "foodPrice": 2.5, "stationName": "", "storeName": ""}
         if consign:
             body["consigneeName"] = utils.get_random_string(10)
             body["consigneePhone"] = utils.get_random_string(10)
-            body["consigneeWeight"] = int(random.random() * 50)
+            body["consigneeWeight"] = int(seeding.rng().random() * 50)
 
         if hs:
             response = client.post(url="/api/v1/preserveservice/preserve", json=body, headers=headers, context=body,
@@ -125,10 +125,9 @@ def book(client, user_id, trip_id="D1345", from_station="Shang Hai", to_station=
                                    name=utils.get_name_suffix("preserve_ticket_other"))
         return response
 
-    contact_id = api_call_contacts()
-    api_call_food()
-    api_call_insurance()
-    api_call_ticket(random.choice([True, False]))
+    # The booking page loads contacts, food and assurance options concurrently
+    contact_id, _, _ = fanout.gather([api_call_contacts, api_call_food, api_call_insurance], name="book_options")
+    api_call_ticket(seeding.rng().choice([True, False]))
 
 
 def get_all_orders(client, user_id, hs=True, headers=None):
@@ -151,12 +150,11 @@ def get_all_orders(client, user_id, hs=True, headers=None):
 
 
 def get_last_order(client, user_id, expected_status, hs=True, headers=None):
-    """Find first order with specific status for order operations (payment, cancellation, etc.)."""
-    data = get_all_orders(client, user_id, hs, headers)
-    for entry in data:
-        if entry["status"] == expected_status:
-            return entry
-    return None
+    """
+    Find first order with specific status for order operations (payment, cancellation, etc.).
+    Looked up in the client-side order state, which only refreshes when stale or due.
+    """
+    return order_state.book_for(user_id).find(client, headers, (expected_status,), hs=hs)
 
 
 def get_last_order_id(client, user_id, expected_status, hs=True, headers=None):
@@ -175,9 +173,10 @@ def pay(client, user_id, trip_id="D1345", hs=True, headers=None):
     Locates BOOKED order and submits payment, updating status to PAID.
     Raises exception if no booked orders available.
     """
-    order_id = get_last_order_id(client, user_id, config.TICKET_STATUS_BOOKED, hs=hs, headers=headers)
-    if order_id == None:
+    order = get_last_order(client, user_id, config.TICKET_STATUS_BOOKED, hs=hs, headers=headers)
+    if order == None:
         raise Exception("Weird... There is no order to pay.")
+    order_id = order["id"]
 
     def api_call_pay(headers):
         body = {"orderId": order_id, "tripId": trip_id}
@@ -187,7 +186,8 @@ def pay(client, user_id, trip_id="D1345", hs=True, headers=None):
 
         return utils.get_json_from_response(response)
 
-    api_call_pay(headers=headers)
+    result = api_call_pay(headers=headers)
+    order_state.book_for(user_id).apply(order, config.TICKET_STATUS_PAID, result)
 
 
 def cancel(client, user_id, hs=True, headers=None):
@@ -196,9 +196,10 @@ def cancel(client, user_id, hs=True, headers=None):
     Locates BOOKED order and processes refund before final cancellation.
     Raises exception if no booked orders available.
     """
-    order_id = get_last_order_id(client, user_id, config.TICKET_STATUS_BOOKED, hs, headers)
-    if order_id is None:
+    order = get_last_order(client, user_id, config.TICKET_STATUS_BOOKED, hs, headers)
+    if order is None:
         raise Exception("Weird... There is no order to cancel.")
+    order_id = order["id"]
 
     def api_call_cancel_refund():
         response = client.get(url=f"/api/v1/cancelservice/cancel/refound/{order_id}",
@@ -211,7 +212,8 @@ def cancel(client, user_id, hs=True, headers=None):
         return utils.get_json_from_response(response)
 
     api_call_cancel_refund()
-    api_call_cancel()
+    result = api_call_cancel()
+    order_state.book_for(user_id).apply(order, config.TICKET_STATUS_CANCELLED, result)
 
 
 def get_travel_plan(client, from_station, to_station):
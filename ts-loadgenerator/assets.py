@@ -0,0 +1,281 @@
+"""
+Static Assets and HTTP Caching for Train-Ticket Load Testing
+
+A page of ts-ui-dashboard is more than its HTML document: the browser also
+loads the scripts, stylesheets and images the page references and re-validates
+them with the ETag and Last-Modified validators nginx sends. load_page() fetches
+a document together with the assets listed for it in PAGE_ASSETS (or in the
+JSON manifest ASSET_MANIFEST_FILE) through a per-user browser cache:
+
+    fresh entry           no request (Cache-Control max-age, or 10% of the
+                          age of Last-Modified when there is none, as browsers do)
+    stale entry           conditional request (If-None-Match / If-Modified-Since),
+                          answered with 304 Not Modified when unchanged
+    no entry / no-store   full request
+
+Assets are loaded concurrently like a browser does (see fanout.py). Each user
+starts as a cold visitor (empty cache) or, with probability
+ASSET_WARM_VISITOR_RATIO, as a warm visitor whose cache holds the validators of
+a visit ASSET_WARM_CACHE_AGE seconds ago. Cache hits, 304s and full responses
+are counted per worker and logged at the end of the test.
+
+Asset loading is opt-in (ASSETS_ENABLED): it adds 13-19 requests to every page
+load and so changes the request mix and requests/s of existing test setups.
+
+Regenerate the manifest after UI changes with:
+    python assets.py ../ts-ui-dashboard/static > assets.json
+"""
+
+import argparse
+import email.utils
+import json
+import logging
+import os
+import re
+import sys
+import time
+import weakref
+from collections import Counter
+
+from locust import events
+
+import config
+import fanout
+import seeding
+import utils
+
+# Scripts, stylesheets and images referenced by the pages of ts-ui-dashboard/static
+PAGE_ASSETS = {
+    "/index.html": [
+        "/css/bootstrap.css", "/css/bootstrap-theme.css", "/css/style.css",
+        "/assets/css/amazeui.min.css", "/assets/css/admin.css", "/assets/css/app.css", "/assets/css/client.css",
+        "/assets/i/favicon.png", "/assets/i/app-icon72x72@2x.png", "/assets/img/logo.png",
+        "/js/newrelic-config.js", "/js/newrelic-browser.js",
+        "/assets/js/jquery.min.js", "/assets/js/amazeui.min.js", "/assets/js/app.js", "/assets/js/vue.js",
+        "/assets/js/jquery.shCircleLoader-min.js", "/assets/js/client_common.js", "/assets/js/index.js",
+    ],
+    "/client_login.html": [
+        "/css/bootstrap.css", "/css/bootstrap-theme.css", "/css/style.css",
+        "/assets/css/amazeui.min.css", "/assets/css/admin.css", "/assets/css/app.css",
+        "/assets/i/favicon.png", "/assets/i/app-icon72x72@2x.png", "/assets/img/logo.png",
+        "/assets/js/jquery.min.js", "/assets/js/amazeui.min.js", "/assets/js/app.js", "/assets/js/vue.js",
+        "/assets/js/client_common.js", "/assets/js/client_login.js",
+    ],
+    "/admin.html": [
+        "/assets/css/amazeui.min.css", "/assets/css/amazeui.datetimepicker.css", "/assets/css/admin.css",
+        "/assets/css/app.css", "/assets/i/favicon.png", "/assets/i/app-icon72x72@2x.png", "/assets/img/logo.png",
+        "/assets/js/jquery.min.js", "/assets/js/amazeui.min.js", "/assets/js/amazeui.datetimepicker.min.js",
+        "/assets/js/angular.js", "/assets/js/app.js", "/assets/js/old_index.js",
+    ],
+}
+
+# Local asset references in a page (manifest generation)
+_ASSET_REFERENCE = re.compile(r'<(?:script|img|link)\b[^>]*?\b(?:src|href)="([^"#?]+)"', re.IGNORECASE)
+_ASSET_EXTENSIONS = (".js", ".css", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".woff", ".woff2")
+
+# Fraction of the Last-Modified age a response without Cache-Control stays fresh (RFC 9111, 4.2.2)
+HEURISTIC_FRESHNESS = 0.1
+
+# Outcomes per worker: "hit" (no request), "not_modified" (304), "full" (200)
+counts = Counter()
+
+# Browser cache per HTTP session (one per user)
+_caches = weakref.WeakKeyDictionary()
+
+# Validators last seen per path, shared by the users of a worker to seed warm caches
+_validators = {}
+
+
+def load_manifest():
+    """Assets per page path, from ASSET_MANIFEST_FILE when set."""
+    if not config.ASSET_MANIFEST_FILE:
+        return PAGE_ASSETS
+    with open(config.ASSET_MANIFEST_FILE) as f:
+        return json.load(f)
+
+
+_manifest = load_manifest()
+
+
+def _timestamp(value):
+    """Seconds since the epoch of an HTTP date, or None."""
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers, now):
+    """Seconds a response stays fresh; None if it must not be stored."""
+    cache_control = {}
+    for directive in (headers.get("cache-control") or "").lower().split(","):
+        key, _, value = directive.strip().partition("=")
+        cache_control[key] = value.strip('"')
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    if "max-age" in cache_control:
+        try:
+            return float(cache_control["max-age"])
+        except ValueError:
+            return 0.0
+    last_modified = _timestamp(headers.get("last-modified"))
+    date = _timestamp(headers.get("date")) or now
+    if last_modified is None:
+        return 0.0
+    return max(0.0, (date - last_modified) * HEURISTIC_FRESHNESS)
+
+
+class _Entry:
+    """Validators and expiry of one cached response."""
+
+    __slots__ = ("etag", "last_modified", "lifetime", "expires")
+
+    def __init__(self, etag, last_modified, lifetime, stored):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.lifetime = lifetime
+        self.expires = stored + lifetime
+
+
+class BrowserCache:
+    """Private HTTP cache of one simulated browser, keyed by path."""
+
+    def __init__(self, warm):
+        self.warm = warm
+        self.entries = {}
+
+    def lookup(self, path):
+        """The cached entry of path; warm caches fall back to the worker's known validators."""
+        entry = self.entries.get(path)
+        if entry is None and self.warm and path in _validators:
+            etag, last_modified, lifetime = _validators[path]
+            entry = self.entries[path] = _Entry(etag, last_modified, lifetime,
+                                                time.time() - config.ASSET_WARM_CACHE_AGE)
+        return entry
+
+    def store(self, path, response):
+        """Update the entry of path from a 200 or 304 response."""
+        headers = response.headers or {}
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        previous = self.entries.get(path)
+        if lifetime is None:
+            self.entries.pop(path, None)
+            return
+        etag = headers.get("etag") or (previous.etag if previous and response.status_code == 304 else None)
+        last_modified = headers.get("last-modified") or (
+            previous.last_modified if previous and response.status_code == 304 else None)
+        if etag is None and last_modified is None and lifetime == 0:
+            self.entries.pop(path, None)
+            return
+        self.entries[path] = _Entry(etag, last_modified, lifetime, now)
+        _validators[path] = (etag, last_modified, lifetime)
+
+
+def cache_for(client):
+    """The browser cache of the user owning client, created cold or warm on first use."""
+    cache = _caches.get(client)
+    if cache is None:
+        cache = _caches[client] = BrowserCache(seeding.rng().random() < config.ASSET_WARM_VISITOR_RATIO)
+    return cache
+
+
+def asset_name(path):
+    """Stats name of an asset, grouped by type to keep the stats table small."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".js":
+        return "asset_js"
+    if extension == ".css":
+        return "asset_css"
+    return "asset_image"
+
+
+def fetch(client, cache, path, name, headers=None):
+    """GET path through the cache; returns the response, or None for a cache hit."""
+    entry = cache.lookup(path)
+    if entry is not None and entry.expires > time.time():
+        counts["hit"] += 1
+        return None
+    if entry is not None:
+        conditional = {}
+        if entry.etag:
+            conditional["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            conditional["If-Modified-Since"] = entry.last_modified
+        # Never modify the caller's headers, they are shared by all requests of the user
+        headers = dict(headers or {}, **conditional)
+    with client.get(path, headers=headers, name=utils.get_name_suffix(name), catch_response=True,
+                    **utils.discard_kwargs()) as response:
+        utils.drain_response(response)
+        if response.status_code == 304:
+            # Locust counts any status >= 300 as a failure
+            response.success()
+        if response.status_code in (200, 304):
+            counts["not_modified" if response.status_code == 304 else "full"] += 1
+            cache.store(path, response)
+    return response
+
+
+def load_page(client, path, name, headers=None):
+    """
+    Load a page like a browser: the document (sent with headers), then its assets
+    concurrently. Only the document is requested when ASSETS_ENABLED is off.
+    """
+    cache = cache_for(client)
+    fetch(client, cache, path, name, headers)
+    if not config.ASSETS_ENABLED:
+        return
+    fanout.gather([lambda asset=asset: fetch(client, cache, asset, asset_name(asset))
+                   for asset in _manifest.get(path, ())], name=f"{name}_assets")
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    counts.clear()
+    _validators.clear()
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    total = sum(counts.values())
+    if not total:
+        return
+    logging.info(f"Static assets: {total} loads, {counts['hit'] / total:.1%} cache hits, "
+                 f"{counts['not_modified'] / total:.1%} not modified (304), {counts['full'] / total:.1%} full")
+
+
+# ============================================================================
+# MANIFEST GENERATION
+# ============================================================================
+
+def scan(static_dir, pages):
+    """Local assets referenced by each page in static_dir: {"/page.html": [paths]}."""
+    manifest = {}
+    for page in pages:
+        with open(os.path.join(static_dir, page), encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        assets = []
+        for reference in _ASSET_REFERENCE.findall(html):
+            if "://" in reference or reference.startswith(("//", "/api/")):
+                continue
+            path = "/" + reference.lstrip("./").lstrip("/")
+            if path.lower().endswith(_ASSET_EXTENSIONS) and path not in assets:
+                assets.append(path)
+        manifest["/" + page] = assets
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the static asset manifest from the UI pages")
+    parser.add_argument("static_dir", help="ts-ui-dashboard/static directory")
+    parser.add_argument("pages", nargs="*", default=[p.lstrip("/") for p in PAGE_ASSETS],
+                        help="Pages to scan (default: the pages the personas load)")
+    args = parser.parse_args()
+    json.dump(scan(args.static_dir, args.pages), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
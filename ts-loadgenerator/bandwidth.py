@@ -0,0 +1,258 @@
+"""
+Response Size and Bandwidth Accounting for Train-Ticket Load Testing
+
+Locust reports one average response size per endpoint, measured after
+decompression (and 0 for streamed responses). This module keeps, per endpoint,
+histograms (powers of two) of the bytes on the wire and of the decoded body,
+so that payloads that grow with the data (order refresh, admin listings) and
+services that are network-bound stand out. For uncompressed responses every
+BANDWIDTH_COMPRESSION_SAMPLE_EVERY-th body is gzip-compressed to estimate what
+compression would save.
+
+Workers send their counts to the master with every stats report. At the end of
+the test the master (or the local runner) writes BANDWIDTH_REPORT_FILE with
+sizes, percentiles, bytes/s per endpoint and per service, and logs the
+endpoints with the highest wire bandwidth.
+
+ACCEPT_ENCODING sets the encodings the users offer (Locust always offers
+"gzip, deflate"); "identity" disables compression, "br" adds Brotli.
+"""
+
+import json
+import logging
+import re
+import time
+import weakref
+import zlib
+
+from locust import events
+from locust.runners import WorkerRunner
+
+import capacity
+import config
+import journeys
+
+# Encodings FastHttpSession offers when a request has no Accept-Encoding header
+LOCUST_ACCEPT_ENCODING = "gzip, deflate"
+
+# Service of an API path, e.g. "orderservice" for /api/v1/orderservice/order/refresh
+SERVICE_PATH = re.compile(r"/api/v\d+/([^/]+)")
+
+# Counts per "<method> <name>" since the last report to the master (all counts on the master)
+_endpoints = {}
+
+# Start of the test: the byte counts cover the whole run, including any warmup
+# that steady_state.py splits off or resets in Locust's stats
+_started = None
+
+# Streamed responses whose wire (no Content-Length) or decoded (compressed) size is
+# only known once utils.drain_response or streaming.sample_listing has read them
+_pending = weakref.WeakKeyDictionary()
+
+
+class EndpointBytes:
+    """Byte counts of one endpoint; histograms count sizes by power of two."""
+
+    __slots__ = ("service", "requests", "wire", "wire_count", "decoded", "decoded_count",
+                 "wire_histogram", "decoded_histogram", "sampled", "sampled_gzip")
+
+    def __init__(self, service):
+        self.service = service
+        self.requests = 0
+        self.wire = self.wire_count = 0
+        self.decoded = self.decoded_count = 0
+        self.wire_histogram = {}
+        self.decoded_histogram = {}
+        # Decoded and gzip-compressed bytes of the uncompressed bodies that were sampled
+        self.sampled = self.sampled_gzip = 0
+
+    def add_wire(self, size):
+        self.wire += size
+        self.wire_count += 1
+        bucket = size.bit_length()
+        self.wire_histogram[bucket] = self.wire_histogram.get(bucket, 0) + 1
+
+    def add_decoded(self, size):
+        self.decoded += size
+        self.decoded_count += 1
+        bucket = size.bit_length()
+        self.decoded_histogram[bucket] = self.decoded_histogram.get(bucket, 0) + 1
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def merge(self, data):
+        for key in ("requests", "wire", "wire_count", "decoded", "decoded_count", "sampled", "sampled_gzip"):
+            setattr(self, key, getattr(self, key) + data[key])
+        for key in ("wire_histogram", "decoded_histogram"):
+            histogram = getattr(self, key)
+            for bucket, n in data[key].items():
+                histogram[bucket] = histogram.get(bucket, 0) + n
+
+
+def _endpoint(request_type, name, url):
+    key = f"{request_type} {capacity.base_request_name(name)}"
+    endpoint = _endpoints.get(key)
+    if endpoint is None:
+        match = SERVICE_PATH.search(url)
+        endpoint = _endpoints[key] = EndpointBytes(match.group(1) if match else "ui")
+    return endpoint
+
+
+def _gzip_size(body):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return len(compressor.compress(body)) + len(compressor.flush())
+
+
+@events.request.add_listener
+def on_request(request_type, name, response, url, **kwargs):
+    """Count the wire and decoded size of every HTTP response."""
+    if not config.BANDWIDTH_ACCOUNTING or url is None or response is None \
+            or request_type in journeys.METRIC_REQUEST_TYPES or not getattr(response, "status_code", 0):
+        return
+    endpoint = _endpoint(request_type, name, url)
+    endpoint.requests += 1
+    headers = response.headers or {}
+    encoding = (headers.get("content-encoding") or "identity").lower()
+    length = headers.get("content-length")
+    wire = int(length) if length and length.isdigit() else None
+
+    # The body is only in memory if it was read (not for stream=True requests)
+    body = getattr(response, "_cached_content", None)
+    if body is not None:
+        endpoint.add_decoded(len(body))
+        if wire is None and encoding == "identity":
+            wire = len(body)
+        if encoding == "identity" and body and endpoint.requests % config.BANDWIDTH_COMPRESSION_SAMPLE_EVERY == 1:
+            endpoint.sampled += len(body)
+            endpoint.sampled_gzip += _gzip_size(body)
+    elif wire is not None and encoding == "identity":
+        endpoint.add_decoded(wire)
+
+    if wire is not None:
+        endpoint.add_wire(wire)
+    if body is None and (wire is None or encoding != "identity"):
+        _pending[response] = (endpoint, encoding, wire is not None)
+
+
+def drained(response, size, decoded=None):
+    """
+    Count the wire size of a streamed response read by utils.drain_response or
+    streaming.sample_listing, and its decoded size if it was decompressed.
+    """
+    pending = _pending.pop(response, None)
+    if pending is None:
+        return
+    endpoint, encoding, wire_counted = pending
+    if not wire_counted:
+        endpoint.add_wire(size)
+    if decoded is not None:
+        endpoint.add_decoded(decoded)
+    elif encoding == "identity":
+        endpoint.add_decoded(size)
+
+
+def attach(user):
+    """Make every request of the user offer ACCEPT_ENCODING instead of Locust's default."""
+    if config.ACCEPT_ENCODING == LOCUST_ACCEPT_ENCODING:
+        return
+    request = user.client.request
+
+    def negotiated(method, url, headers=None, **kwargs):
+        if not headers or headers.get("Accept-Encoding") != config.ACCEPT_ENCODING:
+            # Copy: header dicts are shared between requests (FastHttpSession adds to them)
+            headers = dict(headers or {}, **{"Accept-Encoding": config.ACCEPT_ENCODING})
+        return request(method, url, headers=headers, **kwargs)
+
+    user.client.request = negotiated
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def _percentile(histogram, count, fraction):
+    """Upper bound (bytes) of the power-of-two bucket holding the given fraction of responses."""
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= fraction * count:
+            return 2 ** bucket - 1 if bucket else 0
+    return None
+
+
+def summarize(endpoints, duration):
+    """Per endpoint and per service sizes and bandwidth over duration seconds."""
+    rows = []
+    for key, e in endpoints.items():
+        avg_wire = e.wire / e.wire_count if e.wire_count else None
+        avg_decoded = e.decoded / e.decoded_count if e.decoded_count else None
+        wire_rate = avg_wire * e.requests / duration if avg_wire is not None else None
+        # Measured ratio for compressed responses, sampled gzip estimate for uncompressed ones
+        ratio = e.sampled_gzip / e.sampled if e.sampled else (
+            avg_wire / avg_decoded if avg_wire is not None and avg_decoded and avg_wire < avg_decoded else None)
+        rows.append({
+            "endpoint": key,
+            "service": e.service,
+            "requests": e.requests,
+            "avg_wire_bytes": round(avg_wire, 1) if avg_wire is not None else None,
+            "avg_decoded_bytes": round(avg_decoded, 1) if avg_decoded is not None else None,
+            "p50_wire_bytes": _percentile(e.wire_histogram, e.wire_count, 0.5),
+            "p95_wire_bytes": _percentile(e.wire_histogram, e.wire_count, 0.95),
+            "max_wire_bytes": _percentile(e.wire_histogram, e.wire_count, 1.0),
+            "wire_bytes_per_s": round(wire_rate, 1) if wire_rate is not None else None,
+            "decoded_bytes_per_s": round(avg_decoded * e.requests / duration, 1) if avg_decoded is not None else None,
+            "compression_ratio": round(ratio, 3) if ratio is not None else None,
+            "gzip_saving_bytes_per_s": round(wire_rate * (1 - ratio), 1) if e.sampled and wire_rate else None,
+            "wire_histogram": {str(2 ** b - 1 if b else 0): n for b, n in sorted(e.wire_histogram.items())},
+            "decoded_histogram": {str(2 ** b - 1 if b else 0): n for b, n in sorted(e.decoded_histogram.items())},
+        })
+    rows.sort(key=lambda row: row["wire_bytes_per_s"] or 0, reverse=True)
+    services = {}
+    for row in rows:
+        service = services.setdefault(row["service"], {"requests": 0, "wire_bytes_per_s": 0.0})
+        service["requests"] += row["requests"]
+        service["wire_bytes_per_s"] += row["wire_bytes_per_s"] or 0
+    return rows, dict(sorted(services.items(), key=lambda item: item[1]["wire_bytes_per_s"], reverse=True))
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    global _started
+    _started = time.time()
+    _endpoints.clear()
+
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data):
+    """Send the counts since the last report and start over."""
+    if _endpoints:
+        data["bandwidth"] = {key: endpoint.to_dict() for key, endpoint in _endpoints.items()}
+        _endpoints.clear()
+
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data):
+    for key, counts in data.get("bandwidth", {}).items():
+        endpoint = _endpoints.get(key)
+        if endpoint is None:
+            endpoint = _endpoints[key] = EndpointBytes(counts["service"])
+        endpoint.merge(counts)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner) or not _endpoints:
+        return
+    duration = max(time.time() - _started, 1.0)
+    rows, services = summarize(_endpoints, duration)
+    with open(config.BANDWIDTH_REPORT_FILE, "w") as f:
+        json.dump({"duration": round(duration, 1), "accept_encoding": config.ACCEPT_ENCODING,
+                   "services": services, "endpoints": rows}, f, indent=2)
+    total = sum(service["wire_bytes_per_s"] for service in services.values())
+    logging.info(f"Bandwidth: {total / 1024:.1f} KiB/s on the wire, report in {config.BANDWIDTH_REPORT_FILE}")
+    for row in rows[:config.BANDWIDTH_SUMMARY_SIZE]:
+        saving = f", gzip would save {row['gzip_saving_bytes_per_s'] / 1024:.1f} KiB/s" \
+            if row["gzip_saving_bytes_per_s"] else ""
+        logging.info(f"  {row['endpoint']}: {(row['wire_bytes_per_s'] or 0) / 1024:.1f} KiB/s, "
+                     f"avg {row['avg_wire_bytes']} B wire / {row['avg_decoded_bytes']} B decoded{saving}")
@@ -0,0 +1,270 @@
+"""
+Self-Overhead Benchmarks for Train-Ticket Load Testing
+
+Measures the cost of the load generator itself, offline against mock_backend.py,
+so that regressions in the generator are noticed before they cap the load a
+test can drive:
+
+    micro      ns per call of the hot paths (request handler, name suffix,
+               JSON parsing, random strings, listing sampling, task dispatch)
+    behaviors  CPU microseconds per request of each user_behaviors function,
+               run in-process without think times (a behavior that raises is
+               reported as failed instead of measured)
+    memory     KB of resident memory per simulated (idle) user
+    personas   sustainable requests/s per core of each persona and of the
+               full mix, without think times (see calibrate.py)
+
+Micro-benchmarks report the median of BENCH_REPEATS timings. Results are
+compared with a stored baseline (BENCH_BASELINE_FILE); a metric that is worse
+than the baseline by more than --tolerance (BENCH_TOLERANCE) is reported as a
+regression and makes the run exit with status 1, as do failed behaviors. --save stores the results as the new
+baseline. Baselines are machine-specific: compare runs on the same hardware.
+
+Usage:
+    python bench.py                      # all suites, compare with the baseline
+    python bench.py --suites micro behaviors --save
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+from locust import events
+from locust.env import Environment
+from locust.exception import InterruptTaskSet, RescheduleTask, StopUser
+
+import calibrate
+import config
+import locustfile
+import mock_backend
+import streaming
+import utils
+
+SUITES = ["micro", "behaviors", "memory", "personas"]
+
+# Metrics where a higher value is better; all others are costs
+HIGHER_IS_BETTER = {"personas"}
+
+# Exceptions behaviors raise on purpose to steer Locust's task scheduling
+LOCUST_FLOW_CONTROL = (InterruptTaskSet, RescheduleTask, StopUser)
+
+PERSONA_MIXES = {"External": ["External"], "Logged": ["Logged"], "Admin": ["Admin"], "mix": []}
+
+# Locustfile wrapper without think times (personas suite) or with idle users (memory suite)
+WRAPPER = """import config
+config.TT_USER_MIN = config.TT_USER_MAX = {think}
+config.TT_AUTOMATIC_MIN = config.TT_AUTOMATIC_MAX = {automatic}
+from locustfile import *
+"""
+
+
+class FakeResponse:
+    """Minimal stand-in for a FastResponse with a body."""
+
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+        self.text = content.decode()
+
+
+def no_think_time():
+    config.TT_USER_MIN = config.TT_USER_MAX = 0
+    config.TT_AUTOMATIC_MIN = config.TT_AUTOMATIC_MAX = 0
+
+
+def ns_per_call(fn, repeats=None):
+    """Nanoseconds per call of fn: median of BENCH_REPEATS timings of at least 0.2 s each."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    timings = timer.repeat(repeat=repeats or config.BENCH_REPEATS, number=number)
+    return round(statistics.median(timings) / number * 1e9, 1)
+
+
+def make_user(user_class, host):
+    """A started user of user_class (on_start run in the calling greenlet) and its TaskSet."""
+    environment = Environment(events=events, host=host)
+    user_class.host = host
+    user = user_class(environment)
+    user.on_start()
+    behavior = user.tasks[0](user)
+    return user, behavior
+
+
+# ============================================================================
+# SUITES
+# ============================================================================
+
+def bench_micro(host):
+    payloads = mock_backend.build_payloads()
+    trips, listing = payloads["trips"], payloads["admin_orders"]
+    _, behavior = make_user(locustfile.Logged, host)
+
+    def sample_listing():
+        sampler = streaming.ListingSampler(config.ADMIN_LISTING_SAMPLE_SIZE)
+        sampler.feed(listing)
+        return sampler.close()
+
+    return {
+        "my_request_handler": ns_per_call(lambda: locustfile.my_request_handler(
+            "POST", "search_travel_hs_logged", 12.5, 3300, None, {}, None, time.time(), f"{host}/api/v1/x")),
+        "get_name_suffix": ns_per_call(lambda: utils.get_name_suffix("search_travel_hs_logged")),
+        "get_json_from_response": ns_per_call(lambda: utils.json_value(utils.get_json_from_response(
+            FakeResponse(trips)))),
+        "get_random_string": ns_per_call(lambda: utils.get_random_string(10)),
+        "sample_admin_listing": ns_per_call(sample_listing),
+        "task_dispatch": ns_per_call(behavior.get_next_task),
+    }
+
+
+def bench_behaviors(host, iterations, failures):
+    """
+    CPU microseconds per request of each persona behavior, without think times.
+    Behaviors that raise are left out of the results and counted in failures
+    ({name: (failed iterations, first error)}): a broken behavior is not cheap.
+    """
+    no_think_time()
+    requests = [0]
+
+    def count(**kwargs):
+        requests[0] += 1
+
+    events.request.add_listener(count)
+    users = {cls: make_user(cls, host) for cls in (locustfile.External, locustfile.Logged, locustfile.Admin)}
+    results = {}
+    try:
+        for cls, (user, behavior) in users.items():
+            for task in dict.fromkeys(behavior.tasks):
+                requests[0] = 0
+                failed, error = 0, None
+                started = time.process_time()
+                for _ in range(iterations):
+                    try:
+                        task(behavior)
+                    except LOCUST_FLOW_CONTROL:
+                        pass
+                    except Exception as e:
+                        failed += 1
+                        error = error or repr(e)
+                cpu = time.process_time() - started
+                if failed:
+                    failures[task.__name__] = (failed, error)
+                elif requests[0]:
+                    results[task.__name__] = round(cpu / requests[0] * 1e6, 1)
+    finally:
+        events.request.remove_listener(count)
+    return results
+
+
+def write_wrapper(directory, think, automatic):
+    path = os.path.join(directory, "bench_locustfile.py")
+    with open(path, "w") as f:
+        f.write(WRAPPER.format(think=think, automatic=automatic))
+    return path
+
+
+def bench_memory(host, low, high):
+    """KB per idle user from the RSS difference between two user counts."""
+    with tempfile.TemporaryDirectory() as tmp:
+        wrapper = write_wrapper(tmp, 3600, 0)
+        steps = [calibrate.run_step(host, users, 8, spawn_rate=users, locustfile=wrapper) for users in (low, high)]
+    return {"kb_per_user": round((steps[1]["rss_mb"] - steps[0]["rss_mb"]) * 1024 / (high - low), 1)}
+
+
+def bench_personas(host, user_steps, seconds, cpu_limit):
+    """Sustainable requests/s per core of each persona mix, without think times."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        wrapper = write_wrapper(tmp, 0, 0)
+        for mix, user_classes in PERSONA_MIXES.items():
+            steps = calibrate.calibrate(host, user_steps, seconds, cpu_limit, log=lambda line: None,
+                                        user_classes=user_classes, locustfile=wrapper)
+            results[mix] = calibrate.summarize(steps, 0, cpu_limit, 1.0)["rps_per_core"]
+    return results
+
+
+# ============================================================================
+# BASELINE
+# ============================================================================
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline per metric; returns the regressed metric names."""
+    regressions = []
+    print(f"{'metric':45s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for suite, metrics in results.items():
+        for name, value in metrics.items():
+            key = f"{suite}.{name}"
+            base = (baseline.get(suite) or {}).get(name)
+            if not base or value is None:
+                print(f"{key:45s} {'-':>12s} {str(value):>12s} {'':>8s}")
+                continue
+            change = value / base - 1
+            worse = -change if suite in HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            if flag:
+                regressions.append(key)
+            print(f"{key:45s} {base:>12} {value:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the load generator's own overhead")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES, help="Suites to run")
+    parser.add_argument("--host", help="Backend base URL (default: start mock_backend.py)")
+    parser.add_argument("--port", type=int, default=9089, help="Port of the started mock backend")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per behavior (behaviors suite)")
+    parser.add_argument("--users", type=int, nargs="+", default=[5, 10, 20, 40], help="User steps (personas suite)")
+    parser.add_argument("--step-time", type=int, default=15, help="Seconds per step (personas suite)")
+    parser.add_argument("--cpu-limit", type=float, default=90, help="CPU percent ending a persona step series")
+    parser.add_argument("--tolerance", type=float, default=config.BENCH_TOLERANCE,
+                        help="Allowed relative change before a regression")
+    parser.add_argument("--baseline", default=config.BENCH_BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    mock = None
+    host = args.host
+    if host is None:
+        mock = calibrate.start_mock_backend(args.port, 2)
+        host = f"http://127.0.0.1:{args.port}"
+    results = {}
+    failures = {}
+    try:
+        if "micro" in args.suites:
+            results["micro"] = bench_micro(host)
+        if "behaviors" in args.suites:
+            results["behaviors"] = bench_behaviors(host, args.iterations, failures)
+        if "memory" in args.suites:
+            results["memory"] = bench_memory(host, 100, 1000)
+        if "personas" in args.suites:
+            results["personas"] = bench_personas(host, args.users, args.step_time, args.cpu_limit)
+    finally:
+        if mock is not None:
+            mock.terminate()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, (failed, error) in failures.items():
+        print(f"behaviors.{name}: {failed}/{args.iterations} iterations failed, not measured ({error})")
+
+    if failures:
+        print(f"{len(failures)} behaviors failed" + (", baseline not saved" if args.save else ""))
+        sys.exit(1)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(dict(baseline, **results), f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regressions (> {args.tolerance:.0%}): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
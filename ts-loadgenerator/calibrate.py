@@ -0,0 +1,185 @@
+"""
+Load-Generator Calibration for Train-Ticket Load Testing
+
+Measures how much load one Locust process (one core) can drive and derives the
+number of workers a target load needs. The personas are run against
+mock_backend.py (started here unless --host is given) in steps of increasing
+user counts; every step records the achieved requests/s, the CPU usage and the
+resident memory of the Locust process. Stepping stops when the process reaches
+--cpu-limit or throughput stops growing. The report gives requests/s per core,
+memory per simulated user and the workers needed for --target-rps with
+--headroom spare capacity.
+
+Usage:
+    python calibrate.py --target-rps 2000 --users 50 100 200 400 800 --step-time 30
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# A step must improve throughput by this fraction over the previous one to continue
+MIN_STEP_GAIN = 0.05
+
+
+def start_mock_backend(port, processes):
+    """Start mock_backend.py and wait until it accepts connections."""
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, "mock_backend.py"), "--port", str(port),
+                                "--processes", str(processes), "--report-interval", "0"],
+                               stdout=subprocess.DEVNULL, cwd=HERE)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Mock backend did not start on port {port}")
+
+
+def aggregated_rps(stats_csv):
+    """Requests/s of the "Aggregated" row of a Locust stats CSV."""
+    with open(stats_csv) as f:
+        for row in csv.DictReader(f):
+            if row["Name"] == "Aggregated":
+                return float(row["Requests/s"]), int(row["Request Count"]), int(row["Failure Count"])
+    return 0.0, 0, 0
+
+
+def run_step(host, users, seconds, spawn_rate=None, user_classes=(), locustfile="locustfile.py", env=None):
+    """
+    Run one headless Locust process with `users` users for `seconds` and return
+    {"users", "rps", "requests", "failures", "cpu", "rss_mb"}. CPU (percent of one
+    core) and RSS are sampled after the ramp-up.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, "step")
+        spawn_rate = spawn_rate or max(1, users // 5)
+        command = [sys.executable, "-m", "locust", "-f", locustfile, "--headless", "-u", str(users),
+                   "-r", str(spawn_rate), "-t", f"{seconds}s", "-H", host, "--csv", prefix, "--only-summary",
+                   "--loglevel", "WARNING", *user_classes]
+        process = psutil.Popen(command, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env=dict(os.environ, **(env or {})))
+        ramp_up = users / spawn_rate
+        cpu_samples, rss = [], 0
+        try:
+            process.cpu_percent()
+            while process.poll() is None:
+                time.sleep(1)
+                try:
+                    cpu = process.cpu_percent()
+                    if process.create_time() + ramp_up + 2 < time.time():
+                        cpu_samples.append(cpu)
+                        rss = max(rss, process.memory_info().rss)
+                except psutil.NoSuchProcess:
+                    break
+        finally:
+            if process.poll() is None:
+                process.kill()
+        rps, requests, failures = aggregated_rps(f"{prefix}_stats.csv")
+    # Drop the shutdown sample
+    samples = cpu_samples[:-1] or cpu_samples
+    return {"users": users, "rps": round(rps, 1), "requests": requests, "failures": failures,
+            "cpu": round(sum(samples) / len(samples), 1) if samples else None,
+            "rss_mb": round(rss / 2 ** 20, 1)}
+
+
+def calibrate(host, user_steps, seconds, cpu_limit, log=print, **kwargs):
+    """Run the steps until the CPU limit or a throughput plateau; returns the step results."""
+    steps = []
+    for users in user_steps:
+        step = run_step(host, users, seconds, **kwargs)
+        steps.append(step)
+        log(f"{users:6d} users: {step['rps']:9.1f} req/s, CPU {step['cpu']}%, RSS {step['rss_mb']} MB, "
+            f"{step['failures']} failures")
+        if step["cpu"] is not None and step["cpu"] >= cpu_limit:
+            break
+        if len(steps) > 1 and step["rps"] < steps[-2]["rps"] * (1 + MIN_STEP_GAIN):
+            break
+    return steps
+
+
+def summarize(steps, target_rps, cpu_limit, headroom):
+    """
+    Requests/s per core, memory per user and the workers needed for target_rps.
+    When no step completed a request, the rates are None and "error" says why.
+    """
+    usable = [s for s in steps if s["cpu"] and s["cpu"] < cpu_limit] or steps
+    best = max(usable, key=lambda s: s["rps"])
+    first, last = steps[0], steps[-1]
+    mb_per_user = (last["rss_mb"] - first["rss_mb"]) / (last["users"] - first["users"]) \
+        if last["users"] != first["users"] else None
+    summary = {
+        "max_measured_rps": best["rps"],
+        "rps_per_core": None,
+        "rps_per_user": None,
+        "mb_per_user": round(mb_per_user, 3) if mb_per_user is not None else None,
+        "target_rps": target_rps,
+        "workers_needed": None,
+        "users_per_worker": None,
+    }
+    if best["rps"] <= 0:
+        failures = sum(s["failures"] for s in steps)
+        summary["error"] = f"no request completed in any step ({failures} failures)"
+        return summary
+    rps_per_core = best["rps"] * 100 / best["cpu"] if best["cpu"] else best["rps"]
+    summary.update(
+        rps_per_core=round(rps_per_core, 1),
+        rps_per_user=round(best["rps"] / best["users"], 3),
+        workers_needed=math.ceil(target_rps / (rps_per_core * headroom)) if target_rps else None,
+        users_per_worker=math.ceil(rps_per_core * headroom / (best["rps"] / best["users"])))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the load generator against the mock backend")
+    parser.add_argument("--host", help="Backend base URL (default: start mock_backend.py)")
+    parser.add_argument("--port", type=int, default=9089, help="Port of the started mock backend")
+    parser.add_argument("--mock-processes", type=int, default=2, help="Processes of the started mock backend")
+    parser.add_argument("--users", type=int, nargs="+", default=[50, 100, 200, 400, 800], help="User count steps")
+    parser.add_argument("--step-time", type=int, default=30, help="Seconds per step")
+    parser.add_argument("--cpu-limit", type=float, default=90, help="CPU percent of one core that ends stepping")
+    parser.add_argument("--headroom", type=float, default=0.7, help="Fraction of a core's capacity to plan with")
+    parser.add_argument("--target-rps", type=float, default=0, help="Target load to size workers for")
+    parser.add_argument("--output", default="calibration.json", help="JSON report file")
+    parser.add_argument("user_classes", nargs="*", help="Persona classes to run (default: all)")
+    args = parser.parse_args()
+
+    mock = None
+    host = args.host
+    if host is None:
+        mock = start_mock_backend(args.port, args.mock_processes)
+        host = f"http://127.0.0.1:{args.port}"
+    try:
+        steps = calibrate(host, args.users, args.step_time, args.cpu_limit, user_classes=args.user_classes)
+    finally:
+        if mock is not None:
+            mock.terminate()
+
+    summary = summarize(steps, args.target_rps, args.cpu_limit, args.headroom)
+    with open(args.output, "w") as f:
+        json.dump({"host": host, "user_classes": args.user_classes, "steps": steps, "summary": summary}, f, indent=2)
+    if "error" in summary:
+        print(f"Calibration failed: {summary['error']}, see {args.output}")
+        sys.exit(1)
+    print(f"{summary['rps_per_core']} req/s per core, {summary['mb_per_user']} MB per user, "
+          f"{summary['users_per_worker']} users per worker")
+    if args.target_rps:
+        print(f"{args.target_rps:.0f} req/s needs {summary['workers_needed']} workers "
+              f"(at {args.headroom:.0%} of a core each)")
+
+
+if __name__ == "__main__":
+    main()
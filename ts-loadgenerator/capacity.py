@@ -0,0 +1,269 @@
+"""
+Capacity Search Load Shape for Train-Ticket Load Testing
+
+Automates the search for the saturation point ("knee") of the system under test.
+The shape ramps the existing personas step by step, lets each step settle,
+evaluates per-endpoint SLOs over a measurement window and then binary-searches
+between the last passing and the first failing step. Every evaluated step is
+appended to a machine-readable capacity report (throughput/latency curve).
+"""
+
+import json
+import logging
+import math
+import re
+import time
+
+from locust import LoadTestShape
+from locust.stats import calculate_response_time_percentile, diff_response_time_dicts
+
+import config
+import journeys
+
+# Matches SLO keys such as "p5", "p99", "p999", "p99.9" or "p100"
+PERCENTILE_KEY = re.compile(r"^p(\d+)(\.\d+)?$")
+
+# SLO keys that are not percentiles
+SLO_RATE_KEYS = {"error_rate"}
+
+# Percentiles always reported per endpoint, in addition to the ones named in SLOs
+REPORTED_PERCENTILES = ["p50", "p95", "p99"]
+
+
+def base_request_name(name):
+    """
+    Strip the optional "_spawning" and "@timestamp" suffixes added by utils.get_name_suffix
+    and the "_warmup" suffix of split warmup stats (see steady_state.py).
+    """
+    if name.endswith("_warmup"):
+        name = name[:-len("_warmup")]
+    name = name.split("@", 1)[0]
+    if name.endswith("_spawning"):
+        name = name[:-len("_spawning")]
+    return name
+
+
+def percentile_from_key(key):
+    """
+    Convert an SLO key into a fraction: "p5" 0.05, "p95" 0.95, "p100" 1.0, and
+    "p999" or "p99.9" 0.999 (after "p99", further digits are decimals of the
+    percent, as in "p9999"). Raises ValueError for any other key.
+    """
+    match = PERCENTILE_KEY.match(key)
+    if match is None:
+        raise ValueError(f"Unknown percentile key: {key}")
+    digits, decimals = match.groups()
+    if decimals is None and len(digits) > 2 and digits != "100":
+        if not digits.startswith("99"):
+            raise ValueError(f"Ambiguous percentile key: {key} (write it as pNN.N)")
+        digits, decimals = digits[:2], "." + digits[2:]
+    percent = float(digits + (decimals or ""))
+    if percent > 100:
+        raise ValueError(f"Percentile above 100: {key}")
+    # Rounded so that "p99.9" gives exactly 0.999
+    return round(percent / 100, 10)
+
+
+def snapshot_stats(stats, exclude_warmup=False):
+    """
+    Capture cumulative counters per endpoint so a later snapshot can be diffed.
+    Entries with suffixed names are merged under their base name, split warmup
+    entries only unless exclude_warmup is set. "Aggregated" covers real requests
+    only, leaving out synthetic journey/step entries.
+    """
+    snapshot = {}
+
+    def merge(name, entry):
+        requests, failures, response_times = snapshot.get(name, (0, 0, {}))
+        merged = dict(response_times)
+        for response_time, count in entry.response_times.items():
+            merged[response_time] = merged.get(response_time, 0) + count
+        snapshot[name] = (requests + entry.num_requests, failures + entry.num_failures, merged)
+
+    for entry in list(stats.entries.values()):
+        if exclude_warmup and entry.name.endswith("_warmup"):
+            continue
+        merge(base_request_name(entry.name), entry)
+        if entry.method not in journeys.METRIC_REQUEST_TYPES:
+            merge("Aggregated", entry)
+    return snapshot
+
+
+def summarize_window(before, after, duration):
+    """Compute per-endpoint request rate, error rate and percentiles between two snapshots."""
+    summary = {}
+    for name, (requests, failures, response_times) in after.items():
+        old_requests, old_failures, old_response_times = before.get(name, (0, 0, {}))
+        window_requests = requests - old_requests
+        window_failures = failures - old_failures
+        if window_requests <= 0:
+            continue
+        window_times = diff_response_time_dicts(response_times, old_response_times)
+        # Failed requests are counted in num_requests but may lack a response time
+        timed_requests = sum(window_times.values())
+        endpoint = {
+            "requests": window_requests,
+            "failures": window_failures,
+            "rps": round(window_requests / duration, 2),
+            "error_rate": round(window_failures / window_requests, 5),
+        }
+        for key in set(REPORTED_PERCENTILES) | slo_percentile_keys():
+            endpoint[key] = calculate_response_time_percentile(window_times, timed_requests,
+                                                               percentile_from_key(key))
+        summary[name] = endpoint
+    return summary
+
+
+def slo_percentile_keys():
+    """Return all percentile keys (e.g. "p99") referenced by the configured SLOs."""
+    return {key for objectives in config.CAPACITY_SLOS.values() for key in objectives if key not in SLO_RATE_KEYS}
+
+
+def validate_slos():
+    """Raise ValueError for an SLO key that is neither a rate nor a percentile key."""
+    for objectives in config.CAPACITY_SLOS.values():
+        for key in objectives:
+            if key not in SLO_RATE_KEYS:
+                percentile_from_key(key)
+
+
+def evaluate_slos(summary):
+    """
+    Check a window summary against config.CAPACITY_SLOS.
+    Returns a list of human readable violations (empty list means the step passed).
+    """
+    violations = []
+    for name, objectives in config.CAPACITY_SLOS.items():
+        endpoint = summary.get(name)
+        if endpoint is None:
+            # An endpoint that was never exercised cannot be judged; it is not a failure
+            continue
+        for key, limit in objectives.items():
+            value = endpoint["error_rate"] if key == "error_rate" else endpoint.get(key)
+            if value is not None and value > limit:
+                violations.append(f"{name} {key}={value} > {limit}")
+    return violations
+
+
+class CapacitySearchShape(LoadTestShape):
+    """
+    Load shape that finds the maximum sustainable user count and throughput.
+
+    Phase "ramp" multiplies the user count by CAPACITY_GROWTH_FACTOR until a step
+    violates an SLO (or CAPACITY_MAX_USERS is reached). Phase "bisect" then halves
+    the interval between the last passing and first failing step until it is
+    narrower than CAPACITY_RESOLUTION_USERS.
+    """
+
+    def __init__(self):
+        super().__init__()
+        validate_slos()
+        self.phase = "ramp"
+        self.lower = 0          # Highest user count known to pass
+        self.upper = None       # Lowest user count known to fail
+        self.steps = []
+        self.users = 0
+        self.previous_users = 0
+        self.step_started = None
+        self.window_started = None
+        self.window_snapshot = None
+
+    def tick(self):
+        run_time = self.get_run_time()
+
+        if self.phase == "done":
+            return None
+
+        if self.step_started is None:
+            self.start_step(run_time, config.CAPACITY_START_USERS)
+
+        # Ramp-up time for this step is derived from the spawn rate, then the system settles
+        ramp_time = abs(self.users - self.previous_users) / config.CAPACITY_SPAWN_RATE
+        settle_deadline = self.step_started + ramp_time + config.CAPACITY_SETTLE_TIME
+
+        if self.window_snapshot is None and run_time >= settle_deadline:
+            self.window_started = run_time
+            self.window_snapshot = snapshot_stats(self.runner.stats)
+
+        if self.window_snapshot is not None and run_time - self.window_started >= config.CAPACITY_MEASURE_TIME:
+            self.finish_step(run_time)
+            if self.phase == "done":
+                return None
+
+        return self.users, config.CAPACITY_SPAWN_RATE
+
+    def start_step(self, run_time, users):
+        """Begin a new step at the given user count."""
+        self.previous_users = self.users
+        self.users = users
+        self.step_started = run_time
+        self.window_started = None
+        self.window_snapshot = None
+
+    def finish_step(self, run_time):
+        """Evaluate the measurement window, record it and choose the next user count."""
+        duration = run_time - self.window_started
+        summary = summarize_window(self.window_snapshot, snapshot_stats(self.runner.stats), duration)
+        violations = evaluate_slos(summary)
+        passed = not violations
+        aggregated = summary.get("Aggregated", {})
+
+        self.steps.append({
+            "users": self.users,
+            "phase": self.phase,
+            "started_at": round(self.step_started, 1),
+            "measure_duration": round(duration, 1),
+            "rps": aggregated.get("rps", 0.0),
+            "passed": passed,
+            "violations": violations,
+            "endpoints": summary,
+        })
+        logging.info(f"Capacity step {self.users} users: {aggregated.get('rps', 0.0)} rps, "
+                     f"{'PASS' if passed else 'FAIL ' + '; '.join(violations)}")
+
+        if passed:
+            self.lower = max(self.lower, self.users)
+        else:
+            self.upper = self.users if self.upper is None else min(self.upper, self.users)
+
+        next_users = self.next_user_count(passed)
+        if next_users is None:
+            self.phase = "done"
+        self.write_report()
+        if next_users is not None:
+            self.start_step(run_time, next_users)
+
+    def next_user_count(self, passed):
+        """Return the next user count to evaluate, or None once the search has converged."""
+        if self.phase == "ramp":
+            if passed:
+                if self.users >= config.CAPACITY_MAX_USERS:
+                    return None
+                grown = max(self.users + 1, math.ceil(self.users * config.CAPACITY_GROWTH_FACTOR))
+                return min(grown, config.CAPACITY_MAX_USERS)
+            self.phase = "bisect"
+
+        if self.upper is None or self.upper - self.lower <= config.CAPACITY_RESOLUTION_USERS:
+            return None
+        return (self.lower + self.upper) // 2
+
+    def write_report(self):
+        """Write the capacity report; called after every step so interrupted runs keep their data."""
+        passing = [s for s in self.steps if s["passed"]]
+        best = max(passing, key=lambda s: (s["users"], s["rps"])) if passing else None
+        report = {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "converged": self.phase == "done",
+            "slos": config.CAPACITY_SLOS,
+            "max_sustainable_users": best["users"] if best else None,
+            "max_sustainable_rps": best["rps"] if best else None,
+            "first_failing_users": self.upper,
+            "curve": [{"users": s["users"], "rps": s["rps"], "passed": s["passed"],
+                       "p50": s["endpoints"].get("Aggregated", {}).get("p50"),
+                       "p95": s["endpoints"].get("Aggregated", {}).get("p95"),
+                       "p99": s["endpoints"].get("Aggregated", {}).get("p99")}
+                      for s in sorted(self.steps, key=lambda s: s["users"])],
+            "steps": self.steps,
+        }
+        with open(config.CAPACITY_REPORT_FILE, "w") as f:
+            json.dump(report, f, indent=2)
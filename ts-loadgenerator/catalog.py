@@ -0,0 +1,185 @@
+"""
+Route Catalog Index for Train-Ticket Load Testing
+
+Builds an index of valid (start, end, trainType, date) tuples from live system
+data instead of relying on the hand-maintained HS_TRIP_LIST/OTHER_TRIP_LIST.
+On test_start every worker pulls routes and travels once through the admin
+API, shares the resulting index between all of its users and refreshes it
+incrementally in the background (only added/removed trips are re-indexed).
+Search results observed by users update the known availability, so routes
+that return nothing are skipped until the next refresh.
+"""
+
+import logging
+
+import gevent
+from locust import events
+from locust.contrib.fasthttp import FastHttpSession
+from locust.runners import MasterRunner
+
+import api_admin
+import config
+import session_pool
+import tracing
+
+# High-speed trip ID prefixes; everything else is served by ts-travel2-service
+HS_TRIP_TYPES = ("G", "D")
+
+
+class RouteCatalog:
+    """Worker-wide index of bookable station pairs, keyed by (start, end, train_type, date)."""
+
+    def __init__(self):
+        self.entries = {}       # (start, end, train_type, date) -> {"trips": set, "seats": int, "available": bool}
+        self.trip_keys = {}     # trip ID -> index keys it contributes to
+        self.by_pair = {}       # (start, end, date) -> index keys, for observed searches
+        self.pairs = {True: [], False: []}  # hs -> available (start, end) pairs, rebuilt on change
+        self.ready = False
+        self._refresh_greenlet = None
+
+    def index_travel(self, travel):
+        """Add the station pairs served by one admin travel listing entry."""
+        trip_id = api_admin.travel_train_number(travel)
+        route = travel.get("route") or {}
+        stations = route.get("stations") or []
+        train_type = travel.get("trainType") or {}
+        train_type_name = travel["trip"].get("trainTypeName") or train_type.get("name")
+        seats = (train_type.get("economyClass") or 0) + (train_type.get("confortClass") or 0)
+
+        keys = []
+        for i in range(len(stations) - 1):
+            for j in range(i + 1, len(stations)):
+                for date in config.DEPARTURE_DATES:
+                    key = (stations[i], stations[j], train_type_name, date)
+                    entry = self.entries.setdefault(key, {"trips": set(), "seats": 0, "available": True})
+                    entry["trips"].add(trip_id)
+                    entry["seats"] += seats
+                    self.by_pair.setdefault((key[0], key[1], date), set()).add(key)
+                    keys.append(key)
+        self.trip_keys[trip_id] = (keys, seats)
+
+    def unindex_trip(self, trip_id):
+        """Remove a trip that no longer exists from every entry it contributed to."""
+        keys, seats = self.trip_keys.pop(trip_id, ([], 0))
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            entry["trips"].discard(trip_id)
+            entry["seats"] -= seats
+            if not entry["trips"]:
+                del self.entries[key]
+                self.by_pair.get((key[0], key[1], key[3]), set()).discard(key)
+
+    def load(self, client, headers):
+        """Pull routes and travels and apply the difference to the index; returns True on success."""
+        routes = api_admin.get_all_routes(client, headers=headers)
+        travels = api_admin.get_all_travels(client, headers=headers)
+        if not travels or not isinstance(travels.get("data"), list):
+            return False
+        by_id = {api_admin.travel_train_number(t): t for t in travels["data"] if t.get("trip")}
+
+        # Route details may be missing from travel entries; fill them from the route listing
+        route_stations = {r["id"]: r for r in (routes or {}).get("data") or [] if "id" in r}
+        for travel in by_id.values():
+            if not (travel.get("route") or {}).get("stations"):
+                travel["route"] = route_stations.get(travel["trip"].get("routeId"), {})
+
+        for trip_id in set(self.trip_keys) - set(by_id):
+            self.unindex_trip(trip_id)
+        for trip_id in set(by_id) - set(self.trip_keys):
+            self.index_travel(by_id[trip_id])
+
+        # Periodic reloads also clear "no result" marks from observed searches
+        for entry in self.entries.values():
+            entry["available"] = True
+        self.rebuild_pairs()
+        self.ready = any(self.pairs.values())
+        return True
+
+    def rebuild_pairs(self):
+        """Recompute the available (start, end) pairs per train class (new list objects)."""
+        pairs = {True: {}, False: {}}
+        for (start, end, train_type, date), entry in self.entries.items():
+            if entry["available"]:
+                hs = any(t.startswith(HS_TRIP_TYPES) for t in entry["trips"])
+                pairs[hs][(start, end)] = True
+        self.pairs = {hs: list(p) for hs, p in pairs.items()}
+
+    def observe_search(self, hs, start, end, date, results):
+        """
+        Update availability from a live search. An empty result marks the pair
+        unavailable for this class until the next refresh; otherwise the seat
+        count is taken from the remaining seats reported by the search. results
+        is None for failed searches, which leave the catalog unchanged.
+        """
+        if not self.ready or results is None:
+            return
+        matched = [self.entries[key] for key in self.by_pair.get((start, end, date), ())
+                   if any(trip.startswith(HS_TRIP_TYPES) == hs for trip in self.entries[key]["trips"])]
+        if not results:
+            changed = [entry for entry in matched if entry["available"]]
+            for entry in changed:
+                entry["available"] = False
+            if changed:
+                self.rebuild_pairs()
+            return
+        seats = sum((r.get("economyClass") or 0) + (r.get("confortClass") or 0)
+                    for r in results if isinstance(r, dict))
+        for entry in matched:
+            entry["seats"] = seats
+
+    def random_pair(self, hs, choose):
+        """Draw an available (start, end) pair with the given chooser, or None if unknown."""
+        pairs = self.pairs.get(hs)
+        if not self.ready or not pairs:
+            return None
+        return choose(pairs)
+
+    def refresh_loop(self, client):
+        """Background greenlet reloading the catalog at CATALOG_REFRESH_INTERVAL."""
+        while True:
+            gevent.sleep(config.CATALOG_REFRESH_INTERVAL)
+            try:
+                self.load(client, admin_headers(client))
+            except Exception as e:
+                logging.warning(f"Route catalog refresh failed: {e!r}")
+
+
+def admin_headers(client):
+    """Admin headers from the session pool, or a dedicated admin login if the pool is empty."""
+    session = session_pool.admins.acquire()
+    if session is not None:
+        return session.headers
+    _, token = api_admin.login(client)
+    return session_pool.build_headers(token)
+
+
+# Worker-wide catalog shared by all users
+routes = RouteCatalog()
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Load the catalog before users are spawned (workers and local mode only)."""
+    if not config.ROUTE_CATALOG_ENABLED or isinstance(environment.runner, MasterRunner):
+        return
+    client = FastHttpSession(environment, base_url=environment.host, user=None,
+                             network_timeout=config.NETWORK_TIMEOUT,
+                             connection_timeout=config.CONNECTION_TIMEOUT)
+    tracing.wrap(client)
+    try:
+        routes.load(client, admin_headers(client))
+    except Exception as e:
+        logging.warning(f"Route catalog load failed, using configured trip lists: {e!r}")
+    logging.info(f"Route catalog: {len(routes.entries)} entries, "
+                 f"{len(routes.pairs[True])} HS / {len(routes.pairs[False])} other pairs")
+    if routes._refresh_greenlet is None:
+        routes._refresh_greenlet = gevent.spawn(routes.refresh_loop, client)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    if routes._refresh_greenlet is not None:
+        routes._refresh_greenlet.kill(block=False)
+        routes._refresh_greenlet = None
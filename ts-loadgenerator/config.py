@@ -86,12 +86,36 @@ LOG_FLUSH_INTERVAL = 5
 # ============================================================================
 # AUTO-STOP CONFIGURATION
 # ============================================================================
+# Conditions checked by the master (or local runner) on the stats of all
+# workers; the first one met ends the test cleanly (see stop_conditions.py)
 
-# Automatically exit after N requests (disabled for continuous load testing)
+# Automatically stop after N requests in total (disabled for continuous load testing)
 # Useful for batch testing or CI/CD pipelines
 STOP_ON_REQUEST_COUNT = False
 REQUEST_NUMBER_TO_STOP = 200  # Number of requests before auto-stop
 
+# Stop after this many seconds of steady state (of run time when STEADY_STATE_DETECTION
+# is off); None = no limit
+STOP_AFTER_SECONDS = None
+
+# Stop with exit code 1 when more than this fraction of the requests failed; None = no budget
+STOP_ERROR_BUDGET = None
+STOP_ERROR_BUDGET_MIN_REQUESTS = 500  # Requests before the error budget is judged
+
+# Stop once the confidence interval of the STOP_CI_PERCENTILE latency of every endpoint
+# is narrower than this fraction of the percentile (e.g. 0.05); None = off
+STOP_CI_MAX_WIDTH = None
+STOP_CI_PERCENTILE = 0.95
+STOP_CI_CONFIDENCE = 0.95
+STOP_CI_MIN_REQUESTS = 200  # Endpoints with fewer requests are not judged
+
+# Endpoints that must all be settled (base names, e.g. "search_travel_hs_logged");
+# empty = every endpoint with at least STOP_CI_MIN_REQUESTS requests
+STOP_CI_ENDPOINTS = []
+
+# Seconds between evaluations of the stop conditions
+STOP_CHECK_INTERVAL = 5
+
 # ============================================================================
 # TRAIN TYPE IDENTIFIERS
 # ============================================================================
@@ -144,3 +168,444 @@ TICKET_STATUS_EXECUTED = 6   # Passenger boarded train, ticket used
 # Travel insurance types available during booking
 # "0" = No insurance, "1" = Basic travel insurance
 ASSURANCE_TYPES = ["0", "1"]
+
+# ============================================================================
+# CAPACITY SEARCH (Automated knee finder)
+# ============================================================================
+# When enabled, locustfile.py exposes CapacitySearchShape, which overrides
+# -u/-r and drives the personas through a ramp + binary search on user count
+
+CAPACITY_SEARCH = False
+
+# Ramp phase: start here and multiply by the growth factor until an SLO fails
+CAPACITY_START_USERS = 10
+CAPACITY_GROWTH_FACTOR = 2.0
+CAPACITY_MAX_USERS = 5000
+CAPACITY_SPAWN_RATE = 10  # Users started per second when changing steps
+
+# Each step waits for ramp-up + settle time, then measures over a fixed window (seconds)
+CAPACITY_SETTLE_TIME = 30
+CAPACITY_MEASURE_TIME = 60
+
+# Binary search stops once passing and failing user counts are this close
+CAPACITY_RESOLUTION_USERS = 10
+
+# Per-endpoint SLOs evaluated over each measurement window
+# Keys are request names (without suffixes) or "Aggregated"; limits are
+# "pNN" response time percentiles in milliseconds ("p99", "p999" or "p99.9",
+# see capacity.percentile_from_key) and "error_rate" as a fraction
+CAPACITY_SLOS = {
+    "preserve_ticket_hs": {"p99": 1000, "error_rate": 0.01},
+    "Aggregated": {"error_rate": 0.01},
+}
+
+# Machine-readable report with the throughput/latency curve (rewritten after every step)
+CAPACITY_REPORT_FILE = "capacity_report.json"
+
+# ============================================================================
+# JOURNEY METRICS
+# ============================================================================
+# Report multi-step journeys (book_ticket, collect_and_execute, search_and_preserve)
+# as extra "JOURNEY"/"STEP" stats entries with think time subtracted.
+# Abandoned journeys are counted as failures. Note: Locust includes these entries
+# in its "Aggregated" row, so this is disabled by default.
+JOURNEY_METRICS = False
+
+# ============================================================================
+# LOGIN SESSION POOL
+# ============================================================================
+# Worker-level pool of pre-authenticated sessions, warmed before users spawn,
+# to avoid a login storm against ts-auth-service when spawning many users
+
+SESSION_POOL_ENABLED = True
+
+# Fraction of Logged/Admin users that still perform a real login (models auth load)
+SESSION_POOL_REAL_LOGIN_FRACTION = 0.1
+
+# Accounts shared through the pool as (username, password); users are assigned round-robin
+USER_ACCOUNTS = [("fdse_microservice", "111111")]
+ADMIN_ACCOUNTS = [("admin", "222222")]
+
+# ts-auth-service issues JWTs valid for one hour; refresh well before expiry (seconds)
+SESSION_TOKEN_TTL = 3600
+SESSION_REFRESH_MARGIN = 600
+SESSION_REFRESH_CHECK_INTERVAL = 60
+
+# Concurrent logins while warming the pool
+SESSION_POOL_WARM_CONCURRENCY = 20
+
+# ============================================================================
+# TEST-ACCOUNT POOL
+# ============================================================================
+# Pre-provisioned accounts (see account_pool.py) replacing the single shared
+# fdse_microservice account. 0 disables the pool and keeps USER_ACCOUNTS.
+# Accounts are partitioned across workers and assigned to users round-robin.
+ACCOUNT_POOL_SIZE = 0
+ACCOUNT_NAME_PREFIX = "loadtest_user_"
+ACCOUNT_PASSWORD = "111111"
+ACCOUNT_CONTACTS_PER_ACCOUNT = 2
+
+# Upper bound on the order history kept per account; every ACCOUNT_MAX_ORDERS
+# bookings the oldest orders beyond this bound are deleted (None = unbounded)
+ACCOUNT_MAX_ORDERS = 50
+
+# ============================================================================
+# DATASET SEEDING (seed.py)
+# ============================================================================
+# Rows created per unit of scale factor (python seed.py --scale N)
+# Seeded users use ACCOUNT_NAME_PREFIX/ACCOUNT_PASSWORD, so they can serve as the account pool
+SEED_ROWS_PER_SCALE = {
+    "stations": 20,
+    "trips": 100,
+    "users": 1000,
+    "contacts": 2000,
+    "orders": 5000,
+}
+
+# Seeded trips are numbered upwards from here, above the InitData trips (1234-1345) and the
+# trips admin delete behaviors may remove (ADMIN_DELETE_MIN_NUMBER-ADMIN_DELETE_MAX_NUMBER)
+SEED_TRIP_NUMBER_BASE = 10000
+
+# Seconds between progress reports
+SEED_PROGRESS_INTERVAL = 5
+
+# ============================================================================
+# KEY POPULARITY (Workload skew)
+# ============================================================================
+# Popularity model per key dimension (see distributions.py):
+#   {"model": "uniform"}                           - every key equally likely (default)
+#   {"model": "zipf", "s": 1.1}                    - rank given by list order, first key hottest
+#   {"model": "empirical", "file": "weights.json"} - {"key": weight} JSON or "key,weight" CSV
+# Keys: station pairs "start-end" (from HS_TRIP_LIST/OTHER_TRIP_LIST), departure
+# dates, account user names and train numbers
+ROUTE_POPULARITY = {"model": "uniform"}
+DATE_POPULARITY = {"model": "uniform"}
+ACCOUNT_POPULARITY = {"model": "uniform"}
+TRAIN_NUMBER_POPULARITY = {"model": "uniform"}
+
+# Departure dates to draw from (must have trips in the database)
+DEPARTURE_DATES = ["2013-05-04"]
+
+# Train numbers used by booking flows, in popularity rank order. The defaults are the
+# fixed trains of the original flows; to spread the load over more InitData trips use
+# e.g. ["G1234", "G1235", "G1236", "G1237", "D1345"] and ["Z1234", "Z1235", "Z1236", "T1235", "K1345"]
+HS_TRAIN_NUMBERS = ["G1234"]
+OTHER_TRAIN_NUMBERS = ["Z1234"]
+
+# New trains of rebookings, tried in order, when HS_TRAIN_NUMBERS has no other train
+REBOOK_TRAIN_NUMBERS = ["G1235", "G1234"]
+
+# ============================================================================
+# ROUTE CATALOG
+# ============================================================================
+# Build the set of searchable routes from live data (admin routes/travels) at
+# test start instead of HS_TRIP_LIST/OTHER_TRIP_LIST, which remain the fallback
+ROUTE_CATALOG_ENABLED = True
+
+# Seconds between incremental catalog refreshes
+CATALOG_REFRESH_INTERVAL = 300
+
+# ============================================================================
+# CLIENT-SIDE ORDER STATE
+# ============================================================================
+# Behaviors track the orders they pay, cancel, collect and execute locally
+# (see order_state.py) and re-list orders via /order/refresh only when the
+# local view is stale (after a booking or a failed action) or at the
+# reconciliation rate. Disabled = every order lookup performs a full refresh.
+ORDER_STATE_ENABLED = True
+
+# Probability that an order lookup refreshes a train class anyway (0..1)
+ORDER_RECONCILE_RATE = 0.1
+
+# ============================================================================
+# RESPONSE PARSING
+# ============================================================================
+# Parse JSON responses only when a field is read (utils.LazyJson); responses
+# that are thrown away are never decoded. orjson is used when installed.
+LAZY_JSON_PARSING = True
+
+# Request bodies that are never used (static pages, browse-only listings) with
+# stream=True and drain them off the socket without buffering or decompressing.
+# Note: Locust then records response_time up to the response headers and a
+# response_length of 0 for these requests, so this is disabled by default.
+DISCARD_UNUSED_BODIES = False
+
+# ============================================================================
+# ADMIN LISTING SAMPLING
+# ============================================================================
+# Stream the admin order/travel/contact listings and keep only a reservoir sample
+# of this many entries (see streaming.py), so memory per admin user does not grow
+# with the dataset. Note: Locust then records response_time up to the response
+# headers and a response_length of 0 for these listings, so this is disabled by default.
+ADMIN_LISTING_STREAMING = False
+ADMIN_LISTING_SAMPLE_SIZE = 20
+
+# Bytes read from the socket per step while streaming a listing
+LISTING_STREAM_CHUNK_SIZE = 65536
+
+# ============================================================================
+# ADMIN DATA SNAPSHOT
+# ============================================================================
+# Worker-wide snapshot of the routes, travels, prices, contacts and orders
+# listings (see admin_snapshot.py), shared by all Admin users instead of each
+# user downloading them on start-up and per task. Listing load on the admin
+# services then comes from the periodic refresh only.
+ADMIN_SNAPSHOT_ENABLED = True
+
+# Seconds between snapshot reloads
+ADMIN_SNAPSHOT_REFRESH_INTERVAL = 60
+
+# ============================================================================
+# ADMIN DELETES
+# ============================================================================
+# Only travels/orders with a train number in this range are deleted by admin behaviors
+# (protects InitData trips 1234-1345, real orders and the seeded trips; load-test trips are numbered 2000-4000)
+ADMIN_DELETE_MIN_NUMBER = 2000
+ADMIN_DELETE_MAX_NUMBER = 4000
+
+# Report deletes without an eligible entry as "NO_CANDIDATE" stats entries.
+# Note: Locust includes these entries in its "Aggregated" row, so this is disabled by default.
+ADMIN_NO_CANDIDATE_METRIC = False
+
+# ============================================================================
+# MARKOV SCENARIOS
+# ============================================================================
+# YAML/JSON file describing personas as Markov chains over user_behaviors.py
+# functions (see scenarios.py and scenario_funnel.yaml). None keeps the weighted
+# task dicts in locustfile.py. YAML files need PyYAML.
+SCENARIO_FILE = None
+
+# Seconds between checks for changes to the scenario file (also checked on test start)
+SCENARIO_RELOAD_INTERVAL = 10
+
+# ============================================================================
+# SEEDING AND REPLAY
+# ============================================================================
+# Seed of the per-user random streams (see seeding.py): the same seed, user count
+# and spawn rate reproduce the same workload. None = unseeded.
+RUN_SEED = None
+
+# Record every request (per user, with timing, path, body and auth header) to this
+# JSON-lines file; workers append ".<worker index>". None = no recording.
+RECORD_FILE = None
+
+# Replay a recording instead of running the personas (see recording.py). Start at
+# least as many users as recorded user sessions; extra users stop immediately.
+# Sessions are split across the workers connected at test start by a hash of their key.
+REPLAY_FILE = None
+
+# Replay timing: 1.0 = original timing, 2.0 = twice as fast, 0 = no delays
+REPLAY_SPEED = 1.0
+
+# ============================================================================
+# ACCESS LOG REPLAY
+# ============================================================================
+# Gateway access log (plain or .gz) to replay instead of running the personas
+# (see log_replay.py). Start ACCESS_LOG_LANES users per worker. None = personas.
+ACCESS_LOG_FILE = None
+
+# "combined" (nginx/Apache combined or common log format) or "json" (one object per line)
+ACCESS_LOG_FORMAT = "combined"
+
+# Field names of JSON access logs; time is epoch seconds or ISO 8601
+ACCESS_LOG_JSON_FIELDS = {"time": "time", "session": "session", "method": "method", "path": "path"}
+
+# Time scale: 1.0 = original arrival times, 2.0 = twice as fast, 0.5 = half speed, 0 = no delays
+ACCESS_LOG_SPEED = 1.0
+
+# Replay lanes per worker (sessions are hashed onto lanes, one user per lane)
+ACCESS_LOG_LANES = 50
+
+# Entries buffered per lane; the log reader waits when a lane is full
+ACCESS_LOG_QUEUE_SIZE = 100
+
+# Seconds of the log read ahead of the replay into the lanes
+ACCESS_LOG_READ_AHEAD = 10
+
+# Seconds an entry may be overdue on a full lane (no user or a user that falls
+# behind) before the reader drops that lane's entries until it has room again
+ACCESS_LOG_LANE_TIMEOUT = 5
+
+# ============================================================================
+# MOCK BACKEND (calibration)
+# ============================================================================
+# Response latency of mock_backend.py, in the delay format of delays.py (as think times in scenarios.py)
+MOCK_LATENCY = {"dist": "lognormal", "median": 0.01, "sigma": 0.6, "max": 1.0}
+
+# Latency per payload name (see mock_backend.ROUTES), e.g. slower searches and bookings
+MOCK_LATENCY_ROUTES = {
+    "trips": {"dist": "lognormal", "median": 0.05, "sigma": 0.5, "max": 2.0},
+    "preserve": {"dist": "lognormal", "median": 0.15, "sigma": 0.4, "max": 3.0},
+    "travel_plan": {"dist": "lognormal", "median": 0.08, "sigma": 0.5, "max": 2.0},
+}
+
+# Payload sizes: entries per admin listing, trips per search, orders per account
+MOCK_LISTING_SIZE = 200
+MOCK_TRIPS_PER_SEARCH = 10
+MOCK_ORDERS_PER_ACCOUNT = 10
+
+# ============================================================================
+# SELF-OVERHEAD BENCHMARKS
+# ============================================================================
+# Stored benchmark results that bench.py compares against (machine-specific)
+BENCH_BASELINE_FILE = "bench_baseline.json"
+
+# Timings per micro-benchmark; the median is reported, so a noisy run does not decide
+BENCH_REPEATS = 7
+
+# Allowed relative change of a metric before it is reported as a regression
+BENCH_TOLERANCE = 0.25
+
+# ============================================================================
+# PARALLEL FAN-OUT
+# ============================================================================
+# Issue the concurrent requests of a page (booking options, infrastructure
+# listings) in parallel like the UI does (see fanout.py); False = sequentially
+FANOUT_ENABLED = True
+
+# Concurrent requests per user and connection pool size per user (browsers use 6 per host)
+FANOUT_CONCURRENCY = 6
+
+# Report the critical path of each parallel group as a "FANOUT" stats entry.
+# Note: Locust includes these entries in its "Aggregated" row, so this is disabled by default.
+FANOUT_METRICS = False
+
+# ============================================================================
+# STATIC ASSETS AND BROWSER CACHE
+# ============================================================================
+# Load the scripts, styles and images of each page with the page (see assets.py).
+# Adds 13-19 requests per page load and changes the request mix, so it is opt-in;
+# False = fetch only the HTML document
+ASSETS_ENABLED = False
+
+# JSON manifest {"/page.html": ["/asset", ...]} replacing the built-in one (None = built-in)
+ASSET_MANIFEST_FILE = None
+
+# Share of users arriving with a cache from an earlier visit (the rest start cold)
+ASSET_WARM_VISITOR_RATIO = 0.6
+
+# Age in seconds of the warm visitors' cache (fresh entries are not requested at all)
+ASSET_WARM_CACHE_AGE = 86400
+
+# ============================================================================
+# BANDWIDTH ACCOUNTING
+# ============================================================================
+# Count wire and decoded response sizes per endpoint (see bandwidth.py)
+BANDWIDTH_ACCOUNTING = True
+
+# Encodings offered in Accept-Encoding: "gzip, deflate" (Locust's default),
+# "gzip, deflate, br" (adds Brotli) or "identity" (uncompressed responses)
+ACCEPT_ENCODING = "gzip, deflate"
+
+# Every n-th uncompressed response body per endpoint is gzipped to estimate the savings
+BANDWIDTH_COMPRESSION_SAMPLE_EVERY = 100
+
+# Per-endpoint and per-service sizes, percentiles and bytes/s written at the end of a test
+BANDWIDTH_REPORT_FILE = "bandwidth_report.json"
+
+# Endpoints with the highest wire bandwidth logged at the end of a test
+BANDWIDTH_SUMMARY_SIZE = 10
+
+# ============================================================================
+# STEADY-STATE DETECTION
+# ============================================================================
+# Detect when throughput and latency have settled after spawning (see steady_state.py)
+STEADY_STATE_DETECTION = True
+
+# Seconds per sample of the aggregated throughput and median latency series
+# (at least twice the 3 s worker report interval in distributed mode)
+STEADY_STATE_WINDOW = 10
+
+# Consecutive samples that must agree (moving window of the convergence test)
+STEADY_STATE_SAMPLES = 6
+
+# Max coefficient of variation (standard deviation / mean) of both series over the samples
+STEADY_STATE_MAX_CV = 0.10
+
+# Max relative difference between the means of the older and the newer half of the samples
+STEADY_STATE_MAX_DRIFT = 0.05
+
+# Warmup stats once steady: "split" (kept as "<name>_warmup"), "reset" (discarded) or None (kept)
+STEADY_STATE_ACTION = "split"
+
+# Seconds after spawning without a steady state before detection gives up
+STEADY_STATE_TIMEOUT = 900
+
+# ============================================================================
+# TRACE CONTEXT
+# ============================================================================
+# Send a W3C traceparent header with every user request (see tracing.py)
+TRACE_PROPAGATION = True
+
+# Fraction of the requests flagged as sampled; only those are kept as exemplars and slowest requests.
+# The flag overrides the services' own sampling (parent-based samplers follow it): keep it small
+# so tracing overhead stays comparable with runs without trace headers
+TRACE_SAMPLE_RATIO = 0.01
+
+# Link to a trace in the tracing UI: Jaeger of docker-compose-with-jaeger.yml
+# (k8s-with-jaeger: NodePort 32688 of any node)
+TRACE_LINK_TEMPLATE = "http://localhost:16686/trace/{trace_id}"
+
+# Upper bounds (ms) of the response time buckets holding one exemplar trace each (plus +Inf),
+# also the buckets of the exported response time histogram (see exporter.py)
+TRACE_EXEMPLAR_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Slowest requests kept per endpoint
+TRACE_SLOWEST_PER_ENDPOINT = 10
+
+# Slowest requests and exemplars with trace links, written at the end of a test
+TRACE_REPORT_FILE = "trace_report.json"
+
+# Slowest requests overall logged at the end of a test
+TRACE_SUMMARY_SIZE = 10
+
+# ============================================================================
+# POST-RUN ANALYSIS (analyze.py)
+# ============================================================================
+# Seconds per window of the per-window percentiles
+ANALYSIS_WINDOW = 60
+
+# Rows of the request log read at a time
+ANALYSIS_CHUNK_SIZE = 500000
+
+# Percentiles reported per endpoint and per window
+ANALYSIS_PERCENTILES = [0.5, 0.95, 0.99]
+
+# Percentiles compared between two runs
+ANALYSIS_COMPARE_PERCENTILES = [0.5, 0.95]
+
+# Bootstrap resamples per endpoint and metric
+ANALYSIS_BOOTSTRAP_RESAMPLES = 2000
+
+# Confidence level of the intervals of the relative change
+ANALYSIS_CONFIDENCE = 0.95
+
+# Relative latency change within which an endpoint counts as unchanged
+ANALYSIS_TOLERANCE = 0.10
+
+# Absolute error rate change within which an endpoint counts as unchanged
+ANALYSIS_ERROR_TOLERANCE = 0.01
+
+# Requests an endpoint needs in both runs to be compared
+ANALYSIS_MIN_REQUESTS = 100
+
+# ============================================================================
+# PROMETHEUS EXPORTER
+# ============================================================================
+# Serve live load-generator metrics for Prometheus on master and workers (see exporter.py)
+METRICS_ENABLED = True
+
+# Port of the metrics endpoint; workers on the same host take the next free ports
+METRICS_PORT = 9646
+
+# Ports tried from METRICS_PORT before the exporter gives up
+METRICS_PORT_RANGE = 32
+
+# Path of the metrics endpoint
+METRICS_PATH = "/metrics"
+
+# Endpoint label values per method before further endpoints are counted as "other"
+METRICS_MAX_ENDPOINTS = 200
+
+# Seconds between event loop lag samples
+METRICS_LAG_INTERVAL = 0.5
@@ -0,0 +1,37 @@
+"""
+Delay Distributions for Train-Ticket Load Testing
+
+Compiles delay specs, the think times of scenario files (scenarios.py) and the
+response latencies of the mock backend (mock_backend.py), into functions that
+draw seconds from a random.Random. Standard library only, so that the mock
+backend stays free of Locust and gevent.
+
+    {"dist": "none"}
+    {"dist": "constant", "value": 2}
+    {"dist": "uniform", "min": 1, "max": 5}
+    {"dist": "exponential", "mean": 4, "max": 30}         # max is optional
+    {"dist": "lognormal", "median": 0.05, "sigma": 0.5, "max": 2}
+"""
+
+import math
+
+
+def compile_delay(spec, default_dist="uniform"):
+    """Compile a delay spec into a function rng -> seconds; default_dist applies without "dist"."""
+    dist = spec.get("dist", default_dist)
+    cap = float(spec.get("max", math.inf))
+    if dist == "none":
+        return lambda rng: 0.0
+    if dist == "constant":
+        value = float(spec["value"])
+        return lambda rng: value
+    if dist == "uniform":
+        low, high = float(spec["min"]), float(spec["max"])
+        return lambda rng: rng.uniform(low, high)
+    if dist == "exponential":
+        rate = 1.0 / float(spec["mean"])
+        return lambda rng: min(rng.expovariate(rate), cap)
+    if dist == "lognormal":
+        mu, sigma = math.log(float(spec["median"])), float(spec["sigma"])
+        return lambda rng: min(rng.lognormvariate(mu, sigma), cap)
+    raise ValueError(f"Unknown delay distribution: {dist}")
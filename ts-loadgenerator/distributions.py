@@ -0,0 +1,108 @@
+"""
+Key-Popularity Distributions for Train-Ticket Load Testing
+
+Provides configurable popularity models for workload keys (station pairs,
+departure dates, accounts, train numbers) so that the skew which decides
+whether backend caches help or hurt is present in the generated load.
+
+Models are given as dicts in config.py:
+    {"model": "uniform"}
+    {"model": "zipf", "s": 1.1}                  # rank = position in the key list
+    {"model": "empirical", "file": "routes.json"} # {"key": weight, ...} or CSV "key,weight"
+
+Station pairs are keyed "start-end" in empirical files (e.g. "nanjing-shanghai").
+"""
+
+import bisect
+import itertools
+import json
+import random
+
+import seeding
+
+# Samplers per logical name, rebuilt when their key list changes
+_samplers = {}
+
+
+def load_empirical_weights(path):
+    """Load {key: weight} from a JSON object or a CSV file with "key,weight" lines."""
+    with open(path) as f:
+        if path.endswith(".json"):
+            return {str(k): float(v) for k, v in json.load(f).items()}
+        weights = {}
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            key, weight = line.rsplit(",", 1)
+            weights[key.strip()] = float(weight)
+        return weights
+
+
+def key_name(key):
+    """Name of a key in empirical weight files; station pairs are written "start-end"."""
+    return "-".join(key) if isinstance(key, tuple) else str(key)
+
+
+def model_weights(keys, spec):
+    """Return one weight per key according to the popularity model spec."""
+    model = (spec or {}).get("model", "uniform")
+    if model == "uniform":
+        return [1.0] * len(keys)
+    if model == "zipf":
+        s = float(spec.get("s", 1.0))
+        return [1.0 / (rank ** s) for rank in range(1, len(keys) + 1)]
+    if model == "empirical":
+        weights = load_empirical_weights(spec["file"])
+        return [weights.get(key_name(key), 0.0) for key in keys]
+    raise ValueError(f"Unknown popularity model: {model}")
+
+
+class Sampler:
+    """Weighted sampler over a fixed key list (binary search over cumulative weights)."""
+
+    def __init__(self, keys, spec):
+        self.keys = keys
+        self.size = len(keys)
+        self.spec = spec
+        self.uniform = (spec or {}).get("model", "uniform") == "uniform"
+        weights = model_weights(keys, spec)
+        if not any(weights):
+            # Nothing in the empirical file matches the keys; fall back to uniform
+            weights = [1.0] * len(keys)
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.total = self.cum_weights[-1] if self.cum_weights else 0.0
+
+    def sample(self, rng=random):
+        if self.uniform:
+            return rng.choice(self.keys)
+        index = bisect.bisect(self.cum_weights, rng.random() * self.total, 0, self.size - 1)
+        return self.keys[index]
+
+
+def sampler(name, keys, spec):
+    """Return the cached sampler for name, rebuilding it if keys or spec changed."""
+    cached = _samplers.get(name)
+    if cached is None or cached.keys is not keys or cached.size != len(keys) or cached.spec is not spec:
+        cached = Sampler(keys, spec)
+        _samplers[name] = cached
+    return cached
+
+
+def choose(name, keys, spec, rng=None):
+    """Draw one key from keys under the popularity model spec (from the running user's stream by default)."""
+    return sampler(name, keys, spec).sample(rng or seeding.rng())
+
+
+def station_pairs(trip_list):
+    """All directional (start, end) station pairs along the routes, in route order, without duplicates."""
+    pairs = []
+    seen = set()
+    for route in trip_list:
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                pair = (route[i], route[j])
+                if pair not in seen:
+                    seen.add(pair)
+                    pairs.append(pair)
+    return pairs
@@ -0,0 +1,264 @@
+"""
+Prometheus Exporter for Train-Ticket Load Testing
+
+Serves the live load-generator metrics on METRICS_PORT (METRICS_PATH) of the
+master, the workers and the local runner, so that Prometheus can scrape them
+next to the service metrics (see the prometheus.io annotations of
+loadgenerator.yaml). Workers on the same host take the next free ports.
+
+    locust_requests_total                 requests per endpoint and method
+    locust_request_failures_total         failed requests per endpoint and method
+    locust_request_duration_seconds       response time histogram (TRACE_EXEMPLAR_BUCKETS)
+    locust_users                          running users per persona
+    locust_cpu_percent, locust_memory_bytes            of this process
+    locust_event_loop_lag_seconds, ..._max_seconds     gevent hub lag (last, max over LAG_WINDOW)
+    locust_workers, locust_worker_cpu_percent, ...     connected workers (master only)
+
+Workers count their own requests; the master exports the sum over all
+workers (sent with every stats report), so rates are taken from one or the
+other, not both. Request rates and error rates come from rate() over the
+counters. Scraped as OpenMetrics, the histogram buckets carry the trace id of
+a recent sampled request as exemplar (see tracing.py).
+
+Label cardinality is bounded: endpoints are the stats names without the
+"_spawning"/"@timestamp"/"_warmup" suffixes, at most METRICS_MAX_ENDPOINTS
+(the rest is counted as "other"); workers are labelled by index.
+"""
+
+import bisect
+import logging
+import time
+from collections import deque
+
+import gevent
+from gevent import pywsgi
+from locust import events
+from locust.runners import MasterRunner
+
+import capacity
+import config
+import journeys
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Endpoint label of the requests beyond METRICS_MAX_ENDPOINTS
+OVERFLOW_ENDPOINT = "other"
+
+# Seconds over which the max event loop lag is reported
+LAG_WINDOW = 15
+
+# Cumulative counts of this process' requests per (method, endpoint)
+_endpoints = {}
+
+# Master: latest cumulative counts reported by each worker
+_workers = {}
+
+_lags = deque(maxlen=int(LAG_WINDOW / config.METRICS_LAG_INTERVAL))
+_server = None
+
+
+class EndpointMetrics:
+    """Request counts of one endpoint; buckets count per TRACE_EXEMPLAR_BUCKETS bound (last: +Inf)."""
+
+    __slots__ = ("requests", "failures", "duration", "buckets", "exemplars")
+
+    def __init__(self):
+        self.requests = self.failures = 0
+        self.duration = 0.0
+        self.buckets = [0] * (len(config.TRACE_EXEMPLAR_BUCKETS) + 1)
+        # Bucket index: (trace id, seconds, timestamp) of the latest sampled request
+        self.exemplars = {}
+
+    def to_list(self):
+        return [self.requests, self.failures, self.duration, self.buckets,
+                [[index, *exemplar] for index, exemplar in self.exemplars.items()]]
+
+    def merge(self, data):
+        requests, failures, duration, buckets, exemplars = data
+        self.requests += requests
+        self.failures += failures
+        self.duration += duration
+        self.buckets = [a + b for a, b in zip(self.buckets, buckets)]
+        for index, trace_id, seconds, timestamp in exemplars:
+            if index not in self.exemplars or self.exemplars[index][2] < timestamp:
+                self.exemplars[index] = (trace_id, seconds, timestamp)
+
+
+def _endpoint(endpoints, method, name):
+    key = (method, name)
+    endpoint = endpoints.get(key)
+    if endpoint is None:
+        if len(endpoints) >= config.METRICS_MAX_ENDPOINTS:
+            key = (method, OVERFLOW_ENDPOINT)
+            endpoint = endpoints.get(key)
+        if endpoint is None:
+            endpoint = endpoints[key] = EndpointMetrics()
+    return endpoint
+
+
+@events.request.add_listener
+def on_request(request_type, name, response_time, context, exception, start_time, url, **kwargs):
+    if not config.METRICS_ENABLED or url is None or request_type in journeys.METRIC_REQUEST_TYPES:
+        return
+    endpoint = _endpoint(_endpoints, request_type, capacity.base_request_name(name))
+    endpoint.requests += 1
+    if exception:
+        endpoint.failures += 1
+    endpoint.duration += response_time / 1000
+    index = bisect.bisect_left(config.TRACE_EXEMPLAR_BUCKETS, response_time)
+    endpoint.buckets[index] += 1
+    if context and context.get("trace_sampled"):
+        endpoint.exemplars[index] = (context["trace_id"], response_time / 1000, start_time)
+
+
+def collect(runner):
+    """Cumulative counts per (method, endpoint): this process', or the workers' sum on the master."""
+    if not isinstance(runner, MasterRunner):
+        return _endpoints
+    endpoints = {}
+    for reported in _workers.values():
+        for method, name, data in reported:
+            _endpoint(endpoints, method, name).merge(data)
+    return endpoints
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+               for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def _family(lines, name, kind, help_text, samples, openmetrics):
+    """Append a metric family; samples are (suffix, labels, value) or (suffix, labels, value, exemplar)."""
+    if not samples:
+        return
+    # The text format 0.0.4 declares counters with their "_total" sample name
+    lines.append(f"# HELP {name if openmetrics or kind != 'counter' else name + '_total'} {help_text}")
+    lines.append(f"# TYPE {name if openmetrics or kind != 'counter' else name + '_total'} {kind}")
+    for suffix, labels, value, *exemplar in samples:
+        line = f"{name}{suffix}{_labels(labels)} {value}"
+        if openmetrics and exemplar and exemplar[0]:
+            trace_id, seconds, timestamp = exemplar[0]
+            line += f' # {{trace_id="{trace_id}"}} {seconds} {timestamp:.3f}'
+        lines.append(line)
+
+
+def render(runner, openmetrics):
+    """The metrics in the OpenMetrics or in the Prometheus text format."""
+    lines = []
+    endpoints = sorted(collect(runner).items())
+    _family(lines, "locust_requests", "counter", "Requests sent", [
+        ("_total", {"endpoint": name, "method": method}, e.requests) for (method, name), e in endpoints],
+        openmetrics)
+    _family(lines, "locust_request_failures", "counter", "Requests failed", [
+        ("_total", {"endpoint": name, "method": method}, e.failures) for (method, name), e in endpoints],
+        openmetrics)
+    bounds = [f"{bound / 1000:g}" for bound in config.TRACE_EXEMPLAR_BUCKETS] + ["+Inf"]
+    histogram = []
+    for (method, name), e in endpoints:
+        cumulative = 0
+        for index, bound in enumerate(bounds):
+            cumulative += e.buckets[index]
+            histogram.append(("_bucket", {"endpoint": name, "method": method, "le": bound}, cumulative,
+                              e.exemplars.get(index)))
+        histogram.append(("_sum", {"endpoint": name, "method": method}, float(e.duration)))
+        histogram.append(("_count", {"endpoint": name, "method": method}, e.requests))
+    _family(lines, "locust_request_duration_seconds", "histogram", "Response times", histogram, openmetrics)
+
+    users = runner.reported_user_classes_count if isinstance(runner, MasterRunner) else runner.user_classes_count
+    _family(lines, "locust_users", "gauge", "Running users per persona",
+            [("", {"persona": persona}, count) for persona, count in sorted(users.items())], openmetrics)
+    _family(lines, "locust_cpu_percent", "gauge", "CPU usage of this process (100 = one core)",
+            [("", {}, float(runner.current_cpu_usage))], openmetrics)
+    _family(lines, "locust_memory_bytes", "gauge", "Resident memory of this process",
+            [("", {}, runner.current_memory_usage)], openmetrics)
+    if _lags:
+        _family(lines, "locust_event_loop_lag_seconds", "gauge", "Last gevent event loop lag",
+                [("", {}, float(_lags[-1]))], openmetrics)
+        _family(lines, "locust_event_loop_lag_max_seconds", "gauge",
+                f"Max gevent event loop lag over the last {LAG_WINDOW} s", [("", {}, float(max(_lags)))], openmetrics)
+    if isinstance(runner, MasterRunner):
+        workers = sorted((runner.get_worker_index(client.id), client) for client in runner.clients.values())
+        _family(lines, "locust_workers", "gauge", "Connected workers", [("", {}, len(workers))], openmetrics)
+        _family(lines, "locust_worker_cpu_percent", "gauge", "CPU usage per worker",
+                [("", {"worker": index}, float(client.cpu_usage)) for index, client in workers], openmetrics)
+        _family(lines, "locust_worker_memory_bytes", "gauge", "Resident memory per worker",
+                [("", {"worker": index}, client.memory_usage) for index, client in workers], openmetrics)
+        _family(lines, "locust_worker_users", "gauge", "Running users per worker",
+                [("", {"worker": index}, client.user_count) for index, client in workers], openmetrics)
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def application(environment):
+    """WSGI application serving METRICS_PATH."""
+    def serve(environ, start_response):
+        if environ.get("PATH_INFO") != config.METRICS_PATH:
+            start_response("404 Not Found", [("Content-Type", "text/plain")])
+            return [b"Not found\n"]
+        openmetrics = "application/openmetrics-text" in environ.get("HTTP_ACCEPT", "")
+        body = render(environment.runner, openmetrics).encode()
+        content_type = OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
+        start_response("200 OK", [("Content-Type", content_type), ("Content-Length", str(len(body)))])
+        return [body]
+    return serve
+
+
+def measure_lag():
+    """Sample how late the gevent hub wakes a sleeping greenlet."""
+    while True:
+        started = time.perf_counter()
+        gevent.sleep(config.METRICS_LAG_INTERVAL)
+        _lags.append(max(0.0, time.perf_counter() - started - config.METRICS_LAG_INTERVAL))
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    global _server
+    if not config.METRICS_ENABLED or environment.runner is None or _server is not None:
+        return
+    for port in range(config.METRICS_PORT, config.METRICS_PORT + config.METRICS_PORT_RANGE):
+        server = pywsgi.WSGIServer(("", port), application(environment), log=None)
+        try:
+            server.start()
+        except OSError:
+            continue
+        _server = server
+        gevent.spawn(measure_lag)
+        logging.info(f"Prometheus metrics on http://0.0.0.0:{port}{config.METRICS_PATH}")
+        return
+    logging.warning(f"Prometheus exporter disabled: ports {config.METRICS_PORT}-"
+                    f"{config.METRICS_PORT + config.METRICS_PORT_RANGE - 1} are in use")
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    _endpoints.clear()
+    _workers.clear()
+
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data):
+    """Send this worker's cumulative counts (the master keeps the latest per worker)."""
+    if config.METRICS_ENABLED and _endpoints:
+        data["metrics"] = [[method, name, e.to_list()] for (method, name), e in _endpoints.items()]
+
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data):
+    if "metrics" in data:
+        _workers[client_id] = data["metrics"]
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    if _server is not None:
+        _server.stop(timeout=1)
@@ -0,0 +1,73 @@
+"""
+Browser-Like Parallel Requests for Train-Ticket Load Testing
+
+The Train-Ticket UI loads the data of a page with concurrent XHRs (e.g. the
+contacts, food and assurance options of the booking page), while the personas
+issued them one after another. gather() runs such a group concurrently within
+one simulated user: at most FANOUT_CONCURRENCY requests at a time, matching
+the per-host connection limit of a browser (also the size of the users'
+connection pools). The group's wall time is its critical path (the slowest
+request), which is reported as a FANOUT stats entry next to the individual
+requests. Every call runs with its own random stream forked from the user's
+(see seeding.fork), so seeded runs stay reproducible.
+"""
+
+import time
+
+import gevent
+from gevent.pool import Pool
+from locust import events
+
+import config
+import journeys
+import seeding
+import utils
+
+
+def _run(call, stream, durations, index):
+    """Run one call of a group in its greenlet; returns (succeeded, result or exception)."""
+    seeding.bind(stream)
+    started = time.perf_counter()
+    try:
+        return True, call()
+    except Exception as e:
+        return False, e
+    finally:
+        durations[index] = time.perf_counter() - started
+
+
+def gather(calls, name=None):
+    """
+    Run the zero-argument callables concurrently and return their results in order.
+    If a call raised, the first exception (in call order) is re-raised once all calls
+    finished. With FANOUT_ENABLED off the calls run sequentially in the caller.
+    When name is given, the critical path is reported as a FANOUT stats entry with
+    the summed (sequential) time of the calls in its context.
+    """
+    if not config.FANOUT_ENABLED or len(calls) < 2:
+        return [call() for call in calls]
+
+    pool = Pool(config.FANOUT_CONCURRENCY)
+    durations = [0.0] * len(calls)
+    started, start_time = time.perf_counter(), time.time()
+    jobs = [pool.spawn(_run, call, seeding.fork(), durations, i) for i, call in enumerate(calls)]
+    try:
+        gevent.joinall(jobs)
+    finally:
+        # Stop the calls if the user is stopped while waiting
+        pool.kill(block=False)
+    critical_path = time.perf_counter() - started
+
+    if name and config.FANOUT_METRICS:
+        events.request.fire(request_type=journeys.FANOUT_REQUEST_TYPE, name=utils.get_name_suffix(name),
+                            response_time=critical_path * 1000, response_length=0, response=None,
+                            context={"sequential_time": sum(durations) * 1000}, exception=None,
+                            start_time=start_time, url=None)
+
+    results = []
+    for job in jobs:
+        succeeded, value = job.value
+        if not succeeded:
+            raise value
+        results.append(value)
+    return results
@@ -0,0 +1,144 @@
+"""
+Journey-Level Timing for Train-Ticket Load Testing
+
+Measures multi-step user journeys (e.g. search -> preserve -> pay) as the
+end-to-end service time a customer experiences. Think time spent in
+utils.sleep_user / utils.sleep_automatic is subtracted, so only active request
+time is reported. Journeys and their steps are fired as Locust request events,
+giving them their own stats entries, histograms and a success/abandon ratio
+(abandoned journeys are reported as failures).
+"""
+
+import time
+
+import gevent
+from locust import events
+
+import config
+import utils
+
+# Request types used for the synthetic stats entries
+JOURNEY_REQUEST_TYPE = "JOURNEY"
+STEP_REQUEST_TYPE = "STEP"
+# Admin deletes that found no eligible entry (see api_admin.report_no_candidate)
+NO_CANDIDATE_REQUEST_TYPE = "NO_CANDIDATE"
+# Critical path of a group of concurrent requests (see fanout.py)
+FANOUT_REQUEST_TYPE = "FANOUT"
+# Duration of the warmup before steady state (see steady_state.py)
+WARMUP_REQUEST_TYPE = "WARMUP"
+METRIC_REQUEST_TYPES = {JOURNEY_REQUEST_TYPE, STEP_REQUEST_TYPE, NO_CANDIDATE_REQUEST_TYPE, FANOUT_REQUEST_TYPE,
+                        WARMUP_REQUEST_TYPE}
+
+# Open journeys and steps per greenlet, innermost last
+_open_frames = {}
+
+
+class JourneyAbandoned(Exception):
+    """Reported as the failure of a journey that did not reach its goal."""
+    pass
+
+
+class _Frame:
+    """Timing frame shared by journeys and steps: wall clock minus think time."""
+
+    def __init__(self, name):
+        self.name = name
+        self.think_time = 0.0
+        self.started = None
+        self.start_time = None
+
+    def open(self):
+        self.started = time.perf_counter()
+        self.start_time = time.time()
+        _open_frames.setdefault(gevent.getcurrent(), []).append(self)
+
+    def close(self):
+        frames = _open_frames.get(gevent.getcurrent(), [])
+        if self in frames:
+            frames.remove(self)
+        if not frames:
+            _open_frames.pop(gevent.getcurrent(), None)
+        return max(0.0, time.perf_counter() - self.started - self.think_time)
+
+
+def record_think_time(seconds):
+    """Attribute think time to every journey and step open on the current greenlet."""
+    for frame in _open_frames.get(gevent.getcurrent(), ()):
+        frame.think_time += seconds
+
+
+def _fire(request_type, name, active_time, start_time, exception=None):
+    events.request.fire(request_type=request_type, name=name, response_time=active_time * 1000,
+                        response_length=0, response=None, context={}, exception=exception,
+                        start_time=start_time, url=None)
+
+
+class Journey(_Frame):
+    """
+    Context manager timing one user journey.
+
+        with journeys.Journey("book_ticket") as journey:
+            with journey.step("search"):
+                ...
+            journey.abandon_on_failure(response, "preserve failed")
+
+    An exception escaping the block abandons the journey and is re-raised.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.abandon_reason = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        active_time = self.close()
+        if exc_type is not None and self.abandon_reason is None:
+            self.abandon_reason = exc_type.__name__
+        if config.JOURNEY_METRICS:
+            exception = JourneyAbandoned(self.abandon_reason) if self.abandon_reason else None
+            _fire(JOURNEY_REQUEST_TYPE, utils.get_name_suffix(self.name), active_time, self.start_time, exception)
+        return False
+
+    def step(self, name):
+        """Return a context manager that times one step of this journey."""
+        return _Step(self, name)
+
+    def abandon(self, reason):
+        """Mark the journey as abandoned (first reason wins)."""
+        if self.abandon_reason is None:
+            self.abandon_reason = reason
+
+    def abandon_on_failure(self, response, reason):
+        """Abandon the journey if an HTTP response failed; returns True if it did."""
+        status = getattr(response, "status_code", 0)
+        if response is None or not status or status >= 400:
+            self.abandon(reason)
+            return True
+        return False
+
+    @property
+    def abandoned(self):
+        return self.abandon_reason is not None
+
+
+class _Step(_Frame):
+    """Context manager for a single step, reported as "<journey>.<step>"."""
+
+    def __init__(self, journey, name):
+        super().__init__(name)
+        self.journey = journey
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        active_time = self.close()
+        if config.JOURNEY_METRICS:
+            exception = JourneyAbandoned(exc_type.__name__) if exc_type is not None else None
+            _fire(STEP_REQUEST_TYPE, utils.get_name_suffix(f"{self.journey.name}.{self.name}"),
+                  active_time, self.start_time, exception)
+        return False
@@ -5,28 +5,46 @@ Defines three user personas for load testing: External (60%), Logged (35%), and
 Simulates realistic user behavior with weighted tasks, authentication flows, and human timing.
 """
 
-import random
 import time
-from locust import FastHttpUser, TaskSet, task, between, events
+from locust import FastHttpUser, task, events
 import locust.stats
 
+import admin_snapshot
+import bandwidth
+import exporter
 import api_user
 import api_admin
 import utils
 import config
+import recording
+import scenarios
+import seeding
+import session_pool
+import steady_state
+import stop_conditions
+import tracing
 import user_behaviors as ub
 
 # Configure Locust to report detailed percentile metrics for tail latency analysis
 locust.stats.PERCENTILES_TO_REPORT = config.PERCENTILES_TO_REPORT
 
-# Global request counter for optional auto-stop functionality
-count = 0
+# Optional automated capacity search (Locust picks up any shape class defined in the locustfile)
+if config.CAPACITY_SEARCH:
+    from capacity import CapacitySearchShape
+
+# Optional exact replay of a recorded request sequence instead of the personas (see recording.py)
+if config.REPLAY_FILE:
+    from recording import ReplayUser
+
+# Optional production access-log replay instead of the personas (see log_replay.py)
+if config.ACCESS_LOG_FILE:
+    from log_replay import LogReplayUser
 
 # Optional CSV logging for detailed request analysis (disabled in K8s for performance)
 test_log = None
 if config.LOG_ALL_REQUESTS:
     test_log = open('test_log.csv', 'w')
-    test_log.write(f'request_type;name;response_time;error;start_time;url\n')
+    test_log.write(f'request_type;name;response_time;error;start_time;url;response_length;trace_id\n')
 
 # Timer for periodic log buffer flushing
 log_flush_timer = time.time()
@@ -35,38 +53,38 @@ log_flush_timer = time.time()
 @events.request.add_listener
 def my_request_handler(request_type, name, response_time, response_length, response,
                        context, exception, start_time, url, **kwargs):
-    """Global request event handler for optional CSV logging and auto-stop functionality."""
+    """Global request event handler for optional CSV logging (stop conditions: see stop_conditions.py)."""
     global log_flush_timer
 
     # Optional CSV logging for detailed request analysis
     if config.LOG_ALL_REQUESTS:
-        test_log.write(f'{request_type};{name};{response_time};{1 if exception else 0};{start_time};{url}\n')
+        test_log.write(f'{request_type};{name};{response_time};{1 if exception else 0};{start_time};{url};'
+                       f'{response_length};{context.get("trace_id", "") if context else ""}\n')
         t = time.time()
         # Periodically flush log buffer to prevent data loss
         if t - log_flush_timer > config.LOG_FLUSH_INTERVAL:
             log_flush_timer = t
             test_log.flush()
 
-    # Optional auto-stop functionality for batch testing
-    if config.STOP_ON_REQUEST_COUNT:
-        global count
-        count += 1
-        if count > config.REQUEST_NUMBER_TO_STOP:
-            if test_log:
-                test_log.flush()
-            exit(0)
+
+@events.test_stop.add_listener
+@events.quitting.add_listener
+def flush_test_log(environment, **kwargs):
+    """Write out the request log when the test stops (time limit, stop condition, Ctrl+C)."""
+    if test_log:
+        test_log.flush()
 
 
 def choice_train_type() -> bool:
     """Select train type using weighted distribution: 80% high-speed, 20% regular trains."""
-    return random.choices([True, False], weights=[config.HS_PERCENTAGE, config.OTHER_PERCENTAGE], k=1)[0]
+    return seeding.rng().choices([True, False], weights=[config.HS_PERCENTAGE, config.OTHER_PERCENTAGE], k=1)[0]
 
 
 # ============================================================================
 # EXTERNAL USER (Anonymous browsing - 60%)
 # ============================================================================
 
-class ExternalBehavior(TaskSet):
+class ExternalBehavior(scenarios.MarkovTaskSet):
     """Anonymous user behavior patterns for browsing, searching, and exploring without authentication."""
 
     def on_start(self):
@@ -88,14 +106,18 @@ class ExternalBehavior(TaskSet):
 
 class External(FastHttpUser):
     """Anonymous user class (60% of traffic) for browsing and search without authentication."""
-    wait_time = between(config.TT_USER_MIN, config.TT_USER_MAX)
+    wait_time = seeding.between(config.TT_USER_MIN, config.TT_USER_MAX)
     network_timeout = config.NETWORK_TIMEOUT
     connection_timeout = config.CONNECTION_TIMEOUT
+    concurrency = config.FANOUT_CONCURRENCY
     weight = config.EXTERNAL_PERCENTAGE
     tasks = [ExternalBehavior]
 
     def on_start(self):
         """Initialize user with train type preference (high-speed or regular)."""
+        seeding.attach(self)
+        bandwidth.attach(self)
+        tracing.attach(self)
         self.hs = choice_train_type()
 
 
@@ -103,7 +125,7 @@ class External(FastHttpUser):
 # LOGGED USER (Authenticated booking - 35%)
 # ============================================================================
 
-class LoggedBehavior(TaskSet):
+class LoggedBehavior(scenarios.MarkovTaskSet):
     """Authenticated user behavior patterns for booking, order management, and business operations."""
 
     def on_start(self):
@@ -129,23 +151,21 @@ class LoggedBehavior(TaskSet):
 
 class Logged(FastHttpUser):
     """Authenticated user class (35% of traffic) performing booking and order management."""
-    wait_time = between(config.TT_USER_MIN, config.TT_USER_MAX)
+    wait_time = seeding.between(config.TT_USER_MIN, config.TT_USER_MAX)
     network_timeout = config.NETWORK_TIMEOUT
     connection_timeout = config.CONNECTION_TIMEOUT
+    concurrency = config.FANOUT_CONCURRENCY
     weight = config.LOGGED_PERCENTAGE
     tasks = [LoggedBehavior]
 
     def on_start(self):
         """Authenticate user, establish session with Bearer token, and initialize preferences."""
+        seeding.attach(self)
+        bandwidth.attach(self)
+        tracing.attach(self)
         self.hs = choice_train_type()
-        # Authenticate with default test user credentials
-        self.user_id, token = api_user.login(self.client)
-        # Set up authenticated session headers
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        # Authenticate (pooled session or real login) and set up authenticated session headers
+        self.user_id, self.headers = session_pool.login_user(self.client)
         # Simulate brief system processing delay
         utils.sleep_automatic()
         # Load authenticated homepage
@@ -158,7 +178,7 @@ class Logged(FastHttpUser):
 # ADMIN USER (System administration - 5%)
 # ============================================================================
 
-class AdminBehavior(TaskSet):
+class AdminBehavior(scenarios.MarkovTaskSet):
     """Administrative behavior patterns for system management and data administration."""
 
     def on_start(self):
@@ -181,33 +201,36 @@ class AdminBehavior(TaskSet):
 
 class Admin(FastHttpUser):
     """Administrative user class (5% of traffic) for system management and maintenance operations."""
-    wait_time = between(config.TT_USER_MIN, config.TT_USER_MAX)
+    wait_time = seeding.between(config.TT_USER_MIN, config.TT_USER_MAX)
     network_timeout = config.NETWORK_TIMEOUT
     connection_timeout = config.CONNECTION_TIMEOUT
+    concurrency = config.FANOUT_CONCURRENCY
     weight = config.ADMIN_PERCENTAGE
     tasks = [AdminBehavior]
 
     def on_start(self):
         """Authenticate admin user, establish session, and preload administrative data."""
+        seeding.attach(self)
+        bandwidth.attach(self)
+        tracing.attach(self)
         # Load admin interface homepage
         api_admin.home(self.client)
         utils.sleep_user()
 
-        # Authenticate with admin credentials
-        self.user_id, token = api_admin.login(self.client)
-
-        # Set up admin session headers
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        # Authenticate with admin credentials (pooled session or real login)
+        self.user_id, self.headers = session_pool.login_admin(self.client)
         utils.sleep_automatic()
 
         # Load authenticated admin homepage
         api_admin.home(self.client, headers=self.headers)
         utils.sleep_automatic()
 
-        # Preload administrative data for efficient operations
-        self.orders = api_admin.get_all_orders(self.client, self.headers)
+        # Preload administrative data (shared worker snapshot when loaded)
+        self.orders = admin_snapshot.get_listing(self.client, "orders", headers=self.headers,
+                                                 sample=config.ADMIN_LISTING_SAMPLE_SIZE)
         utils.sleep_user()
+
+
+# In replay modes only the replay user is spawned
+if config.REPLAY_FILE or config.ACCESS_LOG_FILE:
+    External.abstract = Logged.abstract = Admin.abstract = True
@@ -0,0 +1,473 @@
+"""
+Access-Log Replay for Train-Ticket Load Testing
+
+Replays the endpoint mix and arrival curve of a production gateway access log
+instead of running the personas. The log (plain or .gz, combined or JSON-lines
+format) is streamed line by line, so memory stays constant regardless of its
+size. Every entry is matched against ROUTES and re-issued through the matching
+api_user/api_admin call, with parameters substituted for this environment:
+account IDs become the replaying user's account, order IDs come from its order
+state, station names, consignment values and train classes are taken from the
+logged path, everything else is generated as in the personas. Requests that
+api_user/api_admin issue as one call (e.g. the contact, food and assurance
+lookups of a booking) are covered by the call of their final request.
+
+Work is sharded by session (client address and user agent, or the "session"
+field of JSON logs): a session belongs to worker crc32(session) % workers and,
+within the worker, to one of ACCESS_LOG_LANES lanes, each replayed in order by
+one LogReplayUser. Entries are issued at their original offset from the first
+log entry divided by ACCESS_LOG_SPEED. The reader stays ACCESS_LOG_READ_AHEAD
+seconds ahead of the replay, and lanes are bounded queues: a lane that stays
+full for ACCESS_LOG_LANE_TIMEOUT (it has no user, e.g. when a worker runs fewer
+than ACCESS_LOG_LANES users, or its user falls behind) has its entries dropped
+and counted until it has room again, so one lane cannot stall the others.
+"""
+
+import gzip
+import json
+import logging
+import re
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from urllib.parse import unquote, urlsplit
+
+import gevent
+from gevent.queue import Empty, Full, Queue
+from locust import FastHttpUser, constant, events, task
+from locust.exception import StopUser
+from locust.runners import MasterRunner
+
+import admin_snapshot
+import api_admin
+import api_user
+import bandwidth
+import config
+import order_state
+import seeding
+import session_pool
+import tracing
+import utils
+
+# Common/combined log format: address, identity, user, [time], "request", status, size, "referer", "agent"
+COMBINED_LOG = re.compile(
+    r'(?P<address>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" \d{3} \S+'
+    r'(?: "[^"]*" "(?P<agent>[^"]*)")?')
+COMBINED_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+# Most frequent unmapped endpoints kept for the end-of-test summary
+UNMAPPED_SUMMARY_SIZE = 10
+_UNMAPPED_KEYS_LIMIT = 1000
+
+
+def parse_time(value):
+    """Epoch seconds of a logged timestamp (epoch number, ISO 8601 or combined log format)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return datetime.strptime(value, COMBINED_TIME_FORMAT).timestamp()
+
+
+def parse_line(line):
+    """(time, session, method, path) of a log line, or None if it is not a request entry."""
+    if config.ACCESS_LOG_FORMAT == "json":
+        try:
+            entry = json.loads(line)
+            fields = config.ACCESS_LOG_JSON_FIELDS
+            return (parse_time(entry[fields["time"]]), str(entry.get(fields["session"], "")),
+                    entry[fields["method"]].upper(), entry[fields["path"]])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+    match = COMBINED_LOG.match(line)
+    if match is None:
+        return None
+    try:
+        timestamp = datetime.strptime(match["time"], COMBINED_TIME_FORMAT).timestamp()
+    except ValueError:
+        return None
+    return timestamp, f'{match["address"]} {match["agent"] or ""}', match["method"], match["path"]
+
+
+def read_log(path):
+    """Stream the parsed entries of a (optionally gzip-compressed) access log."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            entry = parse_line(line)
+            if entry is not None:
+                yield entry
+
+
+# ============================================================================
+# ROUTE HANDLERS (user: the LogReplayUser of the lane, params: path parameters)
+# ============================================================================
+
+def _login(user, params):
+    user.user_id, user.headers = session_pool.login_user(user.client)
+
+
+def _search(hs):
+    def handler(user, params):
+        start, end = utils.get_random_start_end_stations(hs=hs)
+        api_user.search_travel(user.client, start, end, hs=hs, logged=user.headers is not None,
+                               headers=user.headers)
+    return handler
+
+
+def _travel_plan(user, params):
+    start, end = utils.get_random_start_end_stations(user.hs)
+    api_user.get_travel_plan(user.client, start, end)
+
+
+def _basic_travel(user, params):
+    start, end = utils.get_random_start_end_stations(user.hs)
+    api_user.query_basic_travel(user.client, utils.get_train_number(user.hs), start, end, headers=user.headers)
+
+
+def _station(user, params):
+    api_user.query_station_by_name(user.client, unquote(params["station"]), headers=user.headers)
+
+
+def _book(hs):
+    def handler(user, params):
+        user.ensure_user()
+        start, end = utils.get_random_start_end_stations(hs=hs)
+        api_user.book(user.client, user.user_id, trip_id=utils.get_train_number(hs), from_station=start,
+                      to_station=end, hs=hs, headers=user.headers)
+        order_state.record_booking(user.user_id, hs)
+    return handler
+
+
+def _orders(hs):
+    def handler(user, params):
+        user.ensure_user()
+        order_state.book_for(user.user_id).refresh(user.client, hs, user.headers)
+    return handler
+
+
+def _order_in(user, *statuses):
+    """An order of the lane's account in one of the statuses, or None."""
+    user.ensure_user()
+    return order_state.book_for(user.user_id).find(user.client, user.headers, statuses)
+
+
+def _pay(user, params):
+    order = _order_in(user, config.TICKET_STATUS_BOOKED)
+    if order is not None:
+        api_user.pay(user.client, user.user_id, trip_id=order.get("trainNumber"), hs=order_state.is_hs(order),
+                     headers=user.headers)
+
+
+def _cancel(user, params):
+    order = _order_in(user, config.TICKET_STATUS_BOOKED)
+    if order is not None:
+        api_user.cancel(user.client, user.user_id, hs=order_state.is_hs(order), headers=user.headers)
+
+
+def _collect(user, params):
+    order = _order_in(user, config.TICKET_STATUS_PAID)
+    if order is not None:
+        result = api_user.collect_ticket(user.client, user.headers, order)
+        order_state.book_for(user.user_id).apply(order, config.TICKET_STATUS_COLLECTED, result)
+
+
+def _execute(user, params):
+    order = _order_in(user, config.TICKET_STATUS_COLLECTED)
+    if order is not None:
+        result = api_user.execute_ticket(user.client, user.headers, order)
+        order_state.book_for(user.user_id).apply(order, config.TICKET_STATUS_EXECUTED, result)
+
+
+def _voucher(user, params):
+    order = _order_in(user, config.TICKET_STATUS_PAID, config.TICKET_STATUS_COLLECTED, config.TICKET_STATUS_EXECUTED)
+    if order is not None:
+        api_user.get_voucher(user.client, user.headers, order["id"], hs=order_state.is_hs(order))
+
+
+def _user_call(call):
+    """Handler for an api_user call taking (client, headers=...) of the logged-in account."""
+    def handler(user, params):
+        user.ensure_user()
+        call(user.client, headers=user.headers)
+    return handler
+
+
+def _consign_price(user, params):
+    user.ensure_user()
+    api_user.get_consign_price(user.client, unquote(params["weight"]), unquote(params["region"]),
+                               headers=user.headers)
+
+
+def _consigns(user, params):
+    user.ensure_user()
+    api_user.get_consign_by_account(user.client, user.user_id, headers=user.headers)
+
+
+def _user_by_id(user, params):
+    user.ensure_user()
+    api_user.get_user_by_id(user.client, user.user_id, headers=user.headers)
+
+
+def _admin_call(call, **kwargs):
+    """Handler for an api_admin call taking (client, headers=...) of the admin account."""
+    def handler(user, params):
+        call(user.client, headers=user.ensure_admin(), **kwargs)
+    return handler
+
+
+def _admin_delete_travel(user, params):
+    hs = user.hs
+    headers = user.ensure_admin()
+    candidates = admin_snapshot.get_delete_candidates(user.client, "travels", hs, headers=headers)
+    api_admin.delete_random_travel(user.client, candidates, hs=hs, headers=headers)
+
+
+def _admin_delete_order(user, params):
+    hs = unquote(params["train"]).startswith(api_admin.HS_TRAIN_TYPES)
+    headers = user.ensure_admin()
+    candidates = admin_snapshot.get_delete_candidates(user.client, "orders", hs, headers=headers)
+    api_admin.delete_random_order(user.client, candidates, hs=hs, headers=headers)
+
+
+def _admin_create_order(user, params):
+    api_admin.create_order(user.client, hs=user.hs, headers=user.ensure_admin())
+
+
+class Route:
+    """Log endpoint (method and path regex) and the handler replaying it; handler None = covered."""
+
+    def __init__(self, method, pattern, handler):
+        self.method = method
+        self.pattern = re.compile(pattern + r"/?$")
+        self.handler = handler
+
+
+_sample = {"sample": config.ADMIN_LISTING_SAMPLE_SIZE}
+
+# First match wins
+ROUTES = [
+    Route("GET", r"/(index\.html)?", lambda user, params: api_user.home(user.client)),
+    Route("GET", r"/client_login\.html", lambda user, params: api_user.client_login_page(user.client)),
+    Route("GET", r"/admin\.html", lambda user, params: api_admin.home(user.client)),
+    # Loaded with their pages (see assets.py)
+    Route("GET", r"/.*\.(js|css|png|jpe?g|gif|svg|ico|woff2?)", None),
+    Route("POST", r"/api/v1/users/login", _login),
+    Route("POST", r"/api/v1/travelservice/trips/left", _search(True)),
+    Route("POST", r"/api/v1/travel2service/trips/left", _search(False)),
+    Route("POST", r"/api/v1/travelplanservice/travelPlan/\w+", _travel_plan),
+    Route("POST", r"/api/v1/basicservice/basic/travel", _basic_travel),
+    Route("GET", r"/api/v1/basicservice/basic/(?P<station>[^/]+)", _station),
+    Route("GET", r"/api/v1/assuranceservice/assurances/types", None),
+    Route("GET", r"/api/v1/foodservice/foods/.*", None),
+    Route("GET", r"/api/v1/contactservice/contacts/account/[^/]+", None),
+    Route("POST", r"/api/v1/preserveservice/preserve", _book(True)),
+    Route("POST", r"/api/v1/preserveotherservice/preserveOther", _book(False)),
+    Route("POST", r"/api/v1/orderservice/order/refresh", _orders(True)),
+    Route("POST", r"/api/v1/orderOtherService/orderOther/refresh", _orders(False)),
+    Route("POST", r"/api/v1/inside_pay_service/inside_payment", _pay),
+    Route("GET", r"/api/v1/cancelservice/cancel/refound/[^/]+", None),
+    Route("GET", r"/api/v1/cancelservice/cancel/[^/]+/[^/]+", _cancel),
+    Route("GET", r"/api/v1/executeservice/execute/collected/[^/]+", _collect),
+    Route("GET", r"/api/v1/executeservice/execute/execute/[^/]+", _execute),
+    Route("POST", r"/getVoucher", _voucher),
+    Route("GET", r"/api/v1/verifycode/generate", _user_call(api_user.generate_verification_code)),
+    Route("GET", r"/api/v1/consignpriceservice/consignprice/price", _user_call(api_user.get_consign_price_info)),
+    Route("GET", r"/api/v1/consignpriceservice/consignprice/config", _user_call(api_user.get_consign_price_config)),
+    Route("GET", r"/api/v1/consignpriceservice/consignprice/(?P<weight>[^/]+)/(?P<region>[^/]+)", _consign_price),
+    Route("GET", r"/api/v1/consignservice/consigns/account/[^/]+", _consigns),
+    Route("GET", r"/api/v1/userservice/users/id/[^/]+", _user_by_id),
+    Route("GET", r"/api/v1/adminuserservice/users", _admin_call(api_admin.get_all_users)),
+    Route("GET", r"/api/v1/admintravelservice/admintravel", _admin_call(api_admin.get_all_travels, **_sample)),
+    Route("DELETE", r"/api/v1/admintravelservice/admintravel/[^/]+", _admin_delete_travel),
+    Route("GET", r"/api/v1/adminorderservice/adminorder", _admin_call(api_admin.get_all_orders, **_sample)),
+    Route("POST", r"/api/v1/adminorderservice/adminorder", _admin_create_order),
+    Route("DELETE", r"/api/v1/adminorderservice/adminorder/[^/]+/(?P<train>[^/]+)", _admin_delete_order),
+    Route("GET", r"/api/v1/adminrouteservice/adminroute", _admin_call(api_admin.get_all_routes)),
+    Route("GET", r"/api/v1/adminbasicservice/adminbasic/prices", _admin_call(api_admin.get_all_prices)),
+    Route("GET", r"/api/v1/adminbasicservice/adminbasic/contacts", _admin_call(api_admin.get_all_contacts, **_sample)),
+    Route("GET", r"/api/v1/adminbasicservice/adminbasic/stations", _admin_call(api_admin.get_all_stations)),
+    Route("GET", r"/api/v1/adminbasicservice/adminbasic/trains", _admin_call(api_admin.get_all_trains)),
+    Route("GET", r"/api/v1/adminbasicservice/adminbasic/configs", _admin_call(api_admin.get_all_configs)),
+]
+
+
+def match_route(method, path):
+    """(route, path parameters) of a logged request, or (None, None) if it is not mapped."""
+    path = urlsplit(path).path
+    for route in ROUTES:
+        if route.method == method:
+            match = route.pattern.match(path)
+            if match is not None:
+                return route, match.groupdict()
+    return None, None
+
+
+# ============================================================================
+# LANES
+# ============================================================================
+
+# Per-worker lane queues, the next lane to hand to a user and replay counters
+_lanes = []
+_next_lane = 0
+_reader = None
+_reading = False
+_runner = None
+counts = Counter()
+unmapped = Counter()
+
+
+def shard(session, worker_index, worker_count, lanes):
+    """Lane of a session on this worker, or None if another worker owns the session."""
+    h = zlib.crc32(session.encode())
+    if h % worker_count != worker_index:
+        return None
+    return (h // worker_count) % lanes
+
+
+def _dispatch(lane, item, stalled):
+    """
+    Queue an entry on a lane. A full lane is waited for until the entry is
+    ACCESS_LOG_LANE_TIMEOUT overdue, then stalled: its entries are dropped until
+    it has room again. Once all users are spawned, full lanes without a user are
+    stalled right away. stalled is the set of stalled lanes.
+    """
+    queue = _lanes[lane]
+    if queue.full():
+        if lane in stalled:
+            counts["dropped"] += 1
+            return
+        users = _runner.user_count
+        if utils.spawning_complete and lane >= users:
+            if not any(stalled_lane >= users for stalled_lane in stalled):
+                logging.warning(f"Access log replay lanes {users}-{len(_lanes) - 1} have no user "
+                                f"({users} users on this worker), dropping their entries")
+            stalled.add(lane)
+            counts["dropped"] += 1
+            return
+    stalled.discard(lane)
+    try:
+        queue.put(item, timeout=max(item[0] - time.time(), 0) + config.ACCESS_LOG_LANE_TIMEOUT)
+    except Full:
+        stalled.add(lane)
+        counts["dropped"] += 1
+        logging.warning(f"Access log replay lane {lane} is {config.ACCESS_LOG_LANE_TIMEOUT} s behind "
+                        f"({'its user falls behind' if lane < _runner.user_count else 'no user'}), dropping its entries")
+
+
+def _read_loop(path, worker_index, worker_count, started):
+    """Reader greenlet: dispatch this worker's log entries to the lanes, then mark the end."""
+    global _reading
+    first = None
+    stalled = set()
+    try:
+        for timestamp, session, method, log_path in read_log(path):
+            if first is None:
+                first = timestamp
+            lane = shard(session, worker_index, worker_count, len(_lanes))
+            if lane is None:
+                continue
+            route, params = match_route(method, log_path)
+            if route is None:
+                counts["unmapped"] += 1
+                key = f"{method} {'/'.join(urlsplit(log_path).path.split('/')[:5])}"
+                if key in unmapped or len(unmapped) < _UNMAPPED_KEYS_LIMIT:
+                    unmapped[key] += 1
+                continue
+            if route.handler is None:
+                counts["covered"] += 1
+                continue
+            offset = (timestamp - first) / config.ACCESS_LOG_SPEED if config.ACCESS_LOG_SPEED else 0
+            ahead = started + offset - config.ACCESS_LOG_READ_AHEAD - time.time()
+            if ahead > 0:
+                gevent.sleep(ahead)
+            _dispatch(lane, (started + offset, route, params), stalled)
+    except Exception as e:
+        logging.error(f"Access log replay stopped reading {path}: {e!r}")
+    _reading = False
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Create the lanes and start reading the log (workers and local mode only)."""
+    global _lanes, _next_lane, _reader, _reading, _runner
+    if not config.ACCESS_LOG_FILE or isinstance(environment.runner, MasterRunner):
+        return
+    _runner = environment.runner
+    counts.clear()
+    unmapped.clear()
+    _lanes = [Queue(maxsize=config.ACCESS_LOG_QUEUE_SIZE) for _ in range(config.ACCESS_LOG_LANES)]
+    _next_lane = 0
+    _reading = True
+    _reader = gevent.spawn(_read_loop, config.ACCESS_LOG_FILE, *seeding.shard(environment), time.time())
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    global _reader, _reading
+    if _reader is None:
+        return
+    _reader.kill(block=False)
+    _reader = None
+    _reading = False
+    logging.info(f"Access log replay: {counts['replayed']} replayed, {counts['covered']} covered by other calls, "
+                 f"{counts['failed']} failed, {counts['unmapped']} unmapped, "
+                 f"{counts['dropped']} dropped on full lanes")
+    for key, n in unmapped.most_common(UNMAPPED_SUMMARY_SIZE):
+        logging.info(f"  unmapped: {key} ({n})")
+
+
+class LogReplayUser(FastHttpUser):
+    """Replays the sessions of one lane in log order, then stops."""
+    wait_time = constant(0)
+    network_timeout = config.NETWORK_TIMEOUT
+    connection_timeout = config.CONNECTION_TIMEOUT
+
+    def on_start(self):
+        global _next_lane
+        if _next_lane >= len(_lanes):
+            raise StopUser()
+        self.queue = _lanes[_next_lane]
+        _next_lane += 1
+        seeding.attach(self)
+        bandwidth.attach(self)
+        tracing.attach(self)
+        self.hs = seeding.rng().choices([True, False], weights=[config.HS_PERCENTAGE, config.OTHER_PERCENTAGE])[0]
+        self.user_id = self.headers = self.admin_headers = None
+
+    def ensure_user(self):
+        """Log the lane in as a user if it has not logged in yet."""
+        if self.headers is None:
+            _login(self, None)
+
+    def ensure_admin(self):
+        """Admin headers of the lane, logging in on first use."""
+        if self.admin_headers is None:
+            self.admin_id, self.admin_headers = session_pool.login_admin(self.client)
+        return self.admin_headers
+
+    @task
+    def replay(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=1)
+            except Empty:
+                if not _reading:
+                    raise StopUser()
+                continue
+            due, route, params = item
+            delay = due - time.time()
+            if delay > 0:
+                gevent.sleep(delay)
+            try:
+                route.handler(self, params)
+                counts["replayed"] += 1
+            except Exception as e:
+                counts["failed"] += 1
+                logging.debug(f"Access log replay of {route.pattern.pattern} failed: {e!r}")
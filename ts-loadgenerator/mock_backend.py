@@ -0,0 +1,366 @@
+"""
+Mock Train-Ticket Backend for Load-Generator Calibration
+
+A lightweight asyncio HTTP/1.1 stub (standard library only) that answers every
+endpoint api_user.py and api_admin.py call, so the load generator's own ceiling
+(requests/s per core, memory per user) can be measured without the full
+deployment. Responses have the shape the generator parses and realistic sizes
+(search results, order and admin listings scale with MOCK_* sizes in config.py).
+Every response is delayed by a latency drawn from MOCK_LATENCY, or from the
+MOCK_LATENCY_ROUTES entry of its payload name, in the delay format of
+delays.py (shared with the think times of scenarios.py).
+
+The stub is stateless: payloads are rendered once at start-up and orders keep
+their listed statuses whatever is paid, cancelled or collected. Unknown paths
+get an empty success response. Pages and static assets carry ETag and
+Last-Modified validators and are answered with 304 Not Modified when the
+client's If-None-Match matches. With --processes N, N processes share the port
+(SO_REUSEPORT) so the stub does not become the bottleneck.
+
+Usage:
+    python mock_backend.py --port 8080 --processes 2
+    locust -f locustfile.py --host http://127.0.0.1:8080
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import multiprocessing
+import random
+import re
+import signal
+import sys
+import time
+import zlib
+from email.utils import formatdate
+from urllib.parse import urlsplit
+
+import config
+import delays
+
+# Deterministic payload content
+_rng = random.Random(0)
+
+TRAIN_TYPES = {"G": "GaoTieOne", "D": "DongCheOne", "Z": "ZhiDa", "T": "TeKuai", "K": "KuaiSu"}
+# Static payloads were "deployed" a week before start-up
+LAST_MODIFIED = formatdate(time.time() - 7 * 86400, usegmt=True)
+STATIONS = sorted({s for route in config.HS_TRIP_LIST + config.OTHER_TRIP_LIST for s in route})
+
+
+def latency(spec):
+    """Compile a latency spec (see delays.py, no delay by default) into a function rng -> seconds."""
+    return delays.compile_delay(spec or {}, default_dist="none")
+
+
+# ============================================================================
+# PAYLOADS
+# ============================================================================
+
+def envelope(data, msg="Success"):
+    return {"status": 1, "msg": msg, "data": data}
+
+
+def _id(prefix, i):
+    return f"{prefix}{i:08d}-0000-4000-8000-{_rng.getrandbits(48):012x}"
+
+
+def train_number(i):
+    prefix = "GDZTK"[i % 5]
+    return f"{prefix}{2000 + i % 2000}"
+
+
+def route_entry(i):
+    stations = (config.HS_TRIP_LIST + config.OTHER_TRIP_LIST)[i % (len(config.HS_TRIP_LIST) + len(config.OTHER_TRIP_LIST))]
+    return {"id": _id("r", i), "stations": stations, "distances": [j * 150 for j in range(len(stations))],
+            "startStation": stations[0], "endStation": stations[-1]}
+
+
+def trip_entry(i):
+    number = train_number(i)
+    start, end = _rng.sample(STATIONS, 2)
+    return {"tripId": {"type": number[0], "number": number[1:]}, "trainTypeName": TRAIN_TYPES[number[0]],
+            "startStation": start, "terminalStation": end, "startTime": "2013-05-04 09:00:00",
+            "endTime": "2013-05-04 15:51:52", "economyClass": 1073741823, "confortClass": 1073741823,
+            "priceForEconomyClass": f"{_rng.uniform(20, 300):.1f}", "priceForConfortClass": f"{_rng.uniform(50, 600):.1f}"}
+
+
+def travel_entry(i):
+    number = train_number(i)
+    route = route_entry(i)
+    return {"trip": {"id": _id("t", i), "tripId": {"type": number[0], "number": number[1:]},
+                     "trainTypeName": TRAIN_TYPES[number[0]], "routeId": route["id"],
+                     "startStationName": route["startStation"], "stationsName": "",
+                     "terminalStationName": route["endStation"],
+                     "startTime": "2013-05-04 09:00:00", "endTime": "2013-05-04 15:51:52"},
+            "trainType": {"name": TRAIN_TYPES[number[0]], "economyClass": 1073741823, "confortClass": 1073741823,
+                          "averageSpeed": 250},
+            "route": route}
+
+
+def order_entry(i, status=None):
+    number = train_number(i)
+    return {"id": _id("o", i), "boughtDate": 1367629320000 + i * 1000, "travelDate": "2013-05-04",
+            "travelTime": "2013-05-04 09:00:00", "accountId": _id("u", i % 50), "contactsName": f"Contact_{i % 10}",
+            "documentType": 1, "contactsDocumentNumber": f"DocumentNumber_{i % 10}", "trainNumber": number,
+            "coachNumber": 5, "seatClass": 2, "seatNumber": f"FirstClass-{i % 30}", "from": "shanghai",
+            "to": "suzhou", "status": i % 3 if status is None else status, "price": f"{_rng.uniform(20, 300):.2f}"}
+
+
+def contact_entry(i):
+    return {"id": _id("c", i), "accountId": _id("u", i % 50), "name": f"Contact_{i}", "documentType": 1,
+            "documentNumber": f"DocumentNumber_{i}", "phoneNumber": f"1{_rng.getrandbits(32):010d}"[:11]}
+
+
+def user_entry(i):
+    return {"userId": _id("u", i), "userName": f"user_{i}", "password": "111111", "gender": i % 2,
+            "documentType": 1, "documentNum": f"{_rng.getrandbits(40):012d}", "email": f"user_{i}@example.com"}
+
+
+def html_page(title, size):
+    """Static page of about `size` bytes."""
+    filler = "".join(f'<div class="row"><span>{title} {i}</span></div>\n' for i in range(size // 40))
+    return f"<!DOCTYPE html><html><head><title>{title}</title></head><body>\n{filler}</body></html>"
+
+
+def build_payloads():
+    """Render all response bodies once: name -> bytes."""
+    n = config.MOCK_LISTING_SIZE
+    login = envelope({"userId": _id("u", 0), "username": "fdse_microservice",
+                      "token": "eyJhbGciOiJIUzI1NiJ9." + "x" * 180 + ".signature"})
+    bodies = {
+        "index": html_page("Train Ticket", 12000),
+        "client_login": html_page("Login", 6000),
+        "admin": html_page("Admin", 9000),
+        "script": "".join(f"function f{i}(a){{return a*{i}+{_rng.random()};}}\n" for i in range(2000)),
+        "style": "".join(f".c{i}{{margin:{i % 9}px;color:#{_rng.getrandbits(24):06x}}}\n" for i in range(800)),
+        "image": bytes(_rng.getrandbits(8) for _ in range(8000)),
+        "login": login,
+        "trips": envelope([trip_entry(i) for i in range(config.MOCK_TRIPS_PER_SEARCH)]),
+        "travel_plan": envelope([dict(trip_entry(i), numberOfRestTicketFirstClass=100,
+                                      numberOfRestTicketSecondClass=200, stopStations=STATIONS[:4])
+                                 for i in range(config.MOCK_TRIPS_PER_SEARCH)]),
+        "basic_travel": envelope({"status": True, "percent": 1.0, "trainType": travel_entry(0)["trainType"],
+                                  "route": route_entry(0), "prices": {"economyClass": 22.5, "confortClass": 50.0}}),
+        "station": envelope(_id("s", 0)),
+        "assurances": envelope([{"index": 1, "name": "Traffic Accident Assurance", "price": 3.0}]),
+        "foods": envelope({"trainFoodList": [{"foodName": f"Food_{i}", "price": 2.5 + i} for i in range(6)],
+                           "foodStoreListMap": {s: [{"storeName": f"Store_{s}", "foodList": [
+                               {"foodName": f"Snack_{i}", "price": 1.5 + i} for i in range(4)]}]
+                                                for s in STATIONS[:4]}}),
+        "contacts_account": envelope([contact_entry(i) for i in range(3)]),
+        "preserve": envelope("Success.", msg="Success."),
+        "orders": envelope([order_entry(i) for i in range(config.MOCK_ORDERS_PER_ACCOUNT)]),
+        "ok": envelope(None),
+        "voucher": {"voucher_id": 1, "order_id": _id("o", 0), "travelDate": "2013-05-04", "contactName": "Contact_0",
+                    "trainNumber": "G1234", "seatClass": 2, "seatNumber": "FirstClass-1", "startStation": "shanghai",
+                    "destStation": "suzhou", "price": 22.5},
+        "verify_code": bytes(_rng.getrandbits(8) for _ in range(2500)),
+        "consign_price": envelope(_rng.uniform(10, 100)),
+        "consign_config": envelope({"id": _id("p", 0), "index": 0, "initialWeight": 5.0, "initialPrice": 8.0,
+                                    "withinPrice": 2.0, "beyondPrice": 4.0}),
+        "consigns": envelope([{"id": _id("g", i), "orderId": _id("o", i), "accountId": _id("u", 0),
+                               "handleDate": "2013-05-04", "targetDate": "2013-05-05", "from": "shanghai",
+                               "to": "suzhou", "consignee": f"Consignee_{i}", "phone": "12345678901",
+                               "weight": 10.0, "price": 28.0, "isWithin": True} for i in range(3)]),
+        "user": envelope(user_entry(0)),
+        "users": envelope([user_entry(i) for i in range(n)]),
+        "stations": envelope([{"id": _id("s", i), "name": s, "stayTime": 5} for i, s in enumerate(STATIONS)]),
+        "trains": envelope([{"id": _id("n", i), "name": name, "economyClass": 1073741823,
+                             "confortClass": 1073741823, "averageSpeed": 200 + 20 * i}
+                            for i, name in enumerate(TRAIN_TYPES.values())]),
+        "routes": envelope([route_entry(i) for i in range(len(config.HS_TRIP_LIST) + len(config.OTHER_TRIP_LIST))]),
+        "prices": envelope([{"id": _id("p", i), "trainType": TRAIN_TYPES[train_number(i)[0]],
+                             "routeId": _id("r", i), "basicPriceRate": 0.38, "firstClassPriceRate": 1.0}
+                            for i in range(n)]),
+        "configs": envelope([{"name": "DirectTicketAllocationProportion", "value": "0.5",
+                              "description": "Allocation Proportion Of The Direct Ticket"}]),
+        "admin_travels": envelope([travel_entry(i) for i in range(n)]),
+        "admin_orders": envelope([order_entry(i) for i in range(n)]),
+        "admin_contacts": envelope([contact_entry(i) for i in range(n)]),
+    }
+    return {name: body if isinstance(body, bytes) else
+            (body.encode() if isinstance(body, str) else json.dumps(body).encode())
+            for name, body in bodies.items()}
+
+
+# Payloads served with ETag and Last-Modified validators, like nginx serves ts-ui-dashboard
+STATIC_PAYLOADS = {"index", "client_login", "admin", "script", "style", "image"}
+
+# (method or None for any, path regex, payload name, content type); first match wins
+ROUTES = [
+    ("GET", r"/(index\.html)?", "index", "text/html"),
+    ("GET", r"/client_login\.html", "client_login", "text/html"),
+    ("GET", r"/admin\.html", "admin", "text/html"),
+    ("GET", r"/.*\.js", "script", "application/javascript"),
+    ("GET", r"/.*\.css", "style", "text/css"),
+    ("GET", r"/.*\.(png|jpe?g|gif|ico)", "image", "image/png"),
+    ("POST", r"/api/v1/users/login", "login", None),
+    ("POST", r"/api/v1/travel2?service/trips/left", "trips", None),
+    ("POST", r"/api/v1/travelplanservice/travelPlan/\w+", "travel_plan", None),
+    ("POST", r"/api/v1/basicservice/basic/travels?", "basic_travel", None),
+    ("GET", r"/api/v1/basicservice/basic/[^/]+", "station", None),
+    ("GET", r"/api/v1/assuranceservice/assurances/types", "assurances", None),
+    ("GET", r"/api/v1/foodservice/foods/.*", "foods", None),
+    ("GET", r"/api/v1/contactservice/contacts/account/[^/]+", "contacts_account", None),
+    ("POST", r"/api/v1/preserve(other)?service/preserve(Other)?", "preserve", None),
+    ("POST", r"/api/v1/order(service/order|OtherService/orderOther)/refresh", "orders", None),
+    ("POST", r"/getVoucher", "voucher", None),
+    ("GET", r"/api/v1/verifycode/generate", "verify_code", "image/jpeg"),
+    ("GET", r"/api/v1/consignpriceservice/consignprice/config", "consign_config", None),
+    ("GET", r"/api/v1/consignpriceservice/consignprice/price", "consign_config", None),
+    ("GET", r"/api/v1/consignpriceservice/consignprice/[^/]+/[^/]+", "consign_price", None),
+    ("GET", r"/api/v1/consignservice/consigns/.*", "consigns", None),
+    ("GET", r"/api/v1/userservice/users/id/[^/]+", "user", None),
+    ("GET", r"/api/v1/userservice/users/[^/]+", "user", None),
+    ("GET", r"/api/v1/(admin)?userservice/users", "users", None),
+    ("GET", r"/api/v1/stationservice/stations", "stations", None),
+    ("GET", r"/api/v1/adminbasicservice/adminbasic/stations", "stations", None),
+    ("GET", r"/api/v1/(trainservice/trains|adminbasicservice/adminbasic/trains)", "trains", None),
+    ("GET", r"/api/v1/(routeservice/routes|adminrouteservice/adminroute)", "routes", None),
+    ("GET", r"/api/v1/(priceservice/prices|adminbasicservice/adminbasic/prices)", "prices", None),
+    ("GET", r"/api/v1/adminbasicservice/adminbasic/configs", "configs", None),
+    ("GET", r"/api/v1/admintravelservice/admintravel", "admin_travels", None),
+    ("GET", r"/api/v1/adminorderservice/adminorder", "admin_orders", None),
+    ("GET", r"/api/v1/adminbasicservice/adminbasic/contacts", "admin_contacts", None),
+    (None, r"/.*", "ok", None),
+]
+
+
+class Route:
+    """
+    A compiled ROUTES entry with its rendered body (plain and gzip), latency and,
+    for static payloads, the validator headers (ETag, Last-Modified).
+    """
+
+    def __init__(self, method, pattern, body, content_type, delay, static=False):
+        self.method = method
+        self.pattern = re.compile(pattern + r"/?$")
+        self.body = body
+        self.gzipped = gzip.compress(body, 6)
+        self.content_type = content_type or "application/json;charset=UTF-8"
+        self.delay = delay
+        self.etag = f'"{zlib.crc32(body):08x}-{len(body):x}"' if static else None
+        self.validators = f"ETag: {self.etag}\r\nLast-Modified: {LAST_MODIFIED}\r\n" if static else ""
+        self.served = 0
+
+
+def compile_routes():
+    """Routes with rendered payloads and their latency distributions."""
+    payloads = build_payloads()
+    default = latency(config.MOCK_LATENCY)
+    overrides = {name: latency(spec) for name, spec in config.MOCK_LATENCY_ROUTES.items()}
+    return [Route(method, pattern, payloads[name], content_type, overrides.get(name, default),
+                  static=name in STATIC_PAYLOADS)
+            for method, pattern, name, content_type in ROUTES]
+
+
+def resolve(routes, method, path):
+    """First route matching the request (the last route matches everything)."""
+    for route in routes:
+        if (route.method is None or route.method == method) and route.pattern.match(path):
+            return route
+    return routes[-1]
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+async def handle(routes, compress, reader, writer):
+    """Serve keep-alive HTTP/1.1 requests on one connection."""
+    rng = random.Random()
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                key, _, value = line.partition(":")
+                if key:
+                    headers[key.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length:
+                await reader.readexactly(length)
+
+            route = resolve(routes, method, urlsplit(target).path)
+            route.served += 1
+            delay = route.delay(rng)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if route.etag and headers.get("if-none-match") == route.etag:
+                writer.write(f"HTTP/1.1 304 Not Modified\r\n{route.validators}Content-Length: 0\r\n\r\n".encode())
+            else:
+                body, encoding = route.body, ""
+                if compress and "gzip" in headers.get("accept-encoding", ""):
+                    body, encoding = route.gzipped, "Content-Encoding: gzip\r\n"
+                writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {route.content_type}\r\n{route.validators}"
+                             f"{encoding}Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def report(routes, interval):
+    """Print the served request rate every `interval` seconds."""
+    last, last_time = 0, time.time()
+    while True:
+        await asyncio.sleep(interval)
+        served, now = sum(r.served for r in routes), time.time()
+        if served != last:
+            print(f"mock backend: {(served - last) / (now - last_time):.0f} req/s", flush=True)
+        last, last_time = served, now
+
+
+async def serve(host, port, compress, reuse_port, report_interval):
+    routes = compile_routes()
+    server = await asyncio.start_server(lambda r, w: handle(routes, compress, r, w), host, port,
+                                        reuse_port=reuse_port, backlog=1024)
+    if report_interval:
+        asyncio.ensure_future(report(routes, report_interval))
+    async with server:
+        await server.serve_forever()
+
+
+def run(host, port, compress=False, reuse_port=False, report_interval=0):
+    try:
+        asyncio.run(serve(host, port, compress, reuse_port, report_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Train-Ticket backend for load-generator calibration")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address")
+    parser.add_argument("--port", type=int, default=8080, help="Listen port")
+    parser.add_argument("--processes", type=int, default=1, help="Server processes sharing the port")
+    parser.add_argument("--gzip", action="store_true", help="Gzip responses for clients that accept it")
+    parser.add_argument("--report-interval", type=float, default=10, help="Seconds between rate reports (0 = off)")
+    args = parser.parse_args()
+
+    print(f"Mock backend on http://{args.host}:{args.port} ({args.processes} processes)", flush=True)
+    if args.processes == 1:
+        run(args.host, args.port, args.gzip, False, args.report_interval)
+        return
+    workers = [multiprocessing.Process(target=run, args=(args.host, args.port, args.gzip, True, args.report_interval),
+                                       daemon=True)
+               for _ in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    # Daemon processes are terminated when this process exits, also on SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Client-Side Order State for Train-Ticket Load Testing
+
+Tracks the orders of every account used on this worker as a small state machine
+(BOOKED -> PAID -> COLLECTED -> EXECUTED, BOOKED -> CANCELLED) that is updated
+from the responses of the generator's own pay, cancel, collect and execute calls.
+Behaviors pick their next order from this local view instead of listing all
+orders through /order/refresh before every action. A train class (HS or other)
+is re-listed only when its view is stale (after a booking, since preserve does
+not return the order ID, or after a failed action) or at ORDER_RECONCILE_RATE,
+so order-service list load is a deliberate, tunable part of the mix.
+"""
+
+import api_user
+import config
+import seeding
+
+# High-speed train number prefixes; HS orders are listed by ts-order-service
+HS_TRAIN_TYPES = ("G", "D")
+
+# Order books per account ID (several users on the worker may share an account)
+_books = {}
+
+
+def is_hs(order):
+    """True if the order belongs to a high-speed train (ts-order-service)."""
+    return str(order.get("trainNumber", "")).startswith(HS_TRAIN_TYPES)
+
+
+class OrderBook:
+    """Local view of one account's orders, per train class."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.orders = {True: {}, False: {}}  # hs -> order ID -> order dict as listed by /refresh
+        self.stale = {True: True, False: True}
+
+    def refresh(self, client, hs, headers):
+        """List the orders of one train class through /refresh and replace the local view."""
+        orders = api_user.get_all_orders(client, self.user_id, hs=hs, headers=headers) or []
+        self.orders[hs] = {o["id"]: o for o in orders if "id" in o}
+        self.stale[hs] = False
+        return list(self.orders[hs].values())
+
+    def reconcile(self, client, headers, hs=None, force=False):
+        """Refresh the given (or both) train classes if stale, forced or drawn at the reconciliation rate."""
+        for train_class in (True, False) if hs is None else (hs,):
+            if (force or self.stale[train_class] or not config.ORDER_STATE_ENABLED
+                    or seeding.rng().random() < config.ORDER_RECONCILE_RATE):
+                self.refresh(client, train_class, headers)
+
+    def find(self, client, headers, statuses, hs=None):
+        """Return the first order in one of the given statuses (reconciling first if due), or None."""
+        self.reconcile(client, headers, hs)
+        for train_class in (True, False) if hs is None else (hs,):
+            for order in self.orders[train_class].values():
+                if order.get("status") in statuses:
+                    return order
+        return None
+
+    def booked(self, hs):
+        """A booking was made; its order ID is only known after the next refresh."""
+        self.stale[hs] = True
+
+    def invalidate(self):
+        """Orders were changed behind the generator's back (e.g. deleted); re-list both classes."""
+        self.stale = {True: True, False: True}
+
+    def apply(self, order, status, result):
+        """Move the order to status if the action succeeded, otherwise mark its train class stale."""
+        if result and result.get("status") == 1:
+            order["status"] = status
+        else:
+            self.stale[is_hs(order)] = True
+
+
+def book_for(user_id):
+    """Order book of the given account, created on first use."""
+    book = _books.get(user_id)
+    if book is None:
+        book = _books[user_id] = OrderBook(user_id)
+    return book
+
+
+def record_booking(user_id, hs):
+    """Note that an order was booked for user_id in the given train class."""
+    book_for(user_id).booked(hs)
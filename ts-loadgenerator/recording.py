@@ -0,0 +1,138 @@
+"""
+Request Recording and Replay for Train-Ticket Load Testing
+
+Record mode (RECORD_FILE) writes every request a simulated user sends as one
+JSON line: offset from the test start, user key (see seeding.py), method,
+path, stats name, body and the Authorization/Content-Type headers. Replay mode
+(REPLAY_FILE) runs ReplayUser instead of the personas: each replay user takes
+one recorded session and re-issues its exact request sequence, with the
+original timing or scaled by REPLAY_SPEED. Useful to compare two backend
+versions under the identical request sequence.
+
+Recorded tokens are replayed as they are, so replay against the same deployment
+while the tokens are still valid (or with long-lived tokens).
+"""
+
+import json
+import logging
+import time
+import zlib
+from urllib.parse import urlsplit
+
+import gevent
+from locust import FastHttpUser, constant, events, task
+from locust.exception import StopUser
+from locust.runners import MasterRunner, WorkerRunner
+
+import config
+import journeys
+import seeding
+
+# Headers recorded with each request
+RECORDED_HEADERS = ("Authorization", "Content-Type")
+
+_record_file = None
+_record_start = None
+
+# Recorded sessions of this worker not yet claimed by a replay user, and the replay start
+_sessions = []
+_replay_start = None
+
+
+def record_path(environment):
+    """Recording file of this process; workers append their index."""
+    if isinstance(environment.runner, WorkerRunner):
+        return f"{config.RECORD_FILE}.{seeding.worker_index(environment)}"
+    return config.RECORD_FILE
+
+
+def record_entry(start_time, key, method, url, name, request):
+    """JSON line of one recorded request."""
+    split = urlsplit(url)
+    sent_headers = getattr(request, "headers", None) or {}
+    payload = getattr(request, "payload", None)
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", "replace")
+    return json.dumps({
+        "t": round(start_time - _record_start, 6),
+        "user": key,
+        "method": method,
+        "path": split.path + (f"?{split.query}" if split.query else ""),
+        "name": name,
+        "body": payload,
+        "headers": {h: sent_headers[h] for h in RECORDED_HEADERS if h in sent_headers},
+    })
+
+
+def load_sessions(path, worker_index, worker_count):
+    """Recorded sessions (list of (key, entries)) owned by this worker: crc32(key) % worker_count."""
+    sessions = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            key = entry["user"]
+            if zlib.crc32(key.encode()) % worker_count == worker_index:
+                sessions.setdefault(key, []).append(entry)
+    for entries in sessions.values():
+        entries.sort(key=lambda e: e["t"])
+    return sorted(sessions.items())
+
+
+@events.request.add_listener
+def on_request(request_type, name, start_time, url, response, **kwargs):
+    """Write the request to the recording if it was sent by a simulated user."""
+    if _record_file is None or url is None or request_type in journeys.METRIC_REQUEST_TYPES:
+        return
+    key = seeding.current_key()
+    if key is None:
+        return
+    request = getattr(response, "request", None)
+    _record_file.write(record_entry(start_time, key, request_type, url, name, request) + "\n")
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Open the recording or load this worker's share of the replay (workers and local mode only)."""
+    global _record_file, _record_start, _sessions, _replay_start
+    if isinstance(environment.runner, MasterRunner):
+        return
+    if config.RECORD_FILE:
+        _record_file = open(record_path(environment), "w")
+        _record_start = time.time()
+    if config.REPLAY_FILE:
+        _sessions = load_sessions(config.REPLAY_FILE, *seeding.shard(environment))
+        _replay_start = time.time()
+        logging.info(f"Replay: {len(_sessions)} recorded sessions on this worker")
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    global _record_file
+    if _record_file is not None:
+        _record_file.close()
+        _record_file = None
+
+
+class ReplayUser(FastHttpUser):
+    """Re-issues the request sequence of one recorded user session, then stops."""
+    wait_time = constant(0)
+    network_timeout = config.NETWORK_TIMEOUT
+    connection_timeout = config.CONNECTION_TIMEOUT
+
+    def on_start(self):
+        if not _sessions:
+            raise StopUser()
+        self.key, self.entries = _sessions.pop(0)
+
+    @task
+    def replay(self):
+        for entry in self.entries:
+            if config.REPLAY_SPEED:
+                delay = _replay_start + entry["t"] / config.REPLAY_SPEED - time.time()
+                if delay > 0:
+                    gevent.sleep(delay)
+            self.client.request(entry["method"], entry["path"], name=entry["name"],
+                                data=entry.get("body"), headers=dict(entry.get("headers") or {}))
+        raise StopUser()
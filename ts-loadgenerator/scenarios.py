@@ -0,0 +1,227 @@
+"""
+Markov-Chain Scenario Engine for Train-Ticket Load Testing
+
+Describes personas as Markov chains over the behavior functions in
+user_behaviors.py instead of independent weighted tasks, so that funnels
+(search -> book -> pay -> collect) and per-session transitions can be
+expressed. A scenario file (YAML or JSON) is compiled into alias tables for
+O(1) transition sampling and is reloaded when it changes, e.g. between test
+stages, without restarting workers.
+
+Scenario file format (see scenario_funnel.yaml):
+
+    personas:
+      Logged:                                   # persona = TaskSet class name without "Behavior"
+        start: {search_trips: 3, browse_infrastructure: 1}   # or a single state name
+        think: {dist: uniform, min: 1, max: 5}  # default think time after each state
+        states:
+          search_trips:
+            next: {search_trips: 2, book_ticket_complete_flow: 1}
+          book_ticket_complete_flow:
+            think: {dist: exponential, mean: 4}
+            next: {collect_and_execute_ticket: 1, restart: 1}
+
+Weights are relative. "restart" ends the session and draws a new start state.
+States that are only named as targets go back to the start distribution.
+Think time distributions (see delays.py): constant (value), uniform (min, max),
+exponential (mean, max), lognormal (median, sigma, max) and none.
+
+Personas missing from the file keep their weighted `tasks` dict.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+
+from locust import TaskSet, events
+
+import config
+import delays
+import seeding
+import user_behaviors
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Transition target that ends the session and restarts from the start distribution
+RESTART = "restart"
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(1) sampling from a fixed discrete distribution."""
+
+    def __init__(self, outcomes, weights):
+        if not outcomes or len(outcomes) != len(weights):
+            raise ValueError("Alias table needs one weight per outcome")
+        total = float(sum(weights))
+        if total <= 0 or any(w < 0 for w in weights):
+            raise ValueError(f"Invalid transition weights {weights}")
+        n = len(outcomes)
+        self.outcomes = list(outcomes)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        i = int(rng.random() * len(self.outcomes))
+        return self.outcomes[i] if rng.random() < self.prob[i] else self.outcomes[self.alias[i]]
+
+
+def think_time(spec):
+    """Compile a think time spec (see delays.py) into a function rng -> seconds, None without spec."""
+    if spec is None:
+        return None
+    return delays.compile_delay(spec)
+
+
+def weights_table(spec):
+    """Alias table for a {target: weight} mapping or a single target name."""
+    if isinstance(spec, str):
+        spec = {spec: 1}
+    return AliasTable(list(spec), [float(w) for w in spec.values()])
+
+
+class State:
+    """One state of a persona chain: the behavior to run, its think time and the next-state table."""
+
+    def __init__(self, name, task, think, transitions):
+        self.name = name
+        self.task = task
+        self.think = think
+        self.transitions = transitions  # None: back to the start distribution
+
+
+class Chain:
+    """Compiled Markov chain of one persona."""
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.start = weights_table(spec["start"])
+        if RESTART in self.start.outcomes:
+            raise ValueError(f"Persona {name}: '{RESTART}' is not a valid start state")
+        default_think = think_time(spec.get("think"))
+        state_specs = spec.get("states") or {}
+
+        targets = set(self.start.outcomes)
+        for state_spec in state_specs.values():
+            targets.update((state_spec or {}).get("next") or {})
+        targets.discard(RESTART)
+
+        self.states = {}
+        for state in sorted(targets | set(state_specs)):
+            task = getattr(user_behaviors, state, None)
+            if not callable(task):
+                raise ValueError(f"Persona {name}: unknown behavior '{state}' in user_behaviors.py")
+            state_spec = state_specs.get(state) or {}
+            think = think_time(state_spec.get("think")) or default_think
+            transitions = weights_table(state_spec["next"]) if state_spec.get("next") else None
+            self.states[state] = State(state, task, think, transitions)
+
+    def next_state(self, state, rng=random):
+        """Draw the state following `state` (None = start of a session)."""
+        current = self.states.get(state)
+        table = current.transitions if current is not None and current.transitions is not None else self.start
+        following = table.sample(rng)
+        return self.start.sample(rng) if following == RESTART else following
+
+
+def load_file(path):
+    """Read a YAML or JSON scenario file."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("PyYAML is required for YAML scenario files (or use JSON)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def compile_scenario(spec):
+    """Compile a scenario dict into {persona: Chain}."""
+    return {name: Chain(name, persona) for name, persona in (spec.get("personas") or {}).items()}
+
+
+# Compiled personas of the current scenario file, swapped as a whole on reload
+_chains = {}
+_loaded_mtime = None
+_last_check = 0.0
+
+
+def reload_if_changed(force=False):
+    """
+    (Re)compile SCENARIO_FILE if it changed since the last load. A file that fails
+    to compile is logged and the previous scenario stays active.
+    """
+    global _chains, _loaded_mtime, _last_check
+    _last_check = time.time()
+    path = config.SCENARIO_FILE
+    if not path:
+        _chains, _loaded_mtime = {}, None
+        return
+    try:
+        mtime = os.stat(path).st_mtime
+        if not force and mtime == _loaded_mtime:
+            return
+        chains = compile_scenario(load_file(path))
+    except Exception as e:
+        logging.error(f"Scenario file {path} not loaded, keeping the previous scenario: {e!r}")
+        return
+    _chains, _loaded_mtime = chains, mtime
+    logging.info(f"Scenario {path} loaded: {', '.join(sorted(chains)) or 'no personas'}")
+
+
+def chain(persona):
+    """Compiled chain of a persona, or None; checks the file for changes every SCENARIO_RELOAD_INTERVAL."""
+    if config.SCENARIO_FILE and time.time() - _last_check > config.SCENARIO_RELOAD_INTERVAL:
+        reload_if_changed()
+    return _chains.get(persona)
+
+
+class MarkovTaskSet(TaskSet):
+    """
+    TaskSet that follows its persona's chain from the scenario file (persona defaults to
+    the class name without "Behavior"). Without a chain it behaves like a plain TaskSet.
+    """
+
+    persona = None
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self._chain = None
+        self._state = None
+
+    def get_next_task(self):
+        current = chain(self.persona or type(self).__name__.replace("Behavior", ""))
+        if current is None:
+            self._chain = self._state = None
+            return seeding.rng().choice(self.tasks) if self.tasks else super().get_next_task()
+        if current is not self._chain:
+            # New or reloaded scenario: start a new session
+            self._chain, self._state = current, None
+        self._state = current.next_state(self._state, seeding.rng())
+        return current.states[self._state].task
+
+    def wait_time(self):
+        state = self._chain.states.get(self._state) if self._chain is not None else None
+        if state is not None and state.think is not None:
+            return state.think(seeding.rng())
+        return super().wait_time()
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Pick up scenario changes at the start of every test (stage)."""
+    reload_if_changed()
@@ -0,0 +1,203 @@
+"""
+Bulk Dataset Seeding Tool for Train-Ticket Load Testing
+
+Grows the tiny InitData set to a TPC-style scale factor so that backend caches
+and queries are exercised against realistic data volumes. Stations, trips,
+users, contacts and orders are created through the admin APIs with a
+configurable number of concurrent requests. Every row has a deterministic key
+(station name, trip number, user name, contact/order document number), so
+reruns only create what is missing. Seeded users follow the account-pool
+naming scheme and can be used directly as the load-test account pool. Seeded
+orders book the seeded trips, whose numbers lie outside the range that admin
+delete behaviors remove.
+
+Usage:
+    python seed.py --host http://ts-ui-dashboard:8080 --scale 10 --concurrency 32
+"""
+
+import argparse
+import time
+
+import gevent
+from gevent.pool import Pool
+from locust import events
+from locust.contrib.fasthttp import FastHttpSession
+from locust.env import Environment
+
+import account_pool
+import api_admin
+import config
+import session_pool
+
+# Seeding order matters: contacts and orders reference seeded users
+TABLES = ["stations", "trips", "users", "contacts", "orders"]
+
+
+class Progress:
+    """Per-table counters with periodic progress and rows/second reporting."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counts = {table: {"target": 0, "existing": 0, "created": 0, "failed": 0} for table in TABLES}
+
+    def record(self, table, result):
+        """Count a create call as created or failed based on the Train-Ticket response status."""
+        key = "created" if result and result.get("status") == 1 else "failed"
+        self.counts[table][key] += 1
+
+    def report(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        created = sum(c["created"] for c in self.counts.values())
+        parts = [f"{t}: {c['existing'] + c['created']}/{c['target']}" + (f" ({c['failed']} failed)" if c["failed"] else "")
+                 for t, c in self.counts.items() if c["target"]]
+        print(f"[{elapsed:7.1f}s] {created / elapsed:8.1f} rows/s | " + " | ".join(parts))
+
+    def run_reporter(self):
+        while True:
+            gevent.sleep(config.SEED_PROGRESS_INTERVAL)
+            self.report()
+
+
+def data_of(result):
+    """Extract the "data" list of an admin listing, tolerating failed calls."""
+    return (result or {}).get("data") or []
+
+
+def seeded_trip_id(number, hs):
+    """Trip ID that api_admin.create_travel produces for an explicit trip number."""
+    train_type_ids = config.HS_TRAIN_TYPE_ID if hs else config.OTHER_TRAIN_TYPE_ID
+    return f"{train_type_ids[number % len(train_type_ids)][0]}{number}"
+
+
+def submit(pool, progress, table, func, *args, **kwargs):
+    """Run one create call on the pool and record its outcome."""
+    def job():
+        try:
+            progress.record(table, func(*args, **kwargs))
+        except Exception:
+            progress.record(table, None)
+    pool.spawn(job)
+
+
+def seed_stations(client, headers, pool, progress, count):
+    existing = {s.get("name") for s in data_of(api_admin.get_all_stations(client, headers=headers))}
+    for i in range(count):
+        name = f"seedstation{i:05d}"
+        if name in existing:
+            progress.counts["stations"]["existing"] += 1
+        else:
+            submit(pool, progress, "stations", api_admin.add_station, client, name, headers=headers)
+
+
+def seed_trips(client, headers, pool, progress, count):
+    existing = {api_admin.travel_train_number(t) for t in data_of(api_admin.get_all_travels(client, headers=headers))}
+    routes = data_of(api_admin.get_all_routes(client, headers=headers))
+    for i in range(count):
+        # Alternate high-speed and regular trains; each class gets its own number sequence
+        hs = i % 2 == 0
+        number = config.SEED_TRIP_NUMBER_BASE + i // 2
+        if seeded_trip_id(number, hs) in existing:
+            progress.counts["trips"]["existing"] += 1
+        else:
+            route = routes[i % len(routes)] if routes else None
+            submit(pool, progress, "trips", api_admin.create_travel, client, route, hs=hs, headers=headers,
+                   number=number)
+
+
+def seed_users(client, token, headers, pool, progress, count):
+    existing = {u.get("userName") for u in data_of(api_admin.get_all_users(client, headers=headers))}
+    for i in range(count):
+        name = account_pool.account_name(i)
+        if name in existing:
+            progress.counts["users"]["existing"] += 1
+        else:
+            submit(pool, progress, "users", api_admin.api_call_admin_create_user, client, token, name,
+                   config.ACCOUNT_PASSWORD)
+
+
+def seeded_user_ids(client, headers, count):
+    """Map the seeded user names to their user IDs (listing taken after users are created)."""
+    names = {account_pool.account_name(i) for i in range(count)}
+    users = data_of(api_admin.get_all_users(client, headers=headers))
+    return sorted(u["userId"] for u in users if u.get("userName") in names)
+
+
+def seed_contacts(client, headers, pool, progress, count, user_ids):
+    if not user_ids:
+        return
+    existing = {c.get("documentNumber") for c in data_of(api_admin.get_all_contacts(client, headers=headers))}
+    for i in range(count):
+        user_id = user_ids[i % len(user_ids)]
+        document_number = f"SEED-CONTACT-{i:08d}"
+        if document_number in existing:
+            progress.counts["contacts"]["existing"] += 1
+            continue
+        contact = {"accountId": user_id,
+                   "name": f"Contact_{i}",
+                   "documentType": 1,
+                   "documentNumber": document_number,
+                   "phoneNumber": f"1{i:010d}"}
+        submit(pool, progress, "contacts", api_admin.add_contact, client, contact, headers=headers)
+
+
+def seed_orders(client, headers, pool, progress, count, user_ids, trips):
+    """Orders on the seeded trips (see seed_trips), so admin deletes leave them alone."""
+    if not user_ids:
+        return
+    existing = {o.get("contactsDocumentNumber") for o in data_of(api_admin.get_all_orders(client, headers=headers))}
+    for i in range(count):
+        document_number = f"SEED-ORDER-{i:08d}"
+        if document_number in existing:
+            progress.counts["orders"]["existing"] += 1
+            continue
+        trip = i % max(trips, 2)
+        hs = trip % 2 == 0
+        submit(pool, progress, "orders", api_admin.create_order, client, hs=hs, headers=headers,
+               account_id=user_ids[i % len(user_ids)], document_number=document_number,
+               train_number=seeded_trip_id(config.SEED_TRIP_NUMBER_BASE + trip // 2, hs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed Train-Ticket with a scaled dataset")
+    parser.add_argument("--host", required=True, help="Train-Ticket UI/gateway base URL")
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale factor (multiplies SEED_ROWS_PER_SCALE)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent create requests")
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=TABLES, help="Tables to seed")
+    args = parser.parse_args()
+
+    targets = {t: int(config.SEED_ROWS_PER_SCALE[t] * args.scale) for t in TABLES}
+    environment = Environment(events=events, host=args.host)
+    client = FastHttpSession(environment, base_url=args.host, user=None, concurrency=args.concurrency,
+                             network_timeout=config.NETWORK_TIMEOUT,
+                             connection_timeout=config.CONNECTION_TIMEOUT)
+    _, token = api_admin.login(client)
+    headers = session_pool.build_headers(token)
+
+    progress = Progress()
+    for table in args.tables:
+        progress.counts[table]["target"] = targets[table]
+    reporter = gevent.spawn(progress.run_reporter)
+    pool = Pool(args.concurrency)
+
+    if "stations" in args.tables:
+        seed_stations(client, headers, pool, progress, targets["stations"])
+    if "trips" in args.tables:
+        seed_trips(client, headers, pool, progress, targets["trips"])
+    if "users" in args.tables:
+        seed_users(client, token, headers, pool, progress, targets["users"])
+    # Contacts and orders need the IDs of the users created above
+    pool.join()
+    if "contacts" in args.tables or "orders" in args.tables:
+        user_ids = seeded_user_ids(client, headers, targets["users"])
+        if "contacts" in args.tables:
+            seed_contacts(client, headers, pool, progress, targets["contacts"], user_ids)
+        if "orders" in args.tables:
+            seed_orders(client, headers, pool, progress, targets["orders"], user_ids, targets["trips"])
+    pool.join()
+
+    reporter.kill()
+    progress.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Seeded Random Streams for Train-Ticket Load Testing
+
+Gives every simulated user its own random.Random stream, derived from
+RUN_SEED, the worker index and the user's spawn index per user class, so two
+runs with the same seed, user count and spawn rate generate the same choices
+(train types, stations, tasks, think times, request bodies). All workload
+randomness goes through rng(), which returns the stream of the user whose
+greenlet is running, or the module-level random generator outside users.
+RUN_SEED = None keeps unseeded, run-to-run varying randomness.
+
+At test start the master also tells every worker its position among the
+connected workers (see shard()), so that accounts and replayed sessions can be
+split between the workers without gaps or overlaps.
+"""
+
+import logging
+import random
+import weakref
+
+import gevent
+from locust import events
+from locust.runners import MasterRunner, WorkerRunner
+
+import config
+
+# User greenlet -> (user key, Random stream)
+_streams = weakref.WeakKeyDictionary()
+
+# Users attached per user class on this worker (spawn index)
+_counters = {}
+
+# (position, worker count) of this worker in the running test, sent by the master
+_shard = None
+
+
+def worker_index(environment):
+    """Index of this worker (0 in local mode)."""
+    return max(0, getattr(environment.runner, "worker_index", 0) or 0)
+
+
+def shard(environment):
+    """
+    (position, count) of this worker among the workers the test was started on, (0, 1)
+    in local mode. A worker that did not get them from the master (joined after the
+    start) takes everything, with a warning: duplicated work rather than missing work.
+    """
+    if not isinstance(environment.runner, WorkerRunner):
+        return 0, 1
+    if _shard is None:
+        logging.warning("Worker count not received from the master, this worker takes all shares")
+        return 0, 1
+    return _shard
+
+
+def attach(user):
+    """
+    Create the user's stream and bind it to the current (user) greenlet; call first
+    thing in on_start. Sets user.rng and user.rng_key ("<class>-<worker>-<index>").
+    """
+    cls = type(user).__name__
+    index = _counters.get(cls, 0)
+    _counters[cls] = index + 1
+    user.rng_key = f"{cls}-{worker_index(user.environment)}-{index}"
+    user.rng = random.Random(None if config.RUN_SEED is None else f"{config.RUN_SEED}:{user.rng_key}")
+    _streams[gevent.getcurrent()] = (user.rng_key, user.rng)
+
+
+def rng():
+    """Random stream of the running user, or the module-level generator outside users."""
+    entry = _streams.get(gevent.getcurrent())
+    return entry[1] if entry is not None else random
+
+
+def current_key():
+    """Key of the running user, or None outside users."""
+    entry = _streams.get(gevent.getcurrent())
+    return entry[0] if entry is not None else None
+
+
+def between(min_wait, max_wait):
+    """Like locust.between, but drawn from the user's seeded stream."""
+    return lambda instance: rng().uniform(min_wait, max_wait)
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message("shard", on_shard_message)
+
+
+def on_shard_message(environment, msg, **kwargs):
+    global _shard
+    _shard = (msg.data["index"], msg.data["count"])
+
+
+def send_shards(runner):
+    """Tell every connected worker its position; sent before the spawn messages."""
+    clients = sorted(runner.clients.ready + runner.clients.running + runner.clients.spawning,
+                     key=lambda client: runner.get_worker_index(client.id))
+    for index, client in enumerate(clients):
+        runner.send_message("shard", {"index": index, "count": len(clients)}, client_id=client.id)
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Restart spawn indexes and seed the module-level generator for each test."""
+    if isinstance(environment.runner, MasterRunner):
+        send_shards(environment.runner)
+        return
+    _counters.clear()
+    if config.RUN_SEED is not None:
+        random.seed(f"{config.RUN_SEED}:worker-{worker_index(environment)}")
+
+
+def fork():
+    """
+    Stream for a child greenlet of the running user (see fanout.py), derived from the
+    user's stream in spawn order so seeded runs stay reproducible; None outside users.
+    """
+    entry = _streams.get(gevent.getcurrent())
+    if entry is None:
+        return None
+    key, parent = entry
+    return key, random.Random(parent.getrandbits(64))
+
+
+def bind(stream):
+    """Make a stream returned by fork() the stream of the current greenlet."""
+    if stream is not None:
+        _streams[gevent.getcurrent()] = stream
@@ -0,0 +1,193 @@
+"""
+Login Session Pool for Train-Ticket Load Testing
+
+Keeps a worker-level pool of authenticated sessions so that spawning thousands
+of users does not produce a login storm against ts-auth-service. The pool logs
+in every configured account once before users are spawned (test_start), shares
+the tokens between simulated users and re-authenticates in the background
+before the JWTs expire. A configurable fraction of users still performs a real
+login so that authentication load remains part of the workload on purpose.
+"""
+
+import itertools
+import logging
+import time
+
+import gevent
+from gevent.pool import Pool
+from locust import events
+from locust.contrib.fasthttp import FastHttpSession
+from locust.runners import MasterRunner
+
+import account_pool
+import api_admin
+import api_user
+import config
+import distributions
+import seeding
+import tracing
+
+
+def build_headers(token):
+    """Build the JSON + Bearer token headers used by all authenticated requests."""
+    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "application/json"}
+
+
+class Session:
+    """
+    One authenticated account. The headers dict is shared by every user bound to
+    the session and is updated in place on refresh, so callers must not add
+    per-request entries to it.
+    """
+
+    def __init__(self, user_name, password):
+        self.user_name = user_name
+        self.password = password
+        self.user_id = None
+        self.headers = {}
+        self.issued_at = None
+
+    def login(self, client, login_func):
+        """Authenticate and store the new token; returns True on success."""
+        try:
+            self.user_id, token = login_func(client, self.user_name, self.password)
+        except Exception as e:
+            logging.warning(f"Session pool login failed for {self.user_name}: {e!r}")
+            return False
+        self.headers.clear()
+        self.headers.update(build_headers(token))
+        self.issued_at = time.time()
+        return True
+
+    def __str__(self):
+        # Key used for accounts in empirical popularity files
+        return self.user_name
+
+    @property
+    def valid(self):
+        return self.issued_at is not None
+
+    def expires_soon(self):
+        return not self.valid or time.time() - self.issued_at > config.SESSION_TOKEN_TTL - config.SESSION_REFRESH_MARGIN
+
+
+class SessionPool:
+    """Round-robin pool of sessions for one account type (users or admins)."""
+
+    def __init__(self, name, login_func, accounts):
+        self.name = name
+        self.login_func = login_func
+        self.sessions = [Session(user_name, password) for user_name, password in accounts]
+        self._cycle = None
+
+    def set_accounts(self, accounts):
+        """Replace the pool's accounts; they are logged in on the next warm or refresh."""
+        known = {s.user_name: s for s in self.sessions}
+        self.sessions = [known.get(u) or Session(u, p) for u, p in accounts]
+        valid = [s for s in self.sessions if s.valid]
+        self._cycle = itertools.cycle(valid) if valid else None
+
+    def warm(self, client, sessions=None):
+        """Log in all (or the given) sessions concurrently."""
+        sessions = self.sessions if sessions is None else sessions
+        pool = Pool(config.SESSION_POOL_WARM_CONCURRENCY)
+        for session in sessions:
+            pool.spawn(session.login, client, self.login_func)
+        pool.join()
+        valid = [s for s in self.sessions if s.valid]
+        self._cycle = itertools.cycle(valid) if valid else None
+        logging.info(f"Session pool '{self.name}': {len(valid)}/{len(self.sessions)} accounts logged in")
+
+    def refresh(self, client):
+        """Re-authenticate sessions whose token is about to expire."""
+        expiring = [s for s in self.sessions if s.expires_soon()]
+        if expiring:
+            self.warm(client, expiring)
+
+    def acquire(self):
+        """
+        Return a logged-in session, or None if the pool is empty.
+        Round-robin by default; drawn under ACCOUNT_POPULARITY when that is not uniform.
+        """
+        if self._cycle is None:
+            return None
+        if config.ACCOUNT_POPULARITY.get("model", "uniform") != "uniform":
+            session = distributions.choose(f"accounts_{self.name}", self.sessions, config.ACCOUNT_POPULARITY)
+            if session.valid:
+                return session
+        return next(self._cycle)
+
+
+# Worker-wide pools, pre-warmed on test_start
+# (login functions are looked up lazily since api_user/api_admin import this module indirectly)
+users = SessionPool("users", lambda client, u, p: api_user.login(client, u, p), config.USER_ACCOUNTS)
+admins = SessionPool("admins", lambda client, u, p: api_admin.login(client, u, p), config.ADMIN_ACCOUNTS)
+
+_refresh_greenlet = None
+
+
+def _use_pool():
+    """Decide per simulated user whether to take a pooled session or log in for real."""
+    return config.SESSION_POOL_ENABLED and seeding.rng().random() >= config.SESSION_POOL_REAL_LOGIN_FRACTION
+
+
+def login_user(client):
+    """
+    Obtain (user_id, headers) for a Logged user, from the pool when possible.
+    Falls back to a real api_user.login with one of the pool's accounts when the
+    pool is disabled or empty.
+    """
+    session = users.acquire() if _use_pool() else None
+    if session is not None:
+        return session.user_id, session.headers
+    account = seeding.rng().choice(users.sessions)
+    user_id, token = api_user.login(client, account.user_name, account.password)
+    return user_id, build_headers(token)
+
+
+def login_admin(client):
+    """Obtain (user_id, headers) for an Admin user, from the pool when possible."""
+    session = admins.acquire() if _use_pool() else None
+    if session is not None:
+        return session.user_id, session.headers
+    account = seeding.rng().choice(admins.sessions)
+    user_id, token = api_admin.login(client, account.user_name, account.password)
+    return user_id, build_headers(token)
+
+
+def _refresh_loop(client):
+    """Background greenlet re-authenticating sessions before their tokens expire."""
+    while True:
+        gevent.sleep(config.SESSION_REFRESH_CHECK_INTERVAL)
+        for pool in (users, admins):
+            pool.refresh(client)
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Pre-warm the pools before users are spawned (runs on workers and in local mode)."""
+    global _refresh_greenlet
+    if isinstance(environment.runner, MasterRunner):
+        return
+    # Users log in with this worker's partition of the provisioned account pool
+    if config.ACCOUNT_POOL_SIZE:
+        users.set_accounts(account_pool.worker_accounts(environment))
+    if not config.SESSION_POOL_ENABLED:
+        return
+    client = FastHttpSession(environment, base_url=environment.host, user=None,
+                             network_timeout=config.NETWORK_TIMEOUT,
+                             connection_timeout=config.CONNECTION_TIMEOUT)
+    tracing.wrap(client)
+    users.warm(client)
+    admins.warm(client)
+    if _refresh_greenlet is None:
+        _refresh_greenlet = gevent.spawn(_refresh_loop, client)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    """Stop background refreshing; the next test_start warms the pools again."""
+    global _refresh_greenlet
+    if _refresh_greenlet is not None:
+        _refresh_greenlet.kill(block=False)
+        _refresh_greenlet = None
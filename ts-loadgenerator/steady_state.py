@@ -0,0 +1,157 @@
+"""
+Steady-State Detection for Train-Ticket Load Testing
+
+The Java services keep warming up (JIT compilation, cache fill, connection
+pool growth) well after all users are spawned, so ADD_SPAWNING_SUFFIX alone
+leaves warmup in the results. After spawning completes, the master (or the
+local runner) samples the aggregated throughput and median latency every
+STEADY_STATE_WINDOW seconds. The system is steady once, over the last
+STEADY_STATE_SAMPLES samples, both series have a coefficient of variation
+(moving standard deviation / moving mean) below STEADY_STATE_MAX_CV and the
+means of the older and newer half differ by less than STEADY_STATE_MAX_DRIFT.
+
+The stats collected until then are handled per STEADY_STATE_ACTION:
+
+    "split"   kept as "<name>_warmup" entries, the plain names restart empty
+    "reset"   discarded, like the "Reset stats" button of the web UI
+    None      left as they are (detection is only reported)
+
+The warmup duration (test start to the first steady sample) is recorded as a
+WARMUP "steady_state" stats entry and broadcast to the workers.
+"""
+
+import logging
+import statistics
+import time
+from collections import deque
+
+import gevent
+from locust import events
+from locust.runners import WORKER_REPORT_INTERVAL, MasterRunner, WorkerRunner
+
+import capacity
+import config
+import journeys
+
+# Suffix of the stats entries holding the warmup phase ("split" action)
+WARMUP_SUFFIX = "_warmup"
+
+# Warmup duration in seconds once steady (on the master and on every worker), else None
+warmup_duration = None
+
+_started = None
+_spawned = False
+_detector = None
+
+
+def converged(samples):
+    """True if the samples vary by less than STEADY_STATE_MAX_CV and do not drift."""
+    mean = statistics.fmean(samples)
+    if mean <= 0:
+        return False
+    if statistics.pstdev(samples, mean) / mean > config.STEADY_STATE_MAX_CV:
+        return False
+    half = len(samples) // 2
+    older, newer = statistics.fmean(list(samples)[:half]), statistics.fmean(list(samples)[-half:])
+    return abs(newer - older) / mean <= config.STEADY_STATE_MAX_DRIFT
+
+
+def split_warmup(stats):
+    """Move all entries to "<name>_warmup" so the plain names start over."""
+    for (name, method), entry in list(stats.entries.items()):
+        if name.endswith(WARMUP_SUFFIX):
+            continue
+        del stats.entries[(name, method)]
+        entry.name = name + WARMUP_SUFFIX
+        stats.entries[(entry.name, method)] = entry
+    stats.total.reset()
+
+
+def on_steady(environment, warmup):
+    """Apply STEADY_STATE_ACTION, record the warmup and tell the workers."""
+    global warmup_duration
+    warmup_duration = warmup
+    runner = environment.runner
+    if config.STEADY_STATE_ACTION == "split":
+        split_warmup(runner.stats)
+    elif config.STEADY_STATE_ACTION == "reset":
+        environment.events.reset_stats.fire()
+        runner.stats.reset_all()
+        runner.exceptions = {}
+    events.request.fire(request_type=journeys.WARMUP_REQUEST_TYPE, name="steady_state",
+                        response_time=warmup * 1000, response_length=0, response=None, context={},
+                        exception=None, start_time=_started, url=None)
+    if isinstance(runner, MasterRunner):
+        runner.send_message("steady_state", {"warmup": warmup})
+    logging.info(f"Steady state reached after {warmup:.0f}s of warmup "
+                 f"(warmup stats: {config.STEADY_STATE_ACTION or 'kept'})")
+
+
+def detect(environment):
+    """Sample the throughput and latency series until they converge or the timeout passes."""
+    while not _spawned:
+        gevent.sleep(1)
+    stats = environment.runner.stats
+    # Worker counts arrive up to one report interval late
+    lag = WORKER_REPORT_INTERVAL + 1 if isinstance(environment.runner, MasterRunner) else 1
+    armed = time.time()
+    samples = deque(maxlen=config.STEADY_STATE_SAMPLES)
+    snapshot, snapshot_time = capacity.snapshot_stats(stats), time.time()
+    while time.time() - armed < config.STEADY_STATE_TIMEOUT:
+        gevent.sleep(config.STEADY_STATE_WINDOW)
+        now = time.time()
+        # Throughput from the per-second counts (timestamped where the requests ran),
+        # latency from the requests reported during the window
+        seconds = range(int(snapshot_time - lag), int(now - lag))
+        rps = sum(stats.total.num_reqs_per_sec.get(second, 0) for second in seconds) / max(len(seconds), 1)
+        after = capacity.snapshot_stats(stats)
+        aggregated = capacity.summarize_window(snapshot, after, now - snapshot_time).get("Aggregated")
+        samples.append((snapshot_time, rps, aggregated["p50"] if aggregated else 0))
+        snapshot, snapshot_time = after, now
+        if len(samples) == samples.maxlen and converged([s[1] for s in samples]) \
+                and converged([s[2] for s in samples]):
+            on_steady(environment, samples[0][0] - _started)
+            return
+    logging.warning(f"No steady state within {config.STEADY_STATE_TIMEOUT}s after spawning, "
+                    "results include the warmup")
+
+
+def detecting():
+    """True while steady-state detection runs and has not reached a steady state or timed out."""
+    return _detector is not None and not _detector.dead
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message("steady_state", on_steady_state_message)
+
+
+def on_steady_state_message(environment, msg, **kwargs):
+    global warmup_duration
+    warmup_duration = msg.data["warmup"]
+    logging.info(f"Steady state reached after {warmup_duration:.0f}s of warmup")
+
+
+@events.spawning_complete.add_listener
+def on_spawning_complete(user_count, **kwargs):
+    global _spawned
+    _spawned = True
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    global _started, _spawned, _detector, warmup_duration
+    _started, _spawned, warmup_duration = time.time(), False, None
+    # The capacity search changes the load on purpose and waits for each step to settle itself
+    if not config.STEADY_STATE_DETECTION or config.CAPACITY_SEARCH or isinstance(environment.runner, WorkerRunner):
+        return
+    _detector = gevent.spawn(detect, environment)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    global _detector
+    if _detector is not None:
+        _detector.kill(block=False)
+        _detector = None
@@ -0,0 +1,150 @@
+"""
+Stop Conditions for Train-Ticket Load Testing
+
+The master (or the local runner) evaluates the stop conditions every
+STOP_CHECK_INTERVAL seconds on the aggregated stats of all workers and ends
+the test with a regular shutdown (final stats, CSV/HTML reports and request
+logs are written) as soon as one is met:
+
+    request count    STOP_ON_REQUEST_COUNT: REQUEST_NUMBER_TO_STOP requests in total
+    duration         STOP_AFTER_SECONDS of steady state (see steady_state.py), or of
+                     run time when steady-state detection is off, not running
+                     (capacity search) or timed out
+    error budget     more than STOP_ERROR_BUDGET of the requests failed (exit code 1)
+    result quality   the STOP_CI_CONFIDENCE confidence interval of the
+                     STOP_CI_PERCENTILE latency is narrower than STOP_CI_MAX_WIDTH
+                     (relative to the percentile) for every judged endpoint
+
+Percentile confidence intervals are distribution-free: the ranks
+n*p -/+ z*sqrt(n*p*(1-p)) of the response time histogram bound the interval.
+While steady-state detection runs, they are only judged once steady, so the
+warmup does not count towards the result quality. Synthetic journey/step
+entries never count.
+"""
+
+import logging
+import math
+import statistics
+import time
+
+import gevent
+from locust import events
+from locust.runners import WorkerRunner
+
+import capacity
+import config
+import steady_state
+
+# Reason the test was stopped by a condition, else None
+stop_reason = None
+
+_started = None
+_checker = None
+
+
+def ranked_value(response_times, rank):
+    """Response time of the rank-th fastest request (1-based) in a histogram."""
+    seen = 0
+    for response_time in sorted(response_times):
+        seen += response_times[response_time]
+        if seen >= rank:
+            return response_time
+    return None
+
+
+def percentile_interval(response_times, percentile, confidence):
+    """(low, estimate, high) of a latency percentile, or None with too few requests."""
+    n = sum(response_times.values())
+    if not n:
+        return None
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    spread = z * math.sqrt(n * percentile * (1 - percentile))
+    low_rank, high_rank = math.floor(n * percentile - spread), math.ceil(n * percentile + spread)
+    if low_rank < 1 or high_rank > n:
+        return None
+    return (ranked_value(response_times, low_rank), ranked_value(response_times, math.ceil(n * percentile)),
+            ranked_value(response_times, high_rank))
+
+
+def unsettled_endpoints(snapshot):
+    """Judged endpoints whose percentile interval is still too wide (or unknown)."""
+    names = config.STOP_CI_ENDPOINTS or [name for name, (requests, _, _) in snapshot.items()
+                                         if name != "Aggregated" and requests >= config.STOP_CI_MIN_REQUESTS]
+    unsettled = []
+    for name in names:
+        requests, _, response_times = snapshot.get(name, (0, 0, {}))
+        interval = percentile_interval(response_times, config.STOP_CI_PERCENTILE, config.STOP_CI_CONFIDENCE) \
+            if requests >= config.STOP_CI_MIN_REQUESTS else None
+        if interval is None or not interval[1] \
+                or (interval[2] - interval[0]) / interval[1] > config.STOP_CI_MAX_WIDTH:
+            unsettled.append(name)
+    return unsettled if names else ["(no endpoint with enough requests)"]
+
+
+def check(environment):
+    """The reason and exit code of the first condition met, or None."""
+    stats = environment.runner.stats
+    # Journey/step entries are left out of "Aggregated" by snapshot_stats
+    requests, failures, _ = capacity.snapshot_stats(stats).get("Aggregated", (0, 0, {}))
+    steady = steady_state.warmup_duration is not None
+    # Without a running detection (off, capacity search or timed out) the run time counts
+    waiting = not steady and steady_state.detecting()
+    if config.STOP_ON_REQUEST_COUNT and requests >= config.REQUEST_NUMBER_TO_STOP:
+        return f"{requests} requests sent", None
+    if config.STOP_AFTER_SECONDS is not None and not waiting:
+        elapsed = time.time() - _started - (steady_state.warmup_duration if steady else 0)
+        if elapsed >= config.STOP_AFTER_SECONDS:
+            return f"{elapsed:.0f}s {'of steady state' if steady else 'elapsed'}", None
+    if config.STOP_ERROR_BUDGET is not None and requests >= config.STOP_ERROR_BUDGET_MIN_REQUESTS \
+            and failures / requests > config.STOP_ERROR_BUDGET:
+        return f"error budget exhausted ({failures / requests:.1%} of {requests} requests failed)", 1
+    if config.STOP_CI_MAX_WIDTH is not None and not waiting:
+        if not unsettled_endpoints(capacity.snapshot_stats(stats, exclude_warmup=True)):
+            return (f"p{config.STOP_CI_PERCENTILE * 100:g} of every endpoint known within "
+                    f"{config.STOP_CI_MAX_WIDTH:.0%}"), None
+    return None
+
+
+def stop(environment, reason, exit_code=None):
+    """End the test like --run-time does (headless) or stop it and keep the web UI."""
+    global stop_reason
+    stop_reason = reason
+    logging.info(f"Stop condition met: {reason}, stopping the test")
+    if exit_code is not None:
+        environment.process_exit_code = exit_code
+    if environment.parsed_options is None or environment.parsed_options.headless:
+        environment.runner.quit()
+    else:
+        environment.runner.stop()
+
+
+def watch(environment):
+    while True:
+        gevent.sleep(config.STOP_CHECK_INTERVAL)
+        result = check(environment)
+        if result is not None:
+            stop(environment, *result)
+            return
+
+
+def enabled():
+    return config.STOP_ON_REQUEST_COUNT or config.STOP_AFTER_SECONDS is not None \
+        or config.STOP_ERROR_BUDGET is not None or config.STOP_CI_MAX_WIDTH is not None
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    global _started, _checker, stop_reason
+    _started, stop_reason = time.time(), None
+    if not enabled() or isinstance(environment.runner, WorkerRunner):
+        return
+    _checker = gevent.spawn(watch, environment)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    global _checker
+    # The checker may be the greenlet stopping the test
+    if _checker is not None and _checker is not gevent.getcurrent():
+        _checker.kill(block=False)
+    _checker = None
@@ -0,0 +1,190 @@
+"""
+Streaming Listing Sampler for Train-Ticket Load Testing
+
+Admin behaviors only need a few random entries of the full order, travel and
+contact listings. Instead of buffering and parsing the whole payload, the
+listing is requested with stream=True and split incrementally into the items
+of its top-level "data" array while the body arrives. A reservoir of k items is
+kept (Algorithm R), and an item is only parsed once the reservoir decides to
+keep it, so memory and parsing cost per admin user stay constant regardless
+of the dataset size.
+
+Note: with stream=True Locust records the response time up to the response
+headers and a response length of 0; the body download is not included for
+streamed listings. Streaming is therefore opt-in (ADMIN_LISTING_STREAMING).
+"""
+
+import random
+import re
+import zlib
+
+import brotli
+
+import bandwidth
+import config
+import seeding
+import utils
+
+# Characters that change the JSON nesting or string state
+_STRUCTURAL = re.compile(rb'["\\\[\]{},]')
+
+
+class ListingSampler:
+    """
+    Incremental splitter for a {"status": .., "msg": .., "data": [...]} response
+    that reservoir-samples k items of the "data" array. Everything outside the
+    array is kept and parsed at the end, so close() returns the usual response
+    dict with "data" replaced by the sample and "total" set to the item count.
+    """
+
+    def __init__(self, k, predicate=None, rng=random):
+        self.k = k
+        self.predicate = predicate
+        self.rng = rng
+        self.sample = []
+        self.seen = 0              # items considered for the reservoir
+        self.total = 0             # items in the array
+        self._outer = bytearray()  # the response without the array items
+        self._item = bytearray()   # the array item currently streaming in
+        self._depth = 0
+        self._in_string = False
+        self._skip = 0             # bytes of the next chunk that are escaped
+        self._data_key = False     # the last top-level token was the "data" key
+        self._in_data = False
+
+    def feed(self, chunk):
+        """Consume the next piece of the body."""
+        segment = 0
+        skip_until = self._skip
+        self._skip = 0
+        for match in _STRUCTURAL.finditer(chunk, skip_until):
+            i = match.start()
+            if i < skip_until:
+                continue
+            c = chunk[i]
+            if c == 0x5C:  # backslash: the next byte is escaped
+                skip_until = i + 2
+                if skip_until > len(chunk):
+                    self._skip = 1
+                continue
+            if c == 0x22:  # quote
+                self._in_string = not self._in_string
+                if not self._in_string and self._depth == 1 and not self._in_data:
+                    self._outer += chunk[segment:i + 1]
+                    segment = i + 1
+                    self._data_key = self._outer.endswith(b'"data"')
+                elif self._in_string and self._depth == 1:
+                    self._data_key = False
+                continue
+            if self._in_string:
+                continue
+            if c in b"[{":
+                if c == 0x5B and self._depth == 1 and self._data_key:
+                    # Start of the "data" array
+                    self._outer += chunk[segment:i + 1]
+                    segment = i + 1
+                    self._in_data = True
+                self._depth += 1
+                self._data_key = False
+            elif c in b"]}":
+                self._depth -= 1
+                if self._in_data and self._depth == 1:
+                    # End of the "data" array; the bracket belongs to the outer document
+                    self._item += chunk[segment:i]
+                    segment = i
+                    self._emit()
+                    self._in_data = False
+            elif c == 0x2C:  # comma
+                if self._in_data and self._depth == 2:
+                    self._item += chunk[segment:i]
+                    segment = i + 1
+                    self._emit()
+                elif self._depth == 1:
+                    self._data_key = False
+        if self._in_data:
+            self._item += chunk[segment:]
+        else:
+            self._outer += chunk[segment:]
+
+    def _emit(self):
+        """Offer the completed array item to the reservoir."""
+        raw = bytes(self._item).strip()
+        self._item.clear()
+        if not raw:
+            return
+        self.total += 1
+        if self.predicate is not None:
+            item = utils.parse_json(raw)
+            if item is None or not self.predicate(item):
+                return
+            self._offer(lambda: item)
+        else:
+            self._offer(lambda: utils.parse_json(raw))
+
+    def _offer(self, parse):
+        """Algorithm R; parse() is only called for items that enter the reservoir."""
+        self.seen += 1
+        if len(self.sample) < self.k:
+            self.sample.append(parse())
+            return
+        j = self.rng.randrange(self.seen)
+        if j < self.k:
+            self.sample[j] = parse()
+
+    def close(self):
+        """Return the response dict with the sampled items, or None if the body was not valid JSON."""
+        result = utils.parse_json(bytes(self._outer))
+        if not isinstance(result, dict):
+            return None
+        result["data"] = [item for item in self.sample if item is not None]
+        result["total"] = self.total
+        return result
+
+
+def decompressor(encoding):
+    """Incremental decoder for a Content-Encoding offered in ACCEPT_ENCODING, None for identity."""
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+    if encoding == "deflate":
+        return zlib.decompressobj(-zlib.MAX_WBITS).decompress
+    if encoding == "br":
+        return brotli.Decompressor().process
+    return None
+
+
+def sample_listing(client, url, name, k, headers=None, predicate=None):
+    """
+    GET a listing and return it with at most k randomly sampled "data" items
+    (optionally only items matching predicate), streaming the body in the
+    encoding negotiated from ACCEPT_ENCODING. The bytes read are counted by
+    bandwidth.py. Returns None like utils.get_json_from_response if the request failed.
+    """
+    response = client.get(url, headers=headers, name=name, stream=True)
+    if getattr(response, "error", None) or not response.status_code or response.status_code >= 400:
+        try:
+            # Consume the (small) error body so the connection can be reused
+            size = len(response.read())
+            response.release()
+            bandwidth.drained(response, size)
+        except Exception:
+            pass
+        return None
+
+    sampler = ListingSampler(k, predicate, seeding.rng())
+    decompress = decompressor((response.headers.get("content-encoding") or "identity").lower())
+    size = decoded = 0
+    try:
+        while True:
+            chunk = response.read(config.LISTING_STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if decompress is not None:
+                chunk = decompress(chunk)
+            decoded += len(chunk)
+            sampler.feed(chunk)
+        response.release()
+    except Exception:
+        return None
+    bandwidth.drained(response, size, decoded)
+    return sampler.close()
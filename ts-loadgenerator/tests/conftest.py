@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The load generator modules are flat modules next to locustfile.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analyze
+import config
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(config, "ANALYSIS_BOOTSTRAP_RESAMPLES", 500)
+    monkeypatch.setattr(config, "ANALYSIS_MIN_REQUESTS", 100)
+    monkeypatch.setattr(config, "ANALYSIS_TOLERANCE", 0.10)
+    monkeypatch.setattr(config, "ANALYSIS_ERROR_TOLERANCE", 0.01)
+
+
+def write_log(path, response_times, errors=None, name="search"):
+    n = len(response_times)
+    pd.DataFrame({
+        "request_type": "POST",
+        "name": name,
+        "response_time": response_times,
+        "error": errors if errors is not None else np.zeros(n, dtype=int),
+        "start_time": 1000.0 + np.arange(n) * 0.01,
+    }).to_csv(path, sep=";", index=False)
+    return path
+
+
+def latencies(seed, n=5000, scale=1.0):
+    return np.random.default_rng(seed).lognormal(4, 0.3, n) * scale
+
+
+def test_bucket_rounds_like_locust():
+    assert list(analyze.bucket(np.array([12.4, 147.0, 1234.0, 12345.0]))) == [12, 150, 1200, 12000]
+
+
+def test_load_counts_requests(tmp_path):
+    counts = analyze.load(write_log(tmp_path / "run.csv", [10.0] * 30 + [20.0] * 10, [0] * 39 + [1]), 60)
+    assert counts["requests"].sum() == 40
+    assert counts["errors"].sum() == 1
+    table = analyze.percentiles(counts, ["endpoint"], [0.5, 0.99])
+    assert table.loc["POST search", "p50"] == 10
+    assert table.loc["POST search", "p99"] == 20
+
+
+def test_load_skips_warmup_and_journeys(tmp_path):
+    path = write_log(tmp_path / "run.csv", [10.0] * 200)
+    log = pd.read_csv(path, sep=";")
+    log.loc[:9, "request_type"] = "JOURNEY"
+    log.to_csv(path, sep=";", index=False)
+    counts = analyze.load(path, 60, skip=1)
+    # 10 journey rows are dropped, then the first second of the remaining 190 rows
+    assert counts["requests"].sum() == 90
+
+
+def test_same_latencies_are_unchanged(tmp_path):
+    baseline = analyze.load(write_log(tmp_path / "a.csv", latencies(1)), 60)
+    candidate = analyze.load(write_log(tmp_path / "b.csv", latencies(2)), 60)
+    [row] = analyze.compare(baseline, candidate, [0.5, 0.95], seed=0)
+    assert row["verdict"] == "unchanged"
+    assert set(row["metrics"]) == {"p50", "p95", "error_rate"}
+
+
+def test_slower_candidate_is_a_regression(tmp_path):
+    baseline = analyze.load(write_log(tmp_path / "a.csv", latencies(1)), 60)
+    candidate = analyze.load(write_log(tmp_path / "b.csv", latencies(2, scale=1.5)), 60)
+    [row] = analyze.compare(baseline, candidate, [0.5, 0.95], seed=0)
+    assert row["metrics"]["p50"]["verdict"] == "regression"
+    assert row["metrics"]["error_rate"]["verdict"] == "unchanged"
+    assert row["verdict"] == "regression"
+
+
+def test_faster_candidate_is_an_improvement(tmp_path):
+    baseline = analyze.load(write_log(tmp_path / "a.csv", latencies(1)), 60)
+    candidate = analyze.load(write_log(tmp_path / "b.csv", latencies(2, scale=0.6)), 60)
+    [row] = analyze.compare(baseline, candidate, [0.5], seed=0)
+    assert row["verdict"] == "improvement"
+
+
+def test_more_errors_are_a_regression(tmp_path):
+    errors = np.zeros(5000, dtype=int)
+    errors[::10] = 1
+    baseline = analyze.load(write_log(tmp_path / "a.csv", latencies(1)), 60)
+    candidate = analyze.load(write_log(tmp_path / "b.csv", latencies(1), errors), 60)
+    [row] = analyze.compare(baseline, candidate, [0.5], seed=0)
+    assert row["metrics"]["error_rate"]["verdict"] == "regression"
+    assert row["metrics"]["p50"]["verdict"] == "unchanged"
+
+
+def test_endpoint_missing_from_a_run(tmp_path):
+    baseline = analyze.load(write_log(tmp_path / "a.csv", latencies(1)), 60)
+    candidate = analyze.load(write_log(tmp_path / "b.csv", latencies(1), name="book"), 60)
+    rows = {row["endpoint"]: row for row in analyze.compare(baseline, candidate, [0.5], seed=0)}
+    assert rows["POST search"]["verdict"] == "insufficient data"
+    assert rows["POST search"]["requests"] == [5000, 0]
+    assert rows["POST book"]["requests"] == [0, 5000]
@@ -0,0 +1,30 @@
+import pytest
+
+import capacity
+import config
+
+
+@pytest.mark.parametrize("key, fraction", [
+    ("p5", 0.05), ("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("p100", 1.0),
+    ("p999", 0.999), ("p99.9", 0.999), ("p9999", 0.9999), ("p99.99", 0.9999),
+])
+def test_percentile_from_key(key, fraction):
+    assert capacity.percentile_from_key(key) == fraction
+
+
+@pytest.mark.parametrize("key", ["error_rate", "P99", "p", "p99x", "p101", "p1000", "p100.1"])
+def test_percentile_from_unknown_key(key):
+    with pytest.raises(ValueError):
+        capacity.percentile_from_key(key)
+
+
+def test_unknown_slo_key_is_rejected(monkeypatch):
+    monkeypatch.setattr(config, "CAPACITY_SLOS", {"Aggregated": {"error_rate": 0.01, "p99_ms": 500}})
+    with pytest.raises(ValueError):
+        capacity.CapacitySearchShape()
+
+
+@pytest.mark.parametrize("name", ["search", "search_spawning", "search@1700000000", "search_spawning@17_warmup",
+                                  "search_warmup"])
+def test_base_request_name(name):
+    assert capacity.base_request_name(name) == "search"
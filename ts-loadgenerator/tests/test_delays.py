@@ -0,0 +1,43 @@
+import random
+import statistics
+
+import pytest
+
+from delays import compile_delay
+
+
+def draws(spec, n=5000, **kwargs):
+    rng = random.Random(11)
+    delay = compile_delay(spec, **kwargs)
+    return [delay(rng) for _ in range(n)]
+
+
+def test_none_and_constant():
+    assert set(draws({"dist": "none"}, 10)) == {0.0}
+    assert set(draws({"dist": "constant", "value": 2}, 10)) == {2.0}
+
+
+def test_uniform_is_the_default():
+    samples = draws({"min": 1, "max": 5})
+    assert 1 <= min(samples) and max(samples) <= 5
+    assert statistics.fmean(samples) == pytest.approx(3, abs=0.1)
+
+
+def test_default_dist_can_be_overridden():
+    assert set(draws({}, 10, default_dist="none")) == {0.0}
+
+
+def test_exponential_mean_and_cap():
+    assert statistics.fmean(draws({"dist": "exponential", "mean": 4})) == pytest.approx(4, rel=0.05)
+    assert max(draws({"dist": "exponential", "mean": 4, "max": 6})) == 6
+
+
+def test_lognormal_median_and_cap():
+    assert statistics.median(draws({"dist": "lognormal", "median": 0.05, "sigma": 0.5})) == \
+        pytest.approx(0.05, rel=0.05)
+    assert max(draws({"dist": "lognormal", "median": 0.05, "sigma": 0.5, "max": 0.1})) == 0.1
+
+
+def test_unknown_distribution():
+    with pytest.raises(ValueError):
+        compile_delay({"dist": "pareto"})
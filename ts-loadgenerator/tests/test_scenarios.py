@@ -0,0 +1,35 @@
+import collections
+import random
+
+import pytest
+
+from scenarios import AliasTable
+
+
+def frequencies(table, draws=20000, seed=5):
+    rng = random.Random(seed)
+    counts = collections.Counter(table.sample(rng) for _ in range(draws))
+    return {outcome: count / draws for outcome, count in counts.items()}
+
+
+def test_frequencies_follow_weights():
+    weights = {"search": 5, "book": 2, "pay": 2, "leave": 1}
+    observed = frequencies(AliasTable(list(weights), list(weights.values())))
+    for outcome, weight in weights.items():
+        assert observed[outcome] == pytest.approx(weight / 10, abs=0.015)
+
+
+def test_zero_weight_is_never_sampled():
+    observed = frequencies(AliasTable(["a", "b", "c"], [1, 0, 3]))
+    assert "b" not in observed
+    assert observed["a"] == pytest.approx(0.25, abs=0.015)
+
+
+def test_single_outcome():
+    assert frequencies(AliasTable(["only"], [0.3]), draws=100) == {"only": 1.0}
+
+
+@pytest.mark.parametrize("outcomes, weights", [([], []), (["a", "b"], [1]), (["a"], [0]), (["a", "b"], [2, -1])])
+def test_invalid_weights(outcomes, weights):
+    with pytest.raises(ValueError):
+        AliasTable(outcomes, weights)
@@ -0,0 +1,39 @@
+import collections
+import random
+
+import pytest
+
+import config
+from steady_state import converged
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(config, "STEADY_STATE_MAX_CV", 0.10)
+    monkeypatch.setattr(config, "STEADY_STATE_MAX_DRIFT", 0.05)
+
+
+def test_constant_rate():
+    assert converged([100.0] * 10)
+
+
+def test_small_noise():
+    rng = random.Random(3)
+    assert converged([100 + rng.uniform(-2, 2) for _ in range(10)])
+
+
+def test_no_requests():
+    assert not converged([0.0] * 10)
+
+
+def test_too_noisy():
+    assert not converged([50.0, 150.0] * 5)
+
+
+def test_drift_within_cv():
+    # A 10% ramp stays within the CV limit but still drifts
+    assert not converged([95 + i for i in range(11)])
+
+
+def test_accepts_deque():
+    assert converged(collections.deque([100.0] * 10, maxlen=10))
@@ -0,0 +1,84 @@
+import math
+import statistics
+import time
+from types import SimpleNamespace
+
+import pytest
+from locust.stats import RequestStats
+
+import config
+import steady_state
+import stop_conditions
+from stop_conditions import percentile_interval, ranked_value
+
+
+@pytest.mark.parametrize("rank, expected", [(1, 10), (2, 10), (3, 20), (5, 20), (6, 300), (7, None)])
+def test_ranked_value(rank, expected):
+    # Histogram keys are not sorted
+    assert ranked_value({300: 1, 10: 2, 20: 3}, rank) == expected
+
+
+def test_ranked_value_empty():
+    assert ranked_value({}, 1) is None
+
+
+def test_interval_without_requests():
+    assert percentile_interval({}, 0.95, 0.95) is None
+
+
+def test_interval_with_too_few_requests():
+    # 20 requests cannot bound the p95 from above at 95% confidence
+    assert percentile_interval({ms: 1 for ms in range(1, 21)}, 0.95, 0.95) is None
+
+
+def test_interval_of_uniform_histogram():
+    n, percentile, confidence = 1000, 0.95, 0.95
+    low, estimate, high = percentile_interval({ms: 1 for ms in range(1, n + 1)}, percentile, confidence)
+    spread = statistics.NormalDist().inv_cdf((1 + confidence) / 2) * math.sqrt(n * percentile * (1 - percentile))
+    # With one request per millisecond, response times equal ranks
+    assert estimate == 950
+    assert low == math.floor(950 - spread)
+    assert high == math.ceil(950 + spread)
+
+
+def test_interval_narrows_with_more_requests():
+    def width(scale):
+        low, _, high = percentile_interval({ms: scale for ms in range(1, 1001)}, 0.95, 0.95)
+        return high - low
+
+    assert width(100) < width(10) < width(1)
+
+
+def test_interval_of_constant_latency():
+    assert percentile_interval({42: 500}, 0.99, 0.95) == (42, 42, 42)
+
+
+@pytest.fixture
+def run(monkeypatch):
+    """A run started 100 s ago with a 60 s duration condition only."""
+    monkeypatch.setattr(config, "STOP_ON_REQUEST_COUNT", False)
+    monkeypatch.setattr(config, "STOP_AFTER_SECONDS", 60)
+    monkeypatch.setattr(config, "STOP_ERROR_BUDGET", None)
+    monkeypatch.setattr(config, "STOP_CI_MAX_WIDTH", None)
+    monkeypatch.setattr(stop_conditions, "_started", time.time() - 100)
+    monkeypatch.setattr(steady_state, "warmup_duration", None)
+    return SimpleNamespace(runner=SimpleNamespace(stats=RequestStats()))
+
+
+def test_duration_waits_for_steady_state(run, monkeypatch):
+    monkeypatch.setattr(steady_state, "detecting", lambda: True)
+    assert stop_conditions.check(run) is None
+
+
+def test_duration_counts_from_steady_state(run, monkeypatch):
+    monkeypatch.setattr(steady_state, "detecting", lambda: False)
+    monkeypatch.setattr(steady_state, "warmup_duration", 50)
+    assert stop_conditions.check(run) is None
+    monkeypatch.setattr(steady_state, "warmup_duration", 30)
+    assert stop_conditions.check(run)[0].endswith("of steady state")
+
+
+def test_duration_falls_back_to_run_time(run, monkeypatch):
+    # Detection timed out, is off or does not run (capacity search)
+    monkeypatch.setattr(steady_state, "detecting", lambda: False)
+    assert stop_conditions.check(run)[0].endswith("elapsed")
@@ -0,0 +1,80 @@
+import collections
+import json
+import random
+
+import pytest
+
+from streaming import ListingSampler
+
+ITEMS = [
+    {"id": 1, "name": "plain"},
+    {"id": 2, "name": "brackets [ ] { } and, commas"},
+    {"id": 3, "name": 'escaped \\"quote\\" and \\\\ backslash \\\\'},
+    {"id": 4, "nested": {"list": [1, [2, 3], {"a": "]"}], "empty": {}}},
+    {"id": 5, "name": "data", "data": ["not", "the", "listing"]},
+    {"id": 6, "unicode": "é中"},
+]
+
+BODY = json.dumps({"status": 1, "msg": "Success, \"data\": [1, 2]", "data": ITEMS, "extra": {"data": []}}).encode()
+
+
+def sample_all(chunks, k=len(ITEMS), **kwargs):
+    sampler = ListingSampler(k, **kwargs)
+    for chunk in chunks:
+        sampler.feed(chunk)
+    return sampler.close()
+
+
+def test_whole_body():
+    result = sample_all([BODY])
+    assert result == {"status": 1, "msg": "Success, \"data\": [1, 2]", "data": ITEMS, "total": len(ITEMS),
+                      "extra": {"data": []}}
+
+
+@pytest.mark.parametrize("split", range(1, len(BODY)))
+def test_split_at_every_byte(split):
+    assert sample_all([BODY[:split], BODY[split:]]) == sample_all([BODY])
+
+
+def test_one_byte_chunks():
+    assert sample_all([BODY[i:i + 1] for i in range(len(BODY))]) == sample_all([BODY])
+
+
+def test_escape_at_chunk_end():
+    body = b'{"data": [{"s": "a\\\\"}, {"s": "\\"]"}]}'
+    for split in range(1, len(body)):
+        result = sample_all([body[:split], body[split:]], k=2)
+        assert result["data"] == [{"s": "a\\"}, {"s": '"]'}], split
+
+
+def test_empty_listing():
+    assert sample_all([b'{"status": 1, "data": []}']) == {"status": 1, "data": [], "total": 0}
+
+
+def test_invalid_body():
+    assert sample_all([b"<html>Bad gateway</html>"]) is None
+
+
+def test_predicate_filters_before_sampling():
+    result = sample_all([BODY], predicate=lambda item: item["id"] % 2 == 0)
+    assert [item["id"] for item in result["data"]] == [2, 4, 6]
+    assert result["total"] == len(ITEMS)
+
+
+def test_reservoir_size():
+    rng = random.Random(1)
+    body = json.dumps({"data": list(range(100))}).encode()
+    result = sample_all([body[:37], body[37:]], k=5, rng=rng)
+    assert len(result["data"]) == 5
+    assert len(set(result["data"])) == 5
+    assert result["total"] == 100
+
+
+def test_reservoir_is_uniform():
+    rng = random.Random(7)
+    body = json.dumps({"data": list(range(10))}).encode()
+    counts = collections.Counter()
+    for _ in range(5000):
+        counts.update(sample_all([body], k=2, rng=rng)["data"])
+    # Each item is kept with probability 2/10: 1000 expected, sd ~28
+    assert all(850 < counts[item] < 1150 for item in range(10)), counts
@@ -0,0 +1,24 @@
+import pytest
+
+from utils import LazyJson
+
+
+def test_parses_on_first_access():
+    result = LazyJson(b'{"status": 1, "data": [1, 2]}')
+    assert result.get("status") == 1
+    assert result["data"] == [1, 2]
+    assert "data" in result
+    assert len(result) == 2
+    assert sorted(result) == ["data", "status"]
+
+
+@pytest.mark.parametrize("content", [b"", b"<html>502 Bad Gateway</html>", b"{"])
+def test_invalid_body_reads_as_empty(content):
+    result = LazyJson(content)
+    assert result.value is None
+    assert not result
+    assert result.get("data") is None
+    assert result.get("data", []) == []
+    assert "data" not in result
+    assert len(result) == 0
+    assert list(result) == []
@@ -0,0 +1,194 @@
+"""
+Trace-Context Propagation for Train-Ticket Load Testing
+
+Every request of the users carries a fresh W3C Trace Context header
+
+    traceparent: 00-<32 hex trace id>-<16 hex parent span id>-<flags>
+
+so the services instrumented for Jaeger (or SkyWalking with W3C propagation)
+continue the trace the load generator started. The trace id of each request
+is passed in the request context to the event listeners and written to the
+test_log CSV. TRACE_SAMPLE_RATIO sets the fraction of requests flagged as
+sampled (decided on the trace id, like OpenTelemetry's TraceIdRatioBased
+sampler); only sampled requests are kept below, since the others have no
+trace to link to. The services' parent-based samplers follow this flag instead
+of their own sampling configuration, so the ratio decides how many requests
+the system under test traces: keep it small (default 1%) unless the tracing
+overhead is part of the test.
+
+For every endpoint, the load generator keeps:
+
+    exemplars   the latest trace id per response time bucket (TRACE_EXEMPLAR_BUCKETS,
+                in ms), to jump from a histogram bucket to a matching trace
+    slowest     the TRACE_SLOWEST_PER_ENDPOINT slowest requests with their trace ids
+
+Workers send both to the master with every stats report. At the end of the
+test the master (or the local runner) writes TRACE_REPORT_FILE with trace
+links (TRACE_LINK_TEMPLATE) and logs the slowest requests overall.
+"""
+
+import bisect
+import heapq
+import json
+import logging
+import os
+
+from locust import events
+from locust.runners import WorkerRunner
+
+import capacity
+import config
+import journeys
+
+TRACEPARENT_VERSION = "00"
+
+# Bits of the trace id (the lowest) compared with the sample ratio, as in OpenTelemetry
+_SAMPLING_BITS = 56
+
+# Per "<method> <name>": {bucket upper bound: (trace id, response time, start time)}
+# since the last report to the master (all exemplars on the master)
+_exemplars = {}
+
+# Per "<method> <name>": min-heap of the slowest (response time, start time, trace id, failed)
+_slowest = {}
+
+
+def new_trace():
+    """(trace id, traceparent header value, sampled) of a new root span."""
+    ids = os.urandom(24).hex()
+    trace_id, span_id = ids[:32], ids[32:]
+    sampled = config.TRACE_SAMPLE_RATIO >= 1 or \
+        int(trace_id[-14:], 16) < config.TRACE_SAMPLE_RATIO * (1 << _SAMPLING_BITS)
+    return trace_id, f"{TRACEPARENT_VERSION}-{trace_id}-{span_id}-{'01' if sampled else '00'}", sampled
+
+
+def attach(user):
+    """Send a traceparent header with every request of the user."""
+    wrap(user.client)
+
+
+def wrap(client):
+    """Send a traceparent header with every request of an HTTP session."""
+    if not config.TRACE_PROPAGATION:
+        return
+    request = client.request
+
+    def traced(method, url, headers=None, context=None, **kwargs):
+        trace_id, traceparent, sampled = new_trace()
+        # Copy: header dicts are shared between requests, context is often the request body
+        headers = dict(headers or {}, traceparent=traceparent)
+        context = dict(context or {}, trace_id=trace_id, trace_sampled=sampled)
+        return request(method, url, headers=headers, context=context, **kwargs)
+
+    client.request = traced
+
+
+def trace_link(trace_id):
+    return config.TRACE_LINK_TEMPLATE.format(trace_id=trace_id) if config.TRACE_LINK_TEMPLATE else None
+
+
+def bucket_bound(response_time):
+    """Upper bound (ms) of the exemplar bucket of a response time, None for +Inf."""
+    index = bisect.bisect_left(config.TRACE_EXEMPLAR_BUCKETS, response_time)
+    return config.TRACE_EXEMPLAR_BUCKETS[index] if index < len(config.TRACE_EXEMPLAR_BUCKETS) else None
+
+
+def _keep(heap, entry):
+    """Push entry into a min-heap bounded to TRACE_SLOWEST_PER_ENDPOINT entries."""
+    if len(heap) < config.TRACE_SLOWEST_PER_ENDPOINT:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def exemplar(endpoint, response_time):
+    """(trace id, response time, start time) of the latest sampled request in the bucket, or None."""
+    return _exemplars.get(endpoint, {}).get(bucket_bound(response_time))
+
+
+@events.request.add_listener
+def on_request(request_type, name, response_time, context, exception, start_time, url, **kwargs):
+    """Keep the trace id of sampled requests as exemplar and among the slowest."""
+    if url is None or request_type in journeys.METRIC_REQUEST_TYPES or not context \
+            or not context.get("trace_sampled"):
+        return
+    trace_id = context["trace_id"]
+    endpoint = f"{request_type} {capacity.base_request_name(name)}"
+    _exemplars.setdefault(endpoint, {})[bucket_bound(response_time)] = (trace_id, response_time, start_time)
+    _keep(_slowest.setdefault(endpoint, []), (response_time, start_time, trace_id, exception is not None))
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def slowest_table():
+    """Rows of the slowest requests per endpoint, slowest first."""
+    rows = []
+    for endpoint, heap in _slowest.items():
+        for rank, (response_time, start_time, trace_id, failed) in enumerate(sorted(heap, reverse=True), 1):
+            rows.append({"endpoint": endpoint, "rank": rank, "response_time": round(response_time, 1),
+                         "start_time": round(start_time, 3), "failed": failed, "trace_id": trace_id,
+                         "trace_link": trace_link(trace_id)})
+    return rows
+
+
+def exemplar_table():
+    """Exemplars per endpoint and bucket upper bound ("+Inf" for the last bucket)."""
+    return {endpoint: {("+Inf" if bound is None else str(bound)): {
+        "trace_id": trace_id, "response_time": round(response_time, 1), "start_time": round(start_time, 3),
+        "trace_link": trace_link(trace_id)}
+        for bound, (trace_id, response_time, start_time) in sorted(
+            buckets.items(), key=lambda item: float("inf") if item[0] is None else item[0])}
+        for endpoint, buckets in sorted(_exemplars.items())}
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    _exemplars.clear()
+    _slowest.clear()
+
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data):
+    """Send the exemplars and slowest requests since the last report and start over."""
+    if _slowest:
+        data["traces"] = {
+            "exemplars": {endpoint: [[bound, *entry] for bound, entry in buckets.items()]
+                          for endpoint, buckets in _exemplars.items()},
+            "slowest": {endpoint: [list(entry) for entry in heap] for endpoint, heap in _slowest.items()},
+        }
+        _exemplars.clear()
+        _slowest.clear()
+
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data):
+    traces = data.get("traces")
+    if not traces:
+        return
+    for endpoint, buckets in traces["exemplars"].items():
+        known = _exemplars.setdefault(endpoint, {})
+        for bound, trace_id, response_time, start_time in buckets:
+            # Keep the latest request of the bucket over all workers
+            if bound not in known or known[bound][2] < start_time:
+                known[bound] = (trace_id, response_time, start_time)
+    for endpoint, entries in traces["slowest"].items():
+        heap = _slowest.setdefault(endpoint, [])
+        for entry in entries:
+            _keep(heap, tuple(entry))
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner) or not _slowest:
+        return
+    rows = slowest_table()
+    with open(config.TRACE_REPORT_FILE, "w") as f:
+        json.dump({"sample_ratio": config.TRACE_SAMPLE_RATIO,
+                   "buckets": config.TRACE_EXEMPLAR_BUCKETS, "slowest": rows, "exemplars": exemplar_table()},
+                  f, indent=2)
+    logging.info(f"Slowest requests with their traces in {config.TRACE_REPORT_FILE}")
+    for row in sorted(rows, key=lambda row: row["response_time"], reverse=True)[:config.TRACE_SUMMARY_SIZE]:
+        logging.info(f"  {row['endpoint']}: {row['response_time']:.0f} ms"
+                     f"{' (failed)' if row['failed'] else ''} {row['trace_link'] or row['trace_id']}")
@@ -5,10 +5,15 @@ Implements behavior patterns for three user personas: External (anonymous),
 Logged (authenticated), and Admin users. Each function represents complete
 user journeys with realistic timing and error handling.
 """
-import random
 import os
+import account_pool
+import admin_snapshot
 import api_user
 import api_admin
+import fanout
+import journeys
+import order_state
+import seeding
 import utils
 import config
 
@@ -18,40 +23,35 @@ import config
 # ============================================================================
 
 def browse_infrastructure(l):
-    """Browse system infrastructure: stations, trains, routes, and pricing information."""
+    """
+    Browse system infrastructure: stations, trains, routes, and pricing information.
+    The page loads all four listings concurrently, then the user reviews them.
+    """
     # Support both authenticated (logged) and anonymous (external) users
     headers = getattr(l.user, 'headers', None)
 
-    # Explore station network
-    l.client.get("/api/v1/stationservice/stations",
-                headers=headers,
-                name=utils.get_name_suffix("get_stations"))
-    utils.sleep_user()  # User reviews station list
-
-    # Browse available train types
-    l.client.get("/api/v1/trainservice/trains",
-                headers=headers,
-                name=utils.get_name_suffix("get_trains"))
-    utils.sleep_user()  # User compares train features
+    def fetch(url, name):
+        def call():
+            response = l.client.get(url, headers=headers, name=utils.get_name_suffix(name),
+                                    **utils.discard_kwargs())
+            utils.drain_response(response)
+        return call
 
-    # Explore route connections
-    l.client.get("/api/v1/routeservice/routes",
-                headers=headers,
-                name=utils.get_name_suffix("get_routes"))
-    utils.sleep_user()  # User studies route network
-
-    # Review pricing structure
-    l.client.get("/api/v1/priceservice/prices",
-                headers=headers,
-                name=utils.get_name_suffix("get_prices"))
-    utils.sleep_user()  # User analyzes pricing options
+    fanout.gather([
+        fetch("/api/v1/stationservice/stations", "get_stations"),  # Station network
+        fetch("/api/v1/trainservice/trains", "get_trains"),        # Available train types
+        fetch("/api/v1/routeservice/routes", "get_routes"),        # Route connections
+        fetch("/api/v1/priceservice/prices", "get_prices"),        # Pricing structure
+    ], name="browse_infrastructure")
+    utils.sleep_user()  # User studies stations, trains, routes and prices
 
 
 def search_trips(l):
     """Search for trips using user's train type preference with authenticated context."""
     start, end = utils.get_random_start_end_stations(hs=l.user.hs)
-    api_user.search_travel(l.client, start, end, hs=l.user.hs, headers=l.user.headers)
+    result = api_user.search_travel(l.client, start, end, hs=l.user.hs, headers=l.user.headers)
     utils.sleep_user()  # User reviews personalized search results
+    return result
 
 
 def book_ticket_complete_flow(l):
@@ -59,78 +59,89 @@ def book_ticket_complete_flow(l):
     Complete end-to-end ticket booking workflow with payment.
     Includes contact retrieval, trip search, food/insurance options, reservation, and payment.
     Primary revenue-generating behavior using user preferences and service routing.
+    Reported as the "book_ticket" journey with one step per stage.
     """
     departure_date = utils.get_departure_date()
+    trip_id = utils.get_train_number(l.user.hs)
+
+    with journeys.Journey("book_ticket") as journey:
+        # Step 1: Search for available trips
+        with journey.step("search"):
+            if utils.json_value(search_trips(l)) is None:
+                journey.abandon("search failed")
+
+        # Steps 2-4: The booking page loads contacts, food/meal and insurance options concurrently
+        def fetch(step, url, name):
+            def call():
+                with journey.step(step):
+                    response = l.client.get(url, headers=l.user.headers, name=utils.get_name_suffix(name))
+                    journey.abandon_on_failure(response, f"{step} failed")
+            return call
+
+        fanout.gather([
+            fetch("contacts", f"/api/v1/contactservice/contacts/account/{l.user.user_id}", "query_contacts"),
+            fetch("food", f"/api/v1/foodservice/foods/{departure_date}/shanghai/suzhou/{trip_id}", "get_food_types"),
+            fetch("assurance", "/api/v1/assuranceservice/assurances/types", "get_assurance_types"),
+        ], name="book_ticket.options")
+        utils.sleep_automatic()  # System renders the booking form
+
+        # Step 5: Create ticket reservation with all options
+        body = {
+            "accountId": l.user.user_id,
+            "contactsId": utils.get_random_string(10),  # Random contact for testing
+            "tripId": trip_id,  # Train number based on preference and popularity
+            "seatType": "2" if l.user.hs else "3",  # Seat class based on train type
+            "date": departure_date,
+            "from": "shanghai",
+            "to": "suzhou" if l.user.hs else "beijing",  # Route based on train type
+            "assurance": seeding.rng().choice(config.ASSURANCE_TYPES),  # Random insurance choice
+            "foodType": 1,
+            "foodName": "Bone Soup",  # Standard meal option
+            "foodPrice": 2.5,
+            "stationName": "",  # Optional pickup location
+            "storeName": ""     # Optional store/vendor
+        }
+
+        # Route to appropriate service based on train type
+        with journey.step("preserve"):
+            if l.user.hs:
+                response = l.client.post("/api/v1/preserveservice/preserve",
+                                         json=body,
+                                         headers=l.user.headers,
+                                         context=body,
+                                         name=utils.get_name_suffix("preserve_ticket_hs"))
+            else:
+                response = l.client.post("/api/v1/preserveotherservice/preserveOther",
+                                         json=body,
+                                         headers=l.user.headers,
+                                         context=body,
+                                         name=utils.get_name_suffix("preserve_ticket_other"))
+            if not journey.abandon_on_failure(response, "preserve failed"):
+                order_state.record_booking(l.user.user_id, l.user.hs)
+                account_pool.record_order(l.client, l.user.user_id, l.user.headers)
+        utils.sleep_user()
 
-    # Step 1: Retrieve user contact information for booking
-    l.client.get(f"/api/v1/contactservice/contacts/account/{l.user.user_id}",
-                headers=l.user.headers,
-                name=utils.get_name_suffix("query_contacts"))
-    utils.sleep_automatic()  # System loads contact data
-
-    # Step 2: Search for available trips
-    search_trips(l)
-
-    # Step 3: Check available food/meal options for the route
-    l.client.get(f"/api/v1/foodservice/foods/{departure_date}/shanghai/suzhou/G1234",
-                headers=l.user.headers,
-                name=utils.get_name_suffix("get_food_types"))
-    utils.sleep_automatic()  # System loads meal options
-
-    # Step 4: Review insurance/assurance options
-    l.client.get("/api/v1/assuranceservice/assurances/types",
-                headers=l.user.headers,
-                name=utils.get_name_suffix("get_assurance_types"))
-    utils.sleep_automatic()  # System loads insurance options
-
-    # Step 5: Create ticket reservation with all options
-    body = {
-        "accountId": l.user.user_id,
-        "contactsId": utils.get_random_string(10),  # Random contact for testing
-        "tripId": "G1234" if l.user.hs else "Z1234",  # Train type based on preference
-        "seatType": "2" if l.user.hs else "3",  # Seat class based on train type
-        "date": departure_date,
-        "from": "shanghai",
-        "to": "suzhou" if l.user.hs else "beijing",  # Route based on train type
-        "assurance": random.choice(config.ASSURANCE_TYPES),  # Random insurance choice
-        "foodType": 1,
-        "foodName": "Bone Soup",  # Standard meal option
-        "foodPrice": 2.5,
-        "stationName": "",  # Optional pickup location
-        "storeName": ""     # Optional store/vendor
-    }
-
-    # Route to appropriate service based on train type
-    if l.user.hs:
-        l.client.post("/api/v1/preserveservice/preserve",
-                     json=body,
-                     headers=l.user.headers,
-                     context=body,
-                     name=utils.get_name_suffix("preserve_ticket_hs"))
-    else:
-        l.client.post("/api/v1/preserveotherservice/preserveOther",
-                     json=body,
-                     headers=l.user.headers,
-                     context=body,
-                     name=utils.get_name_suffix("preserve_ticket_other"))
-    utils.sleep_user()
-
-    # Pay
-    body = {
-        "orderId": utils.get_random_string(10),
-        "tripId": "G1234" if l.user.hs else "Z1234"
-    }
-    l.client.post("/api/v1/inside_pay_service/inside_payment",
-                 json=body,
-                 headers=l.user.headers,
-                 context=body,
-                 name=utils.get_name_suffix("pay_order"))
-    utils.sleep_user()
+        # Pay
+        body = {
+            "orderId": utils.get_random_string(10),
+            "tripId": trip_id
+        }
+        with journey.step("pay"):
+            response = l.client.post("/api/v1/inside_pay_service/inside_payment",
+                                     json=body,
+                                     headers=l.user.headers,
+                                     context=body,
+                                     name=utils.get_name_suffix("pay_order"))
+            journey.abandon_on_failure(response, "pay failed")
+        utils.sleep_user()
 
 
 def manage_orders(l):
-    """View user orders and attempt cancellation with graceful error handling."""
-    api_user.get_all_orders(l.client, l.user.user_id, l.user.hs, l.user.headers)
+    """
+    View user orders and attempt cancellation with graceful error handling.
+    The listing refreshes the client-side order state, so the cancellation needs no second refresh.
+    """
+    order_state.book_for(l.user.user_id).refresh(l.client, l.user.hs, l.user.headers)
     utils.sleep_user()
 
     try:
@@ -144,28 +155,35 @@ def collect_and_execute_ticket(l):
     """
     Complete ticket collection and execution workflow.
     Collects paid tickets (status 1→2) and executes collected tickets (status 2→completed).
+    Orders are picked from the client-side order state, which follows the collect/execute
+    responses and only re-lists orders when stale or due for reconciliation.
+    Reported as the "collect_and_execute" journey; it is abandoned if nothing could be collected.
     """
-    orders_hs = api_user.get_all_orders(l.client, l.user.user_id, hs=True, headers=l.user.headers)
-    orders_other = api_user.get_all_orders(l.client, l.user.user_id, hs=False, headers=l.user.headers)
-    utils.sleep_user()
+    book = order_state.book_for(l.user.user_id)
+    with journeys.Journey("collect_and_execute") as journey:
+        with journey.step("list_paid"):
+            order = book.find(l.client, l.user.headers, (config.TICKET_STATUS_PAID,))
+        utils.sleep_user()
 
-    orders = orders_hs + orders_other
-    for o in orders:
-        if o["status"] == 1:
-            api_user.collect_ticket(l.client, l.user.headers, o)
-            break
-    utils.sleep_user()
+        with journey.step("collect"):
+            if order is not None:
+                result = api_user.collect_ticket(l.client, l.user.headers, order)
+                book.apply(order, config.TICKET_STATUS_COLLECTED, result)
+        if order is None:
+            journey.abandon("no paid order")
+        utils.sleep_user()
 
-    orders_hs = api_user.get_all_orders(l.client, l.user.user_id, hs=True, headers=l.user.headers)
-    orders_other = api_user.get_all_orders(l.client, l.user.user_id, hs=False, headers=l.user.headers)
-    utils.sleep_user()
+        with journey.step("list_collected"):
+            order = book.find(l.client, l.user.headers, (config.TICKET_STATUS_COLLECTED,))
+        utils.sleep_user()
 
-    orders = orders_hs + orders_other
-    for o in orders:
-        if o["status"] == 2:
-            api_user.execute_ticket(l.client, l.user.headers, o)
-            break
-    utils.sleep_user()
+        with journey.step("execute"):
+            if order is not None:
+                result = api_user.execute_ticket(l.client, l.user.headers, order)
+                book.apply(order, config.TICKET_STATUS_EXECUTED, result)
+        if order is None:
+            journey.abandon("no collected order")
+        utils.sleep_user()
 
 
 def manage_consignment(l):
@@ -174,17 +192,21 @@ def manage_consignment(l):
     Queries pricing by weight/region and retrieves account consignment records.
     """
     # Get consignment price by weight and region
-    weight = random.uniform(5.0, 20.0)
-    is_within_region = random.choice(["true", "false"])
-    l.client.get(f"/api/v1/consignpriceservice/consignprice/{weight}/{is_within_region}",
-                headers=l.user.headers,
-                name=utils.get_name_suffix("get_consign_price"))
+    weight = seeding.rng().uniform(5.0, 20.0)
+    is_within_region = seeding.rng().choice(["true", "false"])
+    response = l.client.get(f"/api/v1/consignpriceservice/consignprice/{weight}/{is_within_region}",
+                            headers=l.user.headers,
+                            name=utils.get_name_suffix("get_consign_price"),
+                            **utils.discard_kwargs())
+    utils.drain_response(response)
     utils.sleep_user()
 
     # Get consignment records for account
-    l.client.get(f"/api/v1/consignservice/consigns/account/{l.user.user_id}",
-                headers=l.user.headers,
-                name=utils.get_name_suffix("get_consign_records"))
+    response = l.client.get(f"/api/v1/consignservice/consigns/account/{l.user.user_id}",
+                            headers=l.user.headers,
+                            name=utils.get_name_suffix("get_consign_records"),
+                            **utils.discard_kwargs())
+    utils.drain_response(response)
     utils.sleep_user()
 
 
@@ -193,9 +215,10 @@ def rebook_ticket(l):
     Rebook ticket to different trip with new travel details.
     Changes from old trip to new trip with seat and date preferences.
     """
+    old_trip_id, trip_id = utils.get_rebook_train_numbers()
     body = {
-        "oldTripId": "G1234",
-        "tripId": "G1235",
+        "oldTripId": old_trip_id,
+        "tripId": trip_id,
         "seatType": 2,
         "date": utils.get_departure_date(),
         "orderId": utils.get_random_string(10)
@@ -217,33 +240,16 @@ def get_travel_plan(l):
 
 def get_voucher_for_order(l):
     """Get voucher/receipt for paid orders"""
-    # Get orders (both HS and other)
+    # Pick a PAID, COLLECTED or EXECUTED order (HS or other) from the client-side order state
     try:
-        orders_hs = api_user.get_all_orders(l.client, l.user.user_id, hs=True, headers=l.user.headers)
-        orders_other = api_user.get_all_orders(l.client, l.user.user_id, hs=False, headers=l.user.headers)
+        order = order_state.book_for(l.user.user_id).find(
+            l.client, l.user.headers,
+            (config.TICKET_STATUS_PAID, config.TICKET_STATUS_COLLECTED, config.TICKET_STATUS_EXECUTED))
         utils.sleep_user()
 
-        orders = orders_hs + orders_other
-
-        # Try to get voucher for any paid, collected, or executed order
-        found_valid_order = False
-        for o in orders:
-            if o.get("status") in [1, 2, 6]:  # PAID, COLLECTED, or EXECUTED
-                order_id = o.get("id")
-                if order_id:
-                    # Determine if it's HS or OTHER based on trip ID
-                    trip_id = o.get("trainNumber", "")
-                    hs = trip_id.startswith("G") or trip_id.startswith("D")
-                    try:
-                        api_user.get_voucher(l.client, l.user.headers, order_id, hs=hs)
-                        found_valid_order = True
-                        break
-                    except:
-                        pass  # Try next order if this one fails
-
-        # If no valid orders found, don't fail - just skip silently
-        if not found_valid_order:
-            pass  # No valid orders to get voucher for, that's okay
+        # If no valid order is known, don't fail - just skip silently
+        if order is not None:
+            api_user.get_voucher(l.client, l.user.headers, order["id"], hs=order_state.is_hs(order))
     except:
         pass  # Silently handle any errors in order retrieval
 
@@ -254,12 +260,12 @@ def browse_basic_info(l):
     """Browse basic travel information: stations and routes"""
     # Query station information
     stations = ["shanghai", "nanjing", "suzhou", "beijing"]
-    station = random.choice(stations)
+    station = seeding.rng().choice(stations)
     api_user.query_station_by_name(l.client, station, headers=getattr(l.user, 'headers', None))
     utils.sleep_user()
 
     # Query route for a trip
-    trip_id = "G1234" if l.user.hs else "Z1234"
+    trip_id = utils.get_train_number(l.user.hs)
     start, end = utils.get_random_start_end_stations(l.user.hs)
     api_user.query_basic_travel(l.client, trip_id, start, end, headers=getattr(l.user, 'headers', None))
     utils.sleep_user()
@@ -348,61 +354,64 @@ def admin_manage_travels(l):
     Uses real route IDs and maintains data integrity with fallback handling.
     """
     # Step 1: Load current route network for administrative context
-    routes_response = api_admin.get_all_routes(l.client, headers=l.user.headers)
+    routes_response = admin_snapshot.get_listing(l.client, "routes", headers=l.user.headers)
     routes = routes_response.get("data", []) if routes_response else []
     utils.sleep_user()  # Admin reviews route network structure
 
     # Step 2: Load current travel inventory for management decisions
-    travels_response = api_admin.get_all_travels(l.client, headers=l.user.headers)
+    travels_response = admin_snapshot.get_listing(l.client, "travels", headers=l.user.headers,
+                                                  sample=config.ADMIN_LISTING_SAMPLE_SIZE)
     travels = travels_response.get("data", []) if travels_response else []
     utils.sleep_user()  # Admin analyzes current travel offerings
 
     # Step 3: Perform administrative action (create or update)
-    if random.choice([True, False]):
+    if seeding.rng().choice([True, False]):
         # Create new travel route (50% probability)
         # Always attempt for consistent load testing metrics
-        route = random.choice(routes) if routes else None
-        api_admin.create_travel(l.client, route, hs=random.choice([True, False]),
+        route = seeding.rng().choice(routes) if routes else None
+        api_admin.create_travel(l.client, route, hs=seeding.rng().choice([True, False]),
                                headers=l.user.headers)
     else:
         # Update existing travel route (50% probability)
         if travels:
-            travel = random.choice(travels)
+            travel = seeding.rng().choice(travels)
             api_admin.update_travel(l.client, travel, headers=l.user.headers)
     utils.sleep_user()  # Admin reviews operation results
 
 
 def admin_manage_orders(l):
     """View all orders and randomly update existing order or create new test order."""
-    orders = api_admin.get_all_orders(l.client, headers=l.user.headers)
+    orders = admin_snapshot.get_listing(l.client, "orders", headers=l.user.headers,
+                                        sample=config.ADMIN_LISTING_SAMPLE_SIZE)
     utils.sleep_user()
 
-    if random.choice([True, False]) and orders and 'data' in orders and orders['data']:
-        order = random.choice(orders['data'])
+    if seeding.rng().choice([True, False]) and orders and 'data' in orders and orders['data']:
+        order = dict(seeding.rng().choice(orders['data']))  # Copy: update_order modifies it, listings are shared
         api_admin.update_order(l.client, order, headers=l.user.headers)
     else:
-        api_admin.create_order(l.client, hs=random.choice([True, False]), headers=l.user.headers)
+        api_admin.create_order(l.client, hs=seeding.rng().choice([True, False]), headers=l.user.headers)
     utils.sleep_user()
 
 
 def admin_manage_pricing(l):
     """View pricing configurations and modify random price with rate adjustments."""
-    prices = api_admin.get_all_prices(l.client, headers=l.user.headers)
+    prices = admin_snapshot.get_listing(l.client, "prices", headers=l.user.headers)
     utils.sleep_user()
 
     if prices and 'data' in prices and prices['data']:
-        price = random.choice(prices['data'])
+        price = seeding.rng().choice(prices['data'])
         api_admin.modify_price(l.client, headers=l.user.headers, price=price)
         utils.sleep_user()
 
 
 def admin_manage_contacts(l):
     """View all contacts and modify random contact for data maintenance."""
-    contacts = api_admin.get_all_contacts(l.client, headers=l.user.headers)
+    contacts = admin_snapshot.get_listing(l.client, "contacts", headers=l.user.headers,
+                                          sample=config.ADMIN_LISTING_SAMPLE_SIZE)
     utils.sleep_user()
 
     if contacts and 'data' in contacts and contacts['data']:
-        contact = random.choice(contacts['data'])
+        contact = seeding.rng().choice(contacts['data'])
         api_admin.modify_contact(l.client, headers=l.user.headers, contact=contact)
         utils.sleep_user()
 
@@ -418,30 +427,29 @@ def admin_manage_users(l):
 
 def admin_delete_travels(l):
     """
-    View travels and safely delete random travel with ID constraints.
-    Only deletes trips with numbers >= 2000 to protect production data.
+    Safely delete a random travel of a random train class.
+    Only trips with numbers in ADMIN_DELETE_MIN_NUMBER-ADMIN_DELETE_MAX_NUMBER are candidates,
+    to protect production and seeded data.
     """
-    travels_response = api_admin.get_all_travels(l.client, headers=l.user.headers)
-    travels = travels_response.get("data", []) if travels_response else []
+    hs = seeding.rng().choice([True, False])
+    candidates = admin_snapshot.get_delete_candidates(l.client, "travels", hs, headers=l.user.headers)
     utils.sleep_user()
 
-    if travels:
-        # Delete a random travel (only deletes trips with number >= 2000)
-        api_admin.delete_random_travel(l.client, travels, hs=random.choice([True, False]), headers=l.user.headers)
+    if api_admin.delete_random_travel(l.client, candidates, hs=hs, headers=l.user.headers) is not None:
         utils.sleep_user()
 
 
 def admin_delete_orders(l):
     """
-    View orders and safely delete random order with safety constraints.
-    Only deletes orders with train numbers >= 2000 to protect customer data.
+    Safely delete a random order of a random train class.
+    Only orders with train numbers in ADMIN_DELETE_MIN_NUMBER-ADMIN_DELETE_MAX_NUMBER are candidates,
+    to protect customer and seeded data.
     """
-    orders = api_admin.get_all_orders(l.client, headers=l.user.headers)
+    hs = seeding.rng().choice([True, False])
+    candidates = admin_snapshot.get_delete_candidates(l.client, "orders", hs, headers=l.user.headers)
     utils.sleep_user()
 
-    if orders and 'data' in orders and orders['data']:
-        # Delete a random order (only deletes orders with number >= 2000)
-        api_admin.delete_random_order(l.client, orders, hs=random.choice([True, False]), headers=l.user.headers)
+    if api_admin.delete_random_order(l.client, candidates, hs=hs, headers=l.user.headers) is not None:
         utils.sleep_user()
 
 
@@ -479,7 +487,7 @@ def admin_manage_system_users(l):
 
     # Get specific user by ID (if users exist)
     if users and 'data' in users and users['data'] and len(users['data']) > 0:
-        user = random.choice(users['data'])
+        user = seeding.rng().choice(users['data'])
         if 'userId' in user:
             api_user.get_user_by_id(l.client, user['userId'], headers=l.user.headers)
             utils.sleep_user()
@@ -7,12 +7,18 @@ with retry logic for realistic load testing scenarios.
 """
 
 import json
-import random
 import time
 
+import account_pool
 import api_user
 import string
 import api_admin
+import bandwidth
+import catalog
+import distributions
+import journeys
+import order_state
+import seeding
 from datetime import datetime, timedelta
 from locust import events
 import config
@@ -20,11 +26,24 @@ import config
 # Global flag to track when Locust has finished spawning all users
 spawning_complete = False
 
+# Station pairs enumerated from the trip lists, built on first use
+_station_pairs = {}
+
+# Bytes per read when draining discarded response bodies
+DRAIN_CHUNK_SIZE = 65536
+
+# Use orjson (bytes-native, much faster) when installed, else the standard library
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 
 def get_random_string(length=10):
     """Generate random lowercase string of specified length for test data."""
     letters = string.ascii_lowercase
-    result_str = ''.join(random.choice(letters) for i in range(length))
+    result_str = ''.join(seeding.rng().choice(letters) for i in range(length))
     return result_str
 
 
@@ -35,17 +54,108 @@ def on_spawning_complete(user_count, **kwargs):
     spawning_complete = True
 
 
-def get_json_from_response(response):
-    """Safely parse HTTP response to JSON, returns None on parsing errors."""
+def parse_json(content):
+    """Parse a JSON body straight from bytes, returns None on parsing errors."""
     try:
-        response_as_text = response.content.decode('UTF-8')
-        response_as_json = json.loads(response_as_text)
-        return response_as_json
+        return _loads(content)
     except:
         # Return None for any parsing error (malformed JSON, encoding issues, etc.)
         return None
 
 
+class LazyJson:
+    """
+    JSON response body that is only parsed when something is read from it.
+    Supports the access patterns used on parsed responses (item access, .get(),
+    "in", iteration, len() and truthiness); .value is the parsed value itself
+    (None if the body is empty or not valid JSON, which then reads as empty:
+    .get() returns the default, "in" is False and len() is 0). Unused responses
+    are never parsed.
+    """
+
+    __slots__ = ("_content", "_value", "_parsed")
+
+    def __init__(self, content):
+        self._content = content
+        self._value = None
+        self._parsed = False
+
+    @property
+    def value(self):
+        if not self._parsed:
+            self._value = parse_json(self._content) if self._content else None
+            self._content = None
+            self._parsed = True
+        return self._value
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __contains__(self, key):
+        return self.value is not None and key in self.value
+
+    def __iter__(self):
+        return iter(self.value if self.value is not None else ())
+
+    def __len__(self):
+        return len(self.value) if self.value is not None else 0
+
+    def __bool__(self):
+        return bool(self.value)
+
+    def get(self, key, default=None):
+        if self.value is None:
+            return default
+        return self.value.get(key, default)
+
+    def __repr__(self):
+        return f"LazyJson({self.value!r})"
+
+
+def get_json_from_response(response):
+    """
+    Safely parse HTTP response to JSON, returns None on parsing errors.
+    With LAZY_JSON_PARSING the body is wrapped in a LazyJson and parsed on first access.
+    """
+    try:
+        content = response.content
+    except:
+        return None
+    if config.LAZY_JSON_PARSING:
+        return LazyJson(content)
+    return parse_json(content)
+
+
+def json_value(result):
+    """Unwrap a LazyJson result (no-op for already parsed values)."""
+    return result.value if isinstance(result, LazyJson) else result
+
+
+def discard_kwargs():
+    """Extra request arguments for calls whose body is never used (see drain_response)."""
+    return {"stream": True} if config.DISCARD_UNUSED_BODIES else {}
+
+
+def drain_response(response):
+    """
+    Read the body of a stream=True response off the socket in chunks without
+    buffering or decompressing it, so the connection can be reused.
+    """
+    if not config.DISCARD_UNUSED_BODIES:
+        return
+    try:
+        size = 0
+        chunk = response.read(DRAIN_CHUNK_SIZE)
+        while chunk:
+            size += len(chunk)
+            chunk = response.read(DRAIN_CHUNK_SIZE)
+        response.release()
+        bandwidth.drained(response, size)
+    except Exception:
+        # Failed requests have no body to drain
+        pass
+
+
 def next_weekday(d, weekday):
     """Calculate next occurrence of specified weekday (0=Monday, 6=Sunday)."""
     days_ahead = weekday - d.weekday()
@@ -80,9 +190,10 @@ def get_name_suffix(name):
 def get_departure_date():
     """
     Get departure date for trip booking requests.
-    Returns fixed date "2013-05-04" to match existing test data in database.
+    Draws from config.DEPARTURE_DATES (default: fixed "2013-05-04" to match existing
+    test data in database) under the configured DATE_POPULARITY model.
     """
-    return "2013-05-04"
+    return distributions.choose("departure_date", config.DEPARTURE_DATES, config.DATE_POPULARITY)
 
     # Original dynamic logic (commented out until trip dates are updated):
     # tomorrow = datetime.now() + timedelta(1)
@@ -93,32 +204,68 @@ def get_departure_date():
 
 def get_random_start_end_stations(hs=True):
     """
-    Select random start and end stations from configured routes.
+    Select random start and end stations from the live route catalog or, until it is
+    loaded, from configured routes.
     Uses high-speed routes (HS) or regular train routes, ensuring proper station sequence.
+    With a non-uniform ROUTE_POPULARITY, draws directly from all station pairs instead.
     """
-    if hs:
-        route = random.choice(config.HS_TRIP_LIST)    # High-speed routes
-    else:
-        route = random.choice(config.OTHER_TRIP_LIST) # Regular train routes
+    # Prefer the live route catalog when it has been loaded
+    pair = catalog.routes.random_pair(
+        hs, lambda pairs: distributions.choose("catalog_hs" if hs else "catalog_other", pairs, config.ROUTE_POPULARITY))
+    if pair is not None:
+        return pair
+
+    trip_list = config.HS_TRIP_LIST if hs else config.OTHER_TRIP_LIST
+
+    if config.ROUTE_POPULARITY.get("model", "uniform") != "uniform":
+        name = "route_hs" if hs else "route_other"
+        pairs = _station_pairs.get(name)
+        if pairs is None:
+            pairs = _station_pairs[name] = distributions.station_pairs(trip_list)
+        return distributions.choose(name, pairs, config.ROUTE_POPULARITY)
+
+    route = seeding.rng().choice(trip_list)  # High-speed or regular train routes
 
     # Select start station (can't be the last station)
-    index = random.randint(0, len(route) - 2)
+    index = seeding.rng().randint(0, len(route) - 2)
     start = route[index]
 
     # Select end station (must be after start station)
-    end = route[random.randint(index + 1, len(route) - 1)]
+    end = route[seeding.rng().randint(index + 1, len(route) - 1)]
 
     return start, end
 
 
+def get_train_number(hs=True):
+    """Pick a train number (e.g. "G1234") under the configured TRAIN_NUMBER_POPULARITY model."""
+    if hs:
+        return distributions.choose("train_number_hs", config.HS_TRAIN_NUMBERS, config.TRAIN_NUMBER_POPULARITY)
+    return distributions.choose("train_number_other", config.OTHER_TRAIN_NUMBERS, config.TRAIN_NUMBER_POPULARITY)
+
+
+def get_rebook_train_numbers():
+    """(old, new) high-speed train numbers of a rebooking; the new train is never the old one."""
+    old = get_train_number(hs=True)
+    others = [number for number in config.HS_TRAIN_NUMBERS if number != old]
+    if others:
+        return old, seeding.rng().choice(others)
+    return old, next(number for number in config.REBOOK_TRAIN_NUMBERS if number != old)
+
+
 def sleep_user():
     """Simulate human thinking time (1-5 seconds) between major user actions."""
-    time.sleep(random.uniform(config.TT_USER_MIN, config.TT_USER_MAX))
+    started = time.perf_counter()
+    time.sleep(seeding.rng().uniform(config.TT_USER_MIN, config.TT_USER_MAX))
+    # Subtract the time actually slept from any open journey
+    journeys.record_think_time(time.perf_counter() - started)
 
 
 def sleep_automatic():
     """Simulate system processing time (1-200ms) for fast internal operations."""
-    time.sleep(random.uniform(config.TT_AUTOMATIC_MIN, config.TT_AUTOMATIC_MAX))
+    started = time.perf_counter()
+    time.sleep(seeding.rng().uniform(config.TT_AUTOMATIC_MIN, config.TT_AUTOMATIC_MAX))
+    # Subtract the time actually slept from any open journey
+    journeys.record_think_time(time.perf_counter() - started)
 
 
 def search_travels_roudtrip(client, hs):
@@ -183,36 +330,53 @@ def search_and_preserve_travel(client, user_id, headers, hs, start, end):
     """
     Complete search and booking workflow with retry logic and error handling.
     Searches for trips, handles multiple response formats, and completes booking and payment.
+    Reported as the "search_and_preserve" journey (abandoned unless booking succeeded).
     Returns (start, end) if succeeded, (None, None) if failed.
     """
+    with journeys.Journey("search_and_preserve") as journey:
+        start, end = _search_and_preserve_travel(journey, client, user_id, headers, hs, start, end)
+        if start is None:
+            journey.abandon("booking failed")
+        return start, end
+
+
+def _search_and_preserve_travel(journey, client, user_id, headers, hs, start, end):
+    """Body of search_and_preserve_travel, timed step by step on the given journey."""
     flag = False  # Track if search found valid results
 
     # Retry search up to 4 times with route fallback
-    for i in range(1, 5):
-        a = api_user.search_travel(client, start, end, hs=hs, headers=headers)
-
-        # Handle multiple API response formats with defensive programming
-        data_array = None
-        if a is None:
-            # API returned None - continue to next attempt
-            pass
-        elif isinstance(a, dict) and "data" in a:
-            # Standard response format: {"status": 1, "data": [...]}
-            data_array = a["data"] if isinstance(a["data"], list) else None
-        elif isinstance(a, list):
-            # Direct list response format: [...]
-            data_array = a
-        else:
-            # Unexpected response format - continue to next attempt
-            pass
-
-        # Retry with new route if no valid data found
-        if data_array is None or len(data_array) == 0:
-            start, end = get_random_start_end_stations(hs=hs)  # Try different route
-        else:
-            a = data_array  # Normalize to list format for consistent processing
-            flag = True
-            break
+    with journey.step("search"):
+        for i in range(1, 5):
+            departure_date = get_departure_date()
+            a = json_value(api_user.search_travel(client, start, end, hs=hs, headers=headers,
+                                                  departure_date=departure_date))
+
+            # Handle multiple API response formats with defensive programming
+            data_array = None
+            if a is None:
+                # API returned None - continue to next attempt
+                pass
+            elif isinstance(a, dict) and "data" in a:
+                # Standard response format: {"status": 1, "data": [...]}
+                data_array = a["data"] if isinstance(a["data"], list) else None
+            elif isinstance(a, list):
+                # Direct list response format: [...]
+                data_array = a
+            else:
+                # Unexpected response format - continue to next attempt
+                pass
+
+            # Feed the outcome of successful searches back into the shared route catalog
+            succeeded = isinstance(a, list) or (isinstance(a, dict) and a.get("status") == 1)
+            catalog.routes.observe_search(hs, start, end, departure_date, data_array if succeeded else None)
+
+            # Retry with new route if no valid data found
+            if data_array is None or len(data_array) == 0:
+                start, end = get_random_start_end_stations(hs=hs)  # Try different route
+            else:
+                a = data_array  # Normalize to list format for consistent processing
+                flag = True
+                break
 
     # Process booking if search succeeded
     if flag:
@@ -236,8 +400,11 @@ def search_and_preserve_travel(client, user_id, headers, hs, start, end):
 
                 # Attempt booking with error handling
                 try:
-                    api_user.book(client, user_id, trip_id=trip_id_a, from_station=start,
-                                  to_station=end, hs=hs, headers=headers)
+                    with journey.step("preserve"):
+                        api_user.book(client, user_id, trip_id=trip_id_a, from_station=start,
+                                      to_station=end, hs=hs, headers=headers)
+                    order_state.record_booking(user_id, hs)
+                    account_pool.record_order(client, user_id, headers)
                 except Exception:
                     # Booking failed - return failure
                     return None, None
@@ -246,10 +413,12 @@ def search_and_preserve_travel(client, user_id, headers, hs, start, end):
 
                 # Attempt payment with graceful failure handling
                 try:
-                    api_user.pay(client, user_id, trip_id_a, hs=hs, headers=headers)
+                    with journey.step("pay"):
+                        api_user.pay(client, user_id, trip_id_a, hs=hs, headers=headers)
                 except Exception:
                     # Payment failed but booking succeeded - partial success
                     # Return route info since booking reservation was created
+                    journey.abandon("payment failed")
                     return start, end
 
                 # Full success - both booking and payment completed